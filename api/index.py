@@ -11,16 +11,27 @@ sys.path.insert(0, project_root)
 
 from flask import Flask, jsonify, request, send_file
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager, create_access_token, get_jwt_identity, jwt_required
-from sqlalchemy import or_, func, desc
+from flask_jwt_extended import JWTManager, create_access_token, get_jwt, get_jwt_identity, jwt_required
+from sqlalchemy import and_, or_, func, desc
 from math import ceil
 from io import BytesIO
 from datetime import datetime, date
 from uuid import uuid4
+import base64
 import json
+import sqlite3
 
 from lib.database import db, get_app_config
-from lib.models import User, Equipment, Comment
+from lib.models import User, Equipment, Comment, ChangeLog
+from backend.batch import forwarded_headers, parse_batch, run_batch
+from backend.admission import init_admission
+from backend.authz import Principal
+from backend.cpu_profiler import init_cpu_profiler
+from backend.database import enable_sqlite_foreign_keys, init_pool_metrics
+from backend.metrics import init_metrics
+from backend.sql_profiler import init_sql_profiler
+from backend.socketio_events import new_comment_payload, comment_deleted_payload
+from backend.stream import change_stream, record_change, sse_response, stream_request_args, stream_token_response
 from lib.utils import hash_password, verify_password, is_valid_email, generate_excel_template, parse_excel_to_rows, validate_import_rows, VALID_STATUSES
 from openpyxl import Workbook
 
@@ -31,7 +42,22 @@ app.config.update(config)
 
 # Initialize extensions
 db.init_app(app)
+init_pool_metrics(app, db)
+with app.app_context():
+    enable_sqlite_foreign_keys(db.engine)
 JWTManager(app)
+init_metrics(app)
+init_sql_profiler(app)
+init_admission(app)
+
+
+def token_user_is_admin(uid, claims):
+    init_database()
+    user = db.session.get(User, uid)
+    return user is not None and user.role == "admin"
+
+
+init_cpu_profiler(app, is_admin=token_user_is_admin)
 CORS(app, resources={r"/api/*": {"origins": "*", "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"], "allow_headers": ["Content-Type", "Authorization"]}})
 
 # Initialize database on first request
@@ -58,6 +84,10 @@ def init_database():
                             conn.exec_driver_sql("ALTER TABLE equipment ADD COLUMN extra TEXT")
         except Exception:
             pass
+        # Indexes added after the tables were first created
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(db.engine, checkfirst=True)
         
         # Seed data
         try:
@@ -187,6 +217,21 @@ def me():
         "created_at": user.created_at.isoformat(),
     })
 
+def token_user():
+    """Caller from the verified token's role/username claims, without a DB read.
+
+    Only tokens minted before those claims existed fall back to the users row.
+    """
+    try:
+        uid = int(get_jwt_identity())
+    except Exception:
+        return None
+    claims = get_jwt()
+    if "role" in claims and "username" in claims:
+        return Principal(uid, claims["username"], claims["role"])
+    user = db.session.get(User, uid)
+    return Principal(user.id, user.username, user.role) if user else None
+
 # Equipment routes
 @app.route("/api/equipment", methods=["GET"])
 @jwt_required()
@@ -295,12 +340,9 @@ def get_equipment(eid: int):
 @jwt_required()
 def import_excel():
     init_database()
-    identity = get_jwt_identity()
-    try:
-        uid = int(identity)
-    except Exception:
+    user = token_user()
+    if user is None:
         return jsonify({"message": "Invalid token."}), 401
-    user = db.get_or_404(User, uid)
     if user.role != "admin":
         return jsonify({"message": "Only admins can import."}), 403
 
@@ -378,12 +420,9 @@ def import_excel():
 @jwt_required()
 def update_equipment(eid: int):
     init_database()
-    identity = get_jwt_identity()
-    try:
-        uid = int(identity)
-    except Exception:
+    user = token_user()
+    if user is None:
         return jsonify({"message": "Invalid token."}), 401
-    user = db.get_or_404(User, uid)
     e = db.get_or_404(Equipment, eid)
 
     data = request.get_json(force=True)
@@ -401,12 +440,9 @@ def update_equipment(eid: int):
 @jwt_required()
 def delete_equipment(eid: int):
     init_database()
-    identity = get_jwt_identity()
-    try:
-        uid = int(identity)
-    except Exception:
+    user = token_user()
+    if user is None:
         return jsonify({"message": "Invalid token."}), 401
-    user = db.get_or_404(User, uid)
     if user.role != "admin":
         return jsonify({"message": "Only admins can delete."}), 403
 
@@ -470,39 +506,190 @@ def export_equipment():
     )
 
 # Comments routes
+COMMENTS_MAX_LIMIT = 200
+
+def _encode_cursor(created_at, cid):
+    raw = f"{created_at.isoformat()}|{cid}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        ts, cid = raw.rsplit("|", 1)
+        return datetime.fromisoformat(ts), int(cid)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+def _comment_json(row):
+    return {
+        "id": row.id,
+        "equipment_id": row.equipment_id,
+        "user_id": row.user_id,
+        "username": row.username or "",
+        "comment_text": row.comment_text,
+        "created_at": row.created_at.isoformat(),
+    }
+
 @app.route("/api/comments/equipment/<int:eid>", methods=["GET"])
 @jwt_required()
 def list_comments(eid: int):
     init_database()
     db.get_or_404(Equipment, eid)
-    comments = db.session.scalars(
-        db.select(Comment).where(Comment.equipment_id == eid).order_by(desc(Comment.created_at))  # type: ignore
-    ).all()
-    user_ids = {c.user_id for c in comments}
-    users = {u.id: u for u in db.session.scalars(db.select(User).where(User.id.in_(user_ids))).all()}  # type: ignore
-
-    return jsonify([
-        {
-            "id": c.id,
-            "equipment_id": c.equipment_id,
-            "user_id": c.user_id,
-            "username": users.get(c.user_id).username if users.get(c.user_id) else "",
-            "comment_text": c.comment_text,
-            "created_at": c.created_at.isoformat(),
-        }
-        for c in comments
-    ])
+
+    limit = request.args.get("limit", type=int)
+    cursor = request.args.get("cursor")
+    since = request.args.get("since")
+    paged = limit is not None or cursor is not None or since is not None
+
+    stmt = (
+        db.select(  # type: ignore
+            Comment.id, Comment.equipment_id, Comment.user_id, Comment.comment_text, Comment.created_at,
+            User.username,
+        )
+        .outerjoin(User, User.id == Comment.user_id)
+        .where(Comment.equipment_id == eid)
+        .order_by(desc(Comment.created_at), desc(Comment.id))
+    )
+
+    if not paged:
+        return jsonify([_comment_json(r) for r in db.session.execute(stmt)])
+
+    limit = max(1, min(limit or 50, COMMENTS_MAX_LIMIT))
+
+    if since:
+        key = _decode_cursor(since)
+        if key is None:
+            return jsonify({"message": "Invalid since cursor."}), 400
+        ts, cid = key
+        stmt = stmt.where(or_(Comment.created_at > ts, and_(Comment.created_at == ts, Comment.id > cid)))
+        stmt = stmt.order_by(None).order_by(Comment.created_at, Comment.id)
+        rows = db.session.execute(stmt.limit(limit + 1)).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return jsonify({
+            "items": [_comment_json(r) for r in reversed(rows)],
+            "next_cursor": None,
+            "latest_cursor": _encode_cursor(rows[-1].created_at, rows[-1].id) if rows else since,
+            "has_more": has_more,
+        })
+
+    if cursor:
+        key = _decode_cursor(cursor)
+        if key is None:
+            return jsonify({"message": "Invalid cursor."}), 400
+        ts, cid = key
+        stmt = stmt.where(or_(Comment.created_at < ts, and_(Comment.created_at == ts, Comment.id < cid)))
+
+    rows = db.session.execute(stmt.limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return jsonify({
+        "items": [_comment_json(r) for r in rows],
+        "next_cursor": _encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None,
+        "latest_cursor": _encode_cursor(rows[0].created_at, rows[0].id) if rows and not cursor else None,
+        "has_more": has_more,
+    })
+
+COMMENTS_BATCH_MAX_IDS = 500
+COMMENTS_BATCH_MAX_LATEST = 20
+
+def _supports_window_functions() -> bool:
+    dialect = db.session.get_bind().dialect
+    if dialect.name == "sqlite":
+        return sqlite3.sqlite_version_info >= (3, 25, 0)
+    return True
+
+@app.route("/api/comments/batch", methods=["POST"])
+@jwt_required()
+def batch_comments():
+    """Comment counts and the latest N comments for many equipment IDs.
+
+    Body: ``{"equipment_ids": [1, 2, ...], "latest": 3}``. Response maps each
+    requested ID to ``{"count": n, "latest": [...]}`` (newest first).
+    """
+    init_database()
+    data = request.get_json(force=True, silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"message": "Request body must be a JSON object."}), 400
+    raw_ids = data.get("equipment_ids") or []
+    if not isinstance(raw_ids, list):
+        return jsonify({"message": "equipment_ids must be a list."}), 400
+    try:
+        ids = sorted({int(i) for i in raw_ids})
+        latest_n = int(data.get("latest", 3))
+    except (TypeError, ValueError):
+        return jsonify({"message": "equipment_ids and latest must be integers."}), 400
+    if len(ids) > COMMENTS_BATCH_MAX_IDS:
+        return jsonify({"message": f"At most {COMMENTS_BATCH_MAX_IDS} equipment_ids per request."}), 400
+    latest_n = max(0, min(latest_n, COMMENTS_BATCH_MAX_LATEST))
+
+    result = {eid: {"count": 0, "latest": []} for eid in ids}
+    if not ids:
+        return jsonify({})
+
+    if latest_n == 0:
+        counts = db.session.execute(
+            db.select(Comment.equipment_id, func.count(Comment.id))
+            .where(Comment.equipment_id.in_(ids))
+            .group_by(Comment.equipment_id)
+        )
+        for eid, count in counts:
+            result[eid]["count"] = count
+    elif _supports_window_functions():
+        # One query: rank comments per equipment and carry the partition count
+        partition = {"partition_by": Comment.equipment_id}
+        ranked = (
+            db.select(
+                Comment.id, Comment.equipment_id, Comment.user_id, Comment.comment_text, Comment.created_at,
+                func.row_number().over(**partition, order_by=(desc(Comment.created_at), desc(Comment.id))).label("rn"),
+                func.count(Comment.id).over(**partition).label("cnt"),
+            )
+            .where(Comment.equipment_id.in_(ids))
+            .subquery()
+        )
+        rows = db.session.execute(
+            db.select(ranked, User.username)
+            .outerjoin(User, User.id == ranked.c.user_id)
+            .where(ranked.c.rn <= latest_n)
+            .order_by(ranked.c.equipment_id, ranked.c.rn)
+        )
+        for row in rows:
+            entry = result[row.equipment_id]
+            entry["count"] = row.cnt
+            entry["latest"].append(_comment_json(row))
+    else:
+        # Old SQLite: one grouped count plus one ordered scan, trimmed here
+        counts = db.session.execute(
+            db.select(Comment.equipment_id, func.count(Comment.id))
+            .where(Comment.equipment_id.in_(ids))
+            .group_by(Comment.equipment_id)
+        )
+        for eid, count in counts:
+            result[eid]["count"] = count
+        rows = db.session.execute(
+            db.select(
+                Comment.id, Comment.equipment_id, Comment.user_id, Comment.comment_text, Comment.created_at,
+                User.username,
+            )
+            .outerjoin(User, User.id == Comment.user_id)
+            .where(Comment.equipment_id.in_(ids))
+            .order_by(Comment.equipment_id, desc(Comment.created_at), desc(Comment.id))
+        )
+        for row in rows:
+            latest = result[row.equipment_id]["latest"]
+            if len(latest) < latest_n:
+                latest.append(_comment_json(row))
+
+    return jsonify({str(eid): entry for eid, entry in result.items()})
 
 @app.route("/api/comments", methods=["POST"])
 @jwt_required()
 def add_comment():
     init_database()
-    identity = get_jwt_identity()
-    try:
-        uid = int(identity)
-    except Exception:
+    user = token_user()
+    if user is None:
         return jsonify({"message": "Invalid token."}), 401
-    user = db.get_or_404(User, uid)
 
     data = request.get_json(force=True)
     equipment_id = data.get("equipment_id")
@@ -516,6 +703,8 @@ def add_comment():
 
     comment = Comment(equipment_id=equipment_id, user_id=user.id, comment_text=text)
     db.session.add(comment)
+    db.session.flush()
+    record_change(db.session, ChangeLog, "new_comment", new_comment_payload(comment, user.username), comment.equipment_id)
     db.session.commit()
 
     return jsonify({
@@ -531,22 +720,58 @@ def add_comment():
 @jwt_required()
 def delete_comment(cid: int):
     init_database()
-    identity = get_jwt_identity()
-    try:
-        uid = int(identity)
-    except Exception:
+    user = token_user()
+    if user is None:
         return jsonify({"message": "Invalid token."}), 401
-    user = db.get_or_404(User, uid)
 
     comment = db.get_or_404(Comment, cid)
     if comment.user_id != user.id and user.role != "admin":
         return jsonify({"message": "Not allowed."}), 403
 
+    equipment_id = comment.equipment_id
     db.session.delete(comment)
+    record_change(db.session, ChangeLog, "comment_deleted", comment_deleted_payload(cid, equipment_id), equipment_id)
     db.session.commit()
 
     return jsonify({"message": "Deleted."})
 
+# Live updates without Socket.IO: Server-Sent Events backed by the change log.
+# Each stream ends before the function time limit; EventSource reconnects and
+# resumes from Last-Event-ID.
+@app.route("/api/stream/token", methods=["POST"])
+@jwt_required()
+def stream_token():
+    return stream_token_response(int(os.getenv("STREAM_TOKEN_SECONDS", 60)))
+
+@app.route("/api/stream", methods=["GET"])
+def stream():
+    init_database()
+    # Logout here does not revoke tokens, so there is no revocation to check
+    args, error = stream_request_args(is_revoked=lambda jti: False)
+    if error:
+        return error
+    _, last_id, equipment_ids = args
+    return sse_response(change_stream(
+        db.session,
+        ChangeLog,
+        last_id,
+        equipment_ids,
+        max_seconds=int(os.getenv("STREAM_MAX_SECONDS", 25)),
+        poll_interval=float(os.getenv("STREAM_POLL_SECONDS", 1.0)),
+    ))
+
+# Several API calls in one round trip (one cold start / init_database)
+@app.route("/api/batch", methods=["POST"])
+@jwt_required()
+def batch():
+    init_database()
+    data = request.get_json(silent=True)
+    items, error = parse_batch(data, int(os.getenv("BATCH_MAX_REQUESTS", 20)))
+    if error:
+        return jsonify({"message": error}), 400
+    results = run_batch(app, items, forwarded_headers(), parallel=bool(data.get("parallel")), workers=int(os.getenv("BATCH_MAX_WORKERS", 4)))
+    return jsonify({"responses": results})
+
 # Export app for Vercel
 # Vercel will automatically detect the Flask app
 if __name__ == "__main__":
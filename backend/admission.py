@@ -0,0 +1,362 @@
+import logging
+import math
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+from flask import g, jsonify, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+from .passwords import _in_eventlet_greenthread
+
+
+logger = logging.getLogger(__name__)
+
+# Route classes, by view function name (works for blueprint and plain endpoints)
+HEAVY_READ_ENDPOINTS = {"export_equipment", "list_changes", "batch_comments"}
+IMPORT_ENDPOINTS = {"import_excel", "bulk_update_equipment", "bulk_delete_equipment"}
+# Never limited: health checks, scrapes and static files
+EXEMPT_ENDPOINTS = {"health", "pool_health", "metrics", "static"}
+# Classes that also need a slot in the global heavy-operation semaphore
+HEAVY_CLASSES = {"heavy_read", "import"}
+ADMISSION_BACKENDS = ("memory", "redis")
+
+
+def _sleep(seconds: float) -> None:
+    """Sleep without blocking the eventlet hub when called from a greenthread."""
+    if _in_eventlet_greenthread():
+        import eventlet
+
+        eventlet.sleep(seconds)
+    else:
+        time.sleep(seconds)
+
+
+def route_class(endpoint: str) -> str:
+    name = endpoint.rsplit(".", 1)[-1]
+    if name in IMPORT_ENDPOINTS:
+        return "import"
+    if name in HEAVY_READ_ENDPOINTS:
+        return "heavy_read"
+    return "read"
+
+
+class MemoryBackend:
+    """Token buckets and the heavy-operation semaphore for one process.
+
+    The eventlet server does not monkey-patch ``threading``, so a greenthread
+    never blocks on the semaphore (that would freeze every other greenthread,
+    the slot holders included); it polls with ``eventlet.sleep`` instead.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, poll_interval: float = 0.05):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.poll_interval = poll_interval
+        self.in_flight = 0
+        self.waiting = 0
+        self._buckets: Dict[str, tuple] = {}
+        self._slots = threading.Semaphore(max_concurrency)
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        """Spend one token; returns 0 if allowed, else seconds until one is available."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if len(self._buckets) > 10000:
+                # Buckets idle long enough to be full again carry no state
+                for k, (t, u) in list(self._buckets.items()):
+                    if t + (now - u) * rate >= burst:
+                        self._buckets.pop(k, None)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                return 0.0
+            self._buckets[key] = (tokens, now)
+            return (1 - tokens) / rate
+
+    def acquire(self, timeout: float) -> Optional[str]:
+        """A heavy-operation slot, waiting up to ``timeout``; None if full or timed out."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                if self.waiting >= self.max_queue:
+                    return None
+                self.waiting += 1
+            try:
+                acquired = self._wait_for_slot(timeout)
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+            if not acquired:
+                return None
+        with self._lock:
+            self.in_flight += 1
+        return "slot"
+
+    def _wait_for_slot(self, timeout: float) -> bool:
+        if not _in_eventlet_greenthread():
+            return self._slots.acquire(timeout=timeout)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            _sleep(self.poll_interval)
+            if self._slots.acquire(blocking=False):
+                return True
+        return False
+
+    def release(self, slot: str) -> None:
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": self.in_flight, "waiting": self.waiting, "capacity": self.max_concurrency}
+
+
+# KEYS[1] bucket; ARGV rate/s, burst. Uses the server clock so instances agree.
+TOKEN_BUCKET_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + (now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+else
+  wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+# KEYS[1] lease set; ARGV lease id, capacity, lease seconds. Expired leases
+# (from a crashed instance) are dropped before counting.
+ACQUIRE_LEASE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[2]) then
+  redis.call('ZADD', KEYS[1], now + tonumber(ARGV[3]), ARGV[1])
+  return 1
+end
+return 0
+"""
+
+
+class RedisBackend:
+    """Token buckets and heavy-operation leases shared through Redis.
+
+    Buckets and the semaphore are global across instances; ``waiting`` is
+    this instance's own queue. Leases expire after ``lease_seconds`` so a
+    crashed instance cannot hold slots forever.
+    """
+
+    def __init__(self, url: str, max_concurrency: int, max_queue: int, lease_seconds: float,
+                 prefix: str = "admission", poll_interval: float = 0.05):
+        try:
+            import redis
+        except ImportError as exc:  # pragma: no cover - optional dependency
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package") from exc
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.lease_seconds = lease_seconds
+        self.prefix = prefix
+        self.poll_interval = poll_interval
+        self.waiting = 0
+        self._redis = redis.Redis.from_url(url)
+        self._take = self._redis.register_script(TOKEN_BUCKET_SCRIPT)
+        self._acquire = self._redis.register_script(ACQUIRE_LEASE_SCRIPT)
+        self._lock = threading.Lock()
+
+    @property
+    def _lease_key(self) -> str:
+        return f"{self.prefix}:heavy"
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        return float(self._take(keys=[f"{self.prefix}:bucket:{key}"], args=[rate, burst]))
+
+    def _try_acquire(self, lease: str) -> bool:
+        return bool(self._acquire(keys=[self._lease_key], args=[lease, self.max_concurrency, self.lease_seconds]))
+
+    def acquire(self, timeout: float) -> Optional[str]:
+        lease = uuid.uuid4().hex
+        if self._try_acquire(lease):
+            return lease
+        with self._lock:
+            if self.waiting >= self.max_queue:
+                return None
+            self.waiting += 1
+        try:
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                _sleep(self.poll_interval)
+                if self._try_acquire(lease):
+                    return lease
+            return None
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+    def release(self, lease: str) -> None:
+        try:
+            self._redis.zrem(self._lease_key, lease)
+        except Exception:
+            # The lease expires on its own after lease_seconds
+            logger.exception("Could not release heavy-operation lease %s", lease)
+
+    def stats(self) -> Dict[str, int]:
+        try:
+            in_flight = int(self._redis.zcount(self._lease_key, time.time(), "+inf"))
+        except Exception:
+            in_flight = -1
+        return {"in_flight": in_flight, "waiting": self.waiting, "capacity": self.max_concurrency}
+
+
+class AdmissionControl:
+    """Per-identity token buckets by route class, plus a global cap on heavy work.
+
+    Over the rate limit a request gets 429; when no heavy slot frees up
+    within ``queue_timeout`` (or the wait queue is full) it gets 503. Both
+    carry ``Retry-After``.
+    """
+
+    def __init__(self, backend, limits: Dict[str, tuple], queue_timeout: float, retry_after: int):
+        self.backend = backend
+        self.limits = limits  # route class -> (tokens per second, burst)
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.rejected: Dict[tuple, int] = {}
+
+    def _reject(self, reason: str, cls: str, status: int, message: str, retry_after: float):
+        key = (reason, cls)
+        self.rejected[key] = self.rejected.get(key, 0) + 1
+        response = jsonify({"message": message})
+        response.status_code = status
+        response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+        return response
+
+    def before_request(self):
+        if request.method == "OPTIONS" or request.endpoint is None:
+            return None
+        if request.endpoint.rsplit(".", 1)[-1] in EXEMPT_ENDPOINTS:
+            return None
+        cls = route_class(request.endpoint)
+        rate, burst = self.limits[cls]
+        try:
+            wait = self.backend.take(f"{cls}:{_caller_key()}", rate, burst)
+            slot = self.backend.acquire(self.queue_timeout) if wait <= 0 and cls in HEAVY_CLASSES else None
+        except Exception:
+            # Fail open: a limiter outage must not take the API down with it
+            logger.exception("Admission backend unavailable; admitting %s %s", request.method, request.path)
+            return None
+        if wait > 0:
+            return self._reject("rate_limited", cls, 429, "Too many requests. Please slow down.", wait)
+        if cls in HEAVY_CLASSES:
+            if slot is None:
+                return self._reject("overloaded", cls, 503, "Server is busy with other heavy operations. Try again shortly.", self.retry_after)
+            g.admission_slot = slot
+        return None
+
+    def after_request(self, response):
+        slot = g.pop("admission_slot", None)
+        if slot is None:
+            return response
+        if response.is_streamed and not response.direct_passthrough:
+            # Generated bodies (CSV export) do their work while being sent,
+            # so they keep the slot until the server closes the iterator
+            response.call_on_close(lambda: self.backend.release(slot))
+        else:
+            # Buffered bodies are already built. File responses (XLSX export)
+            # are passed straight to the server, which skips close callbacks.
+            self.backend.release(slot)
+        return response
+
+    def teardown_request(self, exc):
+        slot = g.pop("admission_slot", None)
+        if slot is not None:
+            self.backend.release(slot)
+
+    def render_metrics(self) -> str:
+        stats = self.backend.stats()
+        lines = [
+            "# HELP admission_heavy_in_flight Heavy operations (imports, exports) running now.",
+            "# TYPE admission_heavy_in_flight gauge",
+            f"admission_heavy_in_flight {stats['in_flight']}",
+            "# HELP admission_heavy_waiting Requests queued for a heavy-operation slot on this instance.",
+            "# TYPE admission_heavy_waiting gauge",
+            f"admission_heavy_waiting {stats['waiting']}",
+            "# HELP admission_heavy_capacity Concurrent heavy operations allowed.",
+            "# TYPE admission_heavy_capacity gauge",
+            f"admission_heavy_capacity {stats['capacity']}",
+            "# HELP admission_rejected_total Requests refused with 429 (rate_limited) or 503 (overloaded).",
+            "# TYPE admission_rejected_total counter",
+        ]
+        for (reason, cls), count in sorted(list(self.rejected.items())):
+            lines.append(f'admission_rejected_total{{reason="{reason}",route_class="{cls}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+def _caller_key() -> str:
+    """JWT identity when the request carries a valid token, else the client address."""
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        # Invalid/expired tokens are rejected by the view itself
+        identity = None
+    if identity is not None:
+        return f"user:{identity}"
+    return f"ip:{request.remote_addr}"
+
+
+def create_admission_backend(config):
+    kind = config.get("RATE_LIMIT_BACKEND", "memory")
+    if kind not in ADMISSION_BACKENDS:
+        raise ValueError(f"Unknown RATE_LIMIT_BACKEND '{kind}'. Choose one of: {', '.join(ADMISSION_BACKENDS)}")
+    max_concurrency = int(config.get("HEAVY_MAX_CONCURRENCY", 4))
+    max_queue = int(config.get("HEAVY_MAX_QUEUE", 16))
+    if kind == "redis":
+        return RedisBackend(
+            config.get("RATE_LIMIT_REDIS_URL") or "redis://localhost:6379/0",
+            max_concurrency,
+            max_queue,
+            float(config.get("HEAVY_LEASE_SECONDS", 900)),
+        )
+    return MemoryBackend(max_concurrency, max_queue)
+
+
+def init_admission(app) -> Optional[AdmissionControl]:
+    """Rate limiting and heavy-operation admission; off unless RATE_LIMIT_ENABLED."""
+    if not app.config.get("RATE_LIMIT_ENABLED", False):
+        return None
+
+    def limit(name: str, per_minute: float, burst: float) -> tuple:
+        return (
+            float(app.config.get(f"RATE_LIMIT_{name}_PER_MIN", per_minute)) / 60,
+            float(app.config.get(f"RATE_LIMIT_{name}_BURST", burst)),
+        )
+
+    control = AdmissionControl(
+        create_admission_backend(app.config),
+        limits={
+            "read": limit("READ", 600, 100),
+            "heavy_read": limit("HEAVY_READ", 20, 5),
+            "import": limit("IMPORT", 6, 3),
+        },
+        queue_timeout=float(app.config.get("HEAVY_QUEUE_TIMEOUT", 10)),
+        retry_after=int(app.config.get("HEAVY_RETRY_AFTER", 5)),
+    )
+    app.extensions["admission"] = control
+    app.before_request(control.before_request)
+    app.after_request(control.after_request)
+    app.teardown_request(control.teardown_request)
+    from .metrics import register_metrics_collector
+
+    register_metrics_collector(app, control.render_metrics)
+    return control
@@ -1,20 +1,32 @@
 import os
 from typing import Optional
 
-from flask import Flask, jsonify
+from flask import Flask, current_app, jsonify
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from flask_socketio import SocketIO
 from dotenv import load_dotenv
 
 from .config import config_by_name
-from .database import configure_database
+from .database import STICKY_HEADER, configure_database, init_pool_metrics, init_read_replica, init_sqlite_tuning, pool_metrics
 from .models import db, User, Equipment, Comment
+from .lookups import lookup_ids, migrate_equipment_lookups
 from .auth import auth_bp
-from .equipment import equipment_bp
+from .authz import init_authz
+from .passwords import init_password_hasher, password_method
+from .equipment import equipment_bp, init_equipment_snapshot
 from .comments import comments_bp
-from .socketio_events import init_socketio, register_socket_handlers, broadcast_new_comment, broadcast_comment_deleted
-from .utils import hash_password
+from .stream import stream_bp
+from .batch import batch_bp
+from .admission import init_admission
+from .compression import init_compression
+from .cpu_profiler import init_cpu_profiler
+from .metrics import init_metrics
+from .sql_profiler import init_sql_profiler
+from .sync import ensure_sequence
+from .events import create_event_bus, socketio_queue_options
+from .socketio_events import init_socketio, register_socket_handlers
+from .utils import hash_password, VALID_STATUSES
 
 socketio: Optional[SocketIO] = None
 
@@ -30,12 +42,22 @@ def create_app(config_name: str | None = None) -> Flask:
 
     # Init extensions
     db.init_app(app)
-    JWTManager(app)
+    init_pool_metrics(app, db)
+    init_sqlite_tuning(app, db)
+    init_read_replica(app)
+    jwt = JWTManager(app)
+    init_authz(app, jwt)
+    init_password_hasher(app)
+    init_metrics(app)
+    init_sql_profiler(app)
+    init_admission(app)
+    init_compression(app)
+    init_equipment_snapshot(app)
     # CORS configuration - allow all origins in dev, or use configured origins
     cors_origins = app.config.get("CORS_ORIGINS", ["*"])
     if isinstance(cors_origins, str):
         cors_origins = [origin.strip() for origin in cors_origins.split(",")] if cors_origins else ["*"]
-    CORS(app, resources={r"/api/*": {"origins": cors_origins, "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"], "allow_headers": ["Content-Type", "Authorization"]}})
+    CORS(app, resources={r"/api/*": {"origins": cors_origins, "methods": ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"], "allow_headers": ["Content-Type", "Authorization", STICKY_HEADER], "expose_headers": [STICKY_HEADER]}})
 
     # Uploads directory (optional): keep directory for potential storage, but use request.files directly
     if not os.path.isdir(app.config["UPLOADED_EXCELS_DEST"]):
@@ -45,6 +67,11 @@ def create_app(config_name: str | None = None) -> Flask:
     app.register_blueprint(auth_bp)
     app.register_blueprint(equipment_bp)
     app.register_blueprint(comments_bp)
+    app.register_blueprint(stream_bp)
+    app.register_blueprint(batch_bp)
+
+    # Sampling CPU profiler around the whole WSGI app (wrap before Socket.IO does)
+    init_cpu_profiler(app)
 
     # DB create
     with app.app_context():
@@ -63,24 +90,44 @@ def create_app(config_name: str | None = None) -> Flask:
                     conn.exec_driver_sql("ALTER TABLE equipment ADD COLUMN extra TEXT")
             except Exception:
                 pass
+        # Delta sync: equipment.version (backfilled by ensure_sequence below)
+        if 'version' not in {c['name'] for c in db.inspect(db.engine).get_columns('equipment')}:
+            with db.engine.begin() as conn:
+                conn.exec_driver_sql("ALTER TABLE equipment ADD COLUMN version BIGINT NOT NULL DEFAULT 0")
+        # Role-change marker compared against token iat (backend.authz)
+        if 'role_changed_at' not in {c['name'] for c in db.inspect(db.engine).get_columns('users')}:
+            with db.engine.begin() as conn:
+                conn.exec_driver_sql("ALTER TABLE users ADD COLUMN role_changed_at TIMESTAMP")
+        # Dictionary-encoded status/category/location (text columns -> lookup tables)
+        migrate_equipment_lookups(db.engine)
+        # Indexes added after the tables were first created
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(db.engine, checkfirst=True)
+        ensure_sequence()
         seed_data()
 
     # SocketIO
     global socketio
-    socketio = SocketIO(app, cors_allowed_origins=app.config.get("CORS_ORIGINS", ["*"]), async_mode="eventlet")
-    init_socketio(socketio)
+    socketio = SocketIO(
+        app,
+        cors_allowed_origins=app.config.get("CORS_ORIGINS", ["*"]),
+        async_mode="eventlet",
+        **socketio_queue_options(app.config),
+    )
+    init_socketio(socketio, create_event_bus(app.config, socketio), app.config.get("SOCKETIO_COUNT_FLUSH_MS", 250) / 1000)
     register_socket_handlers(socketio)
 
-    # Hook comment create/delete to broadcast
-    @app.after_request
-    def after_request(response):
-        return response
-
     # Health check
     @app.get("/api/health")
     def health():
         return jsonify({"status": "ok"})
 
+    # Connection pool checkout wait time and saturation
+    @app.get("/api/health/pool")
+    def pool_health():
+        return jsonify(pool_metrics(app))
+
     return app
 
 
@@ -90,7 +137,7 @@ def seed_data():
         admin = User(
             username="admin",
             email="admin@example.com",
-            password=hash_password("Admin@123"),
+            password=hash_password("Admin@123", password_method(current_app.config)),
             full_name="Administrator",
             role="admin",
         )
@@ -99,12 +146,15 @@ def seed_data():
         user = User(
             username="user",
             email="user@example.com",
-            password=hash_password("User@123"),
+            password=hash_password("User@123", password_method(current_app.config)),
             full_name="Standard User",
             role="user",
         )
         db.session.add(user)
 
+    # Known statuses, so new rows can default to Active
+    lookup_ids(db.session, "status", sorted(VALID_STATUSES))
+
     # Equipment
     if not db.session.scalar(db.select(Equipment)):
         samples = [
@@ -0,0 +1,470 @@
+"""ASGI entry point with async SQLAlchemy sessions.
+
+    uvicorn backend.asgi:app --host 0.0.0.0 --port 8000 --workers 4
+
+The auth, equipment and comment routes the dashboard calls most are served
+natively on asyncio with ``AsyncSession`` (aiosqlite for SQLite, asyncpg for
+PostgreSQL), so a request waiting on the database no longer holds a worker.
+Every other route (import/export, bulk operations, /api/batch, /api/stream,
+health) falls through to the Flask app, which keeps Socket.IO on the eventlet
+server; writes made here reach live clients through the change log (SSE).
+"""
+from contextlib import asynccontextmanager
+from functools import wraps
+from typing import Optional
+
+import jwt as pyjwt
+from a2wsgi import WSGIMiddleware
+from flask_jwt_extended import create_access_token, decode_token
+from sqlalchemy import event, func, or_, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+
+from .app import app as flask_app
+from .authz import (
+    CachedUser,
+    Principal,
+    cached_user,
+    expired_revocations,
+    auth_markers,
+    principal_for,
+    revoked_token_row,
+    trusted_principal,
+    user_cache,
+)
+from .comments import COMMENTS_MAX_LIMIT, _comment_json, comments_page_json, comments_stmt, page_comments_stmt
+from .database import apply_sqlite_tuning, enable_sqlite_foreign_keys, get_async_engine_options, to_async_database_uri
+from .equipment import (
+    CHANGES_DEFAULT_LIMIT,
+    CHANGES_MAX_LIMIT,
+    UPDATABLE_FIELDS,
+    apply_filters,
+    changes_json,
+    changes_statements,
+    equipment_json,
+    list_page_json,
+)
+from .models import ChangeLog, Comment, Equipment, RevokedToken, User
+from .passwords import HashingBusy, needs_rehash, password_method
+from .socketio_events import comment_deleted_payload, new_comment_payload
+from .stream import record_change
+from .sync import version_equipment_changes
+from .utils import hash_password, is_valid_email, verify_password
+
+
+config = flask_app.config
+
+
+class AsyncWorkerSession(Session):
+    """Sync session class behind each AsyncSession; carries the sync hooks."""
+
+
+event.listen(AsyncWorkerSession, "before_flush", version_equipment_changes)
+
+
+def create_engine_for(config):
+    uri = config["SQLALCHEMY_DATABASE_URI"]
+    engine = create_async_engine(
+        to_async_database_uri(uri),
+        **get_async_engine_options(config.get("DB_POOL_PROFILE", "server"), uri, config),
+    )
+    enable_sqlite_foreign_keys(engine.sync_engine)
+    apply_sqlite_tuning(engine.sync_engine, config)
+    return engine
+
+
+engine = create_engine_for(config)
+SessionLocal = async_sessionmaker(engine, expire_on_commit=False, sync_session_class=AsyncWorkerSession)
+
+
+def message(text: str, status: int) -> JSONResponse:
+    return JSONResponse({"message": text}, status_code=status)
+
+
+def busy_response() -> JSONResponse:
+    return JSONResponse(
+        {"message": "Too many sign-in attempts in progress. Please retry shortly."},
+        status_code=503,
+        headers={"Retry-After": "1"},
+    )
+
+
+def jwt_required(view):
+    """Verify the Bearer token exactly as Flask-JWT-Extended would."""
+    @wraps(view)
+    async def wrapper(request: Request):
+        auth = request.headers.get("Authorization", "")
+        if not auth.startswith("Bearer "):
+            return JSONResponse({"msg": "Missing Authorization Header"}, status_code=401)
+        try:
+            with flask_app.app_context():
+                claims = decode_token(auth[7:])
+        except pyjwt.ExpiredSignatureError:
+            return JSONResponse({"msg": "Token has expired"}, status_code=401)
+        except Exception as exc:
+            return JSONResponse({"msg": str(exc) or "Invalid token"}, status_code=422)
+        if claims.get("type") != "access":
+            return JSONResponse({"msg": "Only non-refresh tokens are allowed"}, status_code=422)
+        if await is_token_revoked(claims.get("jti")):
+            return JSONResponse({"msg": "Token has been revoked"}, status_code=401)
+        request.state.claims = claims
+        return await view(request)
+    return wrapper
+
+
+async def is_token_revoked(jti: Optional[str]) -> bool:
+    if auth_markers.stale():
+        revoked, changed = auth_markers.statements()
+        async with SessionLocal() as session:
+            auth_markers.load(await session.scalars(revoked), await session.execute(changed))
+    return bool(jti) and jti in auth_markers.revoked
+
+
+async def load_user(session, uid: int) -> Optional[CachedUser]:
+    cached = user_cache.get(uid)
+    if cached is not None:
+        return cached
+    user = await session.get(User, uid)
+    return cached_user(user) if user is not None else None
+
+
+async def current_principal(request: Request, session) -> Optional[Principal]:
+    try:
+        uid = int(request.state.claims["sub"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    principal = trusted_principal(uid, request.state.claims)
+    if principal is not None:
+        return principal
+    return principal_for(await load_user(session, uid))
+
+
+async def json_body(request: Request) -> dict:
+    try:
+        data = await request.json()
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def hasher():
+    return flask_app.extensions["password_hasher"]
+
+
+# Auth
+
+async def register(request: Request):
+    data = await json_body(request)
+    username = (data.get("username") or "").strip()
+    email = (data.get("email") or "").strip().lower()
+    password = data.get("password") or ""
+    full_name = (data.get("full_name") or "").strip()
+
+    if len(password) < 6:
+        return message("Password must be at least 6 characters.", 400)
+    if not is_valid_email(email):
+        return message("Invalid email address.", 400)
+    if not username:
+        return message("Username is required.", 400)
+
+    async with SessionLocal() as session:
+        existing = await session.scalar(select(User).where(or_(User.username == username, User.email == email)))
+        if existing:
+            return message("Username or email already in use.", 400)
+        try:
+            hashed = await hasher().run_async(hash_password, password, password_method(config))
+        except HashingBusy:
+            return busy_response()
+        session.add(User(username=username, email=email, password=hashed, full_name=full_name))
+        await session.commit()
+    return message("Registered successfully.", 201)
+
+
+async def login(request: Request):
+    data = await json_body(request)
+    login_id = (data.get("login") or data.get("username") or data.get("email") or "").strip()
+    password = data.get("password") or ""
+    if not login_id or not password:
+        return message("Login and password are required.", 400)
+
+    async with SessionLocal() as session:
+        user = await session.scalar(select(User).where(or_(User.username == login_id, User.email == login_id.lower())))
+        try:
+            valid = user is not None and await hasher().run_async(verify_password, password, user.password)
+        except HashingBusy:
+            return busy_response()
+        if not valid:
+            return message("Invalid credentials.", 401)
+        body = {
+            "id": user.id,
+            "username": user.username,
+            "email": user.email,
+            "full_name": user.full_name,
+            "role": user.role,
+        }
+
+        # Transparently upgrade hashes made with older KDF parameters
+        method = password_method(config)
+        if needs_rehash(user.password, method):
+            try:
+                user.password = await hasher().run_async(hash_password, password, method)
+                await session.commit()
+            except HashingBusy:
+                await session.rollback()
+
+    with flask_app.app_context():
+        token = create_access_token(identity=str(body["id"]), additional_claims={"username": body["username"], "role": body["role"]})
+    return JSONResponse({"access_token": token, "user": body})
+
+
+@jwt_required
+async def logout(request: Request):
+    claims = request.state.claims
+    async with SessionLocal() as session:
+        await session.execute(expired_revocations())
+        await session.merge(revoked_token_row(claims["jti"], claims.get("exp", 0)))
+        await session.commit()
+    return message("Logged out.", 200)
+
+
+@jwt_required
+async def me(request: Request):
+    try:
+        uid = int(request.state.claims["sub"])
+    except (KeyError, TypeError, ValueError):
+        return message("Invalid token.", 401)
+    async with SessionLocal() as session:
+        user = await load_user(session, uid)
+    if user is None:
+        return message("Not found.", 404)
+    return JSONResponse({
+        "id": user.id,
+        "username": user.username,
+        "email": user.email,
+        "full_name": user.full_name,
+        "role": user.role,
+        "created_at": user.created_at.isoformat(),
+    })
+
+
+# Equipment
+
+@jwt_required
+async def list_equipment(request: Request):
+    page = int(request.query_params.get("page", 1))
+    per_page = int(request.query_params.get("per_page", 20))
+
+    async with SessionLocal() as session:
+        stmt = apply_filters(select(Equipment), request.query_params)
+        total = await session.scalar(select(func.count()).select_from(stmt.subquery())) or 0
+        stmt = stmt.order_by(Equipment.updated_at.desc(), Equipment.id.desc()).limit(per_page).offset((page - 1) * per_page)
+        items = (await session.scalars(stmt)).all()
+        # Comment counts for this page only
+        counts_by_id = {}
+        if items:
+            rows = await session.execute(
+                select(Comment.equipment_id, func.count(Comment.id))
+                .where(Comment.equipment_id.in_([e.id for e in items]))
+                .group_by(Comment.equipment_id)
+            )
+            counts_by_id = dict(rows.all())
+    return JSONResponse(list_page_json(items, counts_by_id, page, per_page, total))
+
+
+@jwt_required
+async def list_changes(request: Request):
+    try:
+        since = int(request.query_params.get("since", 0))
+        limit = int(request.query_params.get("limit", CHANGES_DEFAULT_LIMIT))
+    except ValueError:
+        return message("since and limit must be integers.", 400)
+    limit = max(1, min(limit, CHANGES_MAX_LIMIT))
+
+    rows_stmt, tombstones_stmt = changes_statements(since, limit)
+    async with SessionLocal() as session:
+        rows = (await session.scalars(rows_stmt)).all()
+        tombstones = (await session.scalars(tombstones_stmt)).all()
+    return JSONResponse(changes_json(rows, tombstones, since, limit))
+
+
+@jwt_required
+async def get_equipment(request: Request):
+    async with SessionLocal() as session:
+        e = await session.get(Equipment, request.path_params["eid"])
+    if e is None:
+        return message("Not found.", 404)
+    return JSONResponse(equipment_json(e))
+
+
+@jwt_required
+async def update_equipment(request: Request):
+    async with SessionLocal() as session:
+        principal = await current_principal(request, session)
+        if principal is None:
+            return message("Invalid token.", 401)
+        e = await session.get(Equipment, request.path_params["eid"])
+        if e is None:
+            return message("Not found.", 404)
+        data = await json_body(request)
+        if not principal.is_admin():
+            return message("Only admins can update.", 403)
+
+        def apply_changes(sync_session):
+            # Lookup-backed fields may query or insert their lookup row
+            for field in UPDATABLE_FIELDS:
+                if field in data:
+                    setattr(e, field, data[field])
+
+        await session.run_sync(apply_changes)
+        await session.commit()
+    return message("Updated.", 200)
+
+
+@jwt_required
+async def delete_equipment(request: Request):
+    async with SessionLocal() as session:
+        principal = await current_principal(request, session)
+        if principal is None:
+            return message("Invalid token.", 401)
+        if not principal.is_admin():
+            return message("Only admins can delete.", 403)
+        e = await session.get(Equipment, request.path_params["eid"])
+        if e is None:
+            return message("Not found.", 404)
+        await session.delete(e)
+        await session.commit()
+    return message("Deleted.", 200)
+
+
+# Comments
+
+@jwt_required
+async def list_comments(request: Request):
+    eid = request.path_params["eid"]
+    params = request.query_params
+    try:
+        limit = int(params["limit"]) if "limit" in params else None
+    except ValueError:
+        limit = None
+    cursor = params.get("cursor")
+    since = params.get("since")
+    paged = "limit" in params or cursor is not None or since is not None
+
+    async with SessionLocal() as session:
+        if await session.get(Equipment, eid) is None:
+            return message("Not found.", 404)
+        stmt = comments_stmt(eid)
+        if not paged:
+            return JSONResponse([_comment_json(r) for r in (await session.execute(stmt)).all()])
+        limit = max(1, min(limit or 50, COMMENTS_MAX_LIMIT))
+        stmt, error = page_comments_stmt(stmt, limit, cursor, since)
+        if error:
+            return message(error, 400)
+        rows = (await session.execute(stmt)).all()
+    return JSONResponse(comments_page_json(rows, limit, cursor, since))
+
+
+@jwt_required
+async def add_comment(request: Request):
+    async with SessionLocal() as session:
+        user = await current_principal(request, session)
+        if user is None:
+            return message("Invalid token.", 401)
+        data = await json_body(request)
+        equipment_id = data.get("equipment_id")
+        text = (data.get("comment_text") or "").strip()
+        if not equipment_id:
+            return message("equipment_id is required.", 400)
+        if not text:
+            return message("comment_text is required.", 400)
+        if await session.get(Equipment, equipment_id) is None:
+            return message("Not found.", 404)
+
+        comment = Comment(equipment_id=equipment_id, user_id=user.id, comment_text=text)
+        session.add(comment)
+        await session.flush()
+        payload = new_comment_payload(comment, user.username)
+        await session.run_sync(lambda s: record_change(
+            s, ChangeLog, "new_comment", payload, comment.equipment_id, config.get("CHANGE_LOG_RETENTION_HOURS", 24),
+        ))
+        await session.commit()
+    return JSONResponse({
+        "id": comment.id,
+        "equipment_id": comment.equipment_id,
+        "user_id": comment.user_id,
+        "username": user.username,
+        "comment_text": comment.comment_text,
+        "created_at": comment.created_at.isoformat(),
+    }, status_code=201)
+
+
+@jwt_required
+async def delete_comment(request: Request):
+    cid = request.path_params["cid"]
+    async with SessionLocal() as session:
+        user = await current_principal(request, session)
+        if user is None:
+            return message("Invalid token.", 401)
+        comment = await session.get(Comment, cid)
+        if comment is None:
+            return message("Not found.", 404)
+        if comment.user_id != user.id and not user.is_admin():
+            return message("Not allowed.", 403)
+        equipment_id = comment.equipment_id
+        await session.delete(comment)
+        await session.run_sync(lambda s: record_change(
+            s, ChangeLog, "comment_deleted", comment_deleted_payload(cid, equipment_id), equipment_id,
+            config.get("CHANGE_LOG_RETENTION_HOURS", 24),
+        ))
+        await session.commit()
+    return message("Deleted.", 200)
+
+
+routes = [
+    Route("/api/auth/register", register, methods=["POST"]),
+    Route("/api/auth/login", login, methods=["POST"]),
+    Route("/api/auth/logout", logout, methods=["POST"]),
+    Route("/api/auth/me", me, methods=["GET"]),
+    Route("/api/equipment", list_equipment, methods=["GET"]),
+    Route("/api/equipment/changes", list_changes, methods=["GET"]),
+    Route("/api/equipment/{eid:int}", get_equipment, methods=["GET"]),
+    Route("/api/equipment/{eid:int}", update_equipment, methods=["PUT"]),
+    Route("/api/equipment/{eid:int}", delete_equipment, methods=["DELETE"]),
+    Route("/api/comments/equipment/{eid:int}", list_comments, methods=["GET"]),
+    Route("/api/comments", add_comment, methods=["POST"]),
+    Route("/api/comments/{cid:int}", delete_comment, methods=["DELETE"]),
+    # Everything else is served by the Flask app in a thread pool
+    Mount("/", app=WSGIMiddleware(flask_app)),
+]
+
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    await engine.dispose()
+
+
+middleware = [Middleware(
+    CORSMiddleware,
+    allow_origins=config.get("CORS_ORIGINS", ["*"]),
+    allow_methods=["*"],
+    allow_headers=["*"],
+    allow_credentials=True,
+)]
+if config.get("COMPRESSION_ENABLED", True):
+    # gzip for the native routes; Flask responses arrive already encoded
+    # (br/zstd/gzip) and are passed through untouched
+    middleware.append(Middleware(
+        GZipMiddleware,
+        minimum_size=int(config.get("COMPRESSION_MIN_SIZE", 1024)),
+        compresslevel=int(config.get("COMPRESSION_GZIP_LEVEL", 6)),
+    ))
+
+app = Starlette(routes=routes, middleware=middleware, lifespan=lifespan)
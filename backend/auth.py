@@ -1,18 +1,27 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import (
     create_access_token,
+    get_jwt,
     get_jwt_identity,
     jwt_required,
 )
 from sqlalchemy import or_
 
+from .authz import load_user, revoke_token
 from .models import db, User
-from .utils import hash_password, verify_password, is_valid_email
+from .passwords import HashingBusy, hash_password_offloaded, needs_rehash, verify_password_offloaded
+from .utils import is_valid_email
 
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/api/auth")
 
 
+def _busy_response():
+    response = jsonify({"message": "Too many sign-in attempts in progress. Please retry shortly."})
+    response.headers["Retry-After"] = "1"
+    return response, 503
+
+
 @auth_bp.post("/register")
 def register():
     try:
@@ -33,11 +42,14 @@ def register():
         if existing:
             return jsonify({"message": "Username or email already in use."}), 400
 
-        user = User(username=username, email=email, password=hash_password(password), full_name=full_name)
+        user = User(username=username, email=email, password=hash_password_offloaded(password), full_name=full_name)
         db.session.add(user)
         db.session.commit()
 
         return jsonify({"message": "Registered successfully."}), 201
+    except HashingBusy:
+        db.session.rollback()
+        return _busy_response()
     except Exception as e:
         db.session.rollback()
         return jsonify({"message": f"Registration failed: {str(e)}"}), 500
@@ -54,9 +66,18 @@ def login():
             return jsonify({"message": "Login and password are required."}), 400
 
         user = db.session.scalar(db.select(User).where(or_(User.username == login_id, User.email == login_id.lower())))
-        if not user or not verify_password(password, user.password):
+        if not user or not verify_password_offloaded(password, user.password):
             return jsonify({"message": "Invalid credentials."}), 401
 
+        # Transparently upgrade hashes made with older KDF parameters;
+        # if the hashing pool is saturated, try again on a later login
+        if needs_rehash(user.password):
+            try:
+                user.password = hash_password_offloaded(password)
+                db.session.commit()
+            except HashingBusy:
+                db.session.rollback()
+
         # Use string subject for compatibility; put extras in additional claims
         token = create_access_token(
             identity=str(user.id),
@@ -73,6 +94,9 @@ def login():
                 "role": user.role,
             }
         })
+    except HashingBusy:
+        db.session.rollback()
+        return _busy_response()
     except Exception as e:
         return jsonify({"message": f"Login failed: {str(e)}"}), 500
 
@@ -80,7 +104,9 @@ def login():
 @auth_bp.post("/logout")
 @jwt_required()
 def logout():
-    # Stateless JWT: client should delete token; implement token blocklist if needed
+    # Revoke this token; the blocklist is checked on every @jwt_required request
+    claims = get_jwt()
+    revoke_token(claims["jti"], claims.get("exp", 0))
     return jsonify({"message": "Logged out."})
 
 
@@ -92,7 +118,9 @@ def me():
         uid = int(identity)
     except Exception:
         return jsonify({"message": "Invalid token."}), 401
-    user = db.get_or_404(User, uid)
+    user = load_user(uid)
+    if user is None:
+        return jsonify({"message": "Not found."}), 404
     return jsonify({
         "id": user.id,
         "username": user.username,
@@ -0,0 +1,240 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Hashable, NamedTuple, Optional, Set, Tuple
+
+from flask_jwt_extended import JWTManager, get_jwt, get_jwt_identity
+from sqlalchemy import delete, event, inspect, select
+
+from .models import db, RevokedToken, User
+
+
+class Principal(NamedTuple):
+    """Caller identity as far as authorization needs it."""
+
+    id: int
+    username: str
+    role: str
+
+    def is_admin(self) -> bool:
+        return self.role == "admin"
+
+
+class CachedUser(NamedTuple):
+    id: int
+    username: str
+    email: str
+    full_name: Optional[str]
+    role: str
+    created_at: object
+
+
+class TTLCache:
+    """Small TTL cache shared by all requests in the process."""
+
+    def __init__(self, ttl: float = 60.0, max_size: int = 1024):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._items: Dict[Hashable, Tuple[float, object]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable):
+        entry = self._items.get(key)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    def put(self, key: Hashable, value) -> None:
+        with self._lock:
+            if len(self._items) >= self.max_size:
+                now = time.monotonic()
+                for k in [k for k, (exp, _) in self._items.items() if exp <= now] or list(self._items)[: self.max_size // 4]:
+                    self._items.pop(k, None)
+            self._items[key] = (time.monotonic() + self.ttl, value)
+
+    def evict(self, key: Hashable) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+# Users by id, for /me and for tokens the markers below say to distrust
+user_cache = TTLCache()
+
+
+class AuthMarkers:
+    """Revoked token ids and recent role changes, as last read from the database.
+
+    Refreshed with two small queries at most once per ``ttl`` seconds, however
+    many users and tokens are seen, so logouts and role changes made by any
+    worker, the serverless app or a script apply here within ``ttl``
+    (AUTH_REVOCATION_TTL). Changes made by this process apply at once.
+    Only role changes newer than the longest token lifetime are kept: older
+    ones cannot affect a token that still verifies.
+    """
+
+    def __init__(self, ttl: float = 5.0, horizon: timedelta = timedelta(hours=8)):
+        self.ttl = ttl
+        self.horizon = horizon
+        self.revoked: Set[str] = set()
+        self.role_changed: Dict[int, float] = {}
+        self.expires = 0.0
+        # Entries recorded by this process, kept across refreshes that may
+        # have raced their commit: jti -> token expiry, user id -> change time
+        self._local_revoked: Dict[str, float] = {}
+        self._local_changed: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def stale(self) -> bool:
+        return time.monotonic() >= self.expires
+
+    def statements(self):
+        now = datetime.utcnow()
+        return (
+            select(RevokedToken.jti).where(RevokedToken.expires_at > now),
+            select(User.id, User.role_changed_at).where(User.role_changed_at > now - self.horizon),
+        )
+
+    def load(self, jtis, changes) -> None:
+        now = time.time()
+        with self._lock:
+            for jti, exp in list(self._local_revoked.items()):
+                if exp <= now:
+                    self._local_revoked.pop(jti, None)
+            cutoff = now - self.horizon.total_seconds()
+            for uid, at in list(self._local_changed.items()):
+                if at <= cutoff:
+                    self._local_changed.pop(uid, None)
+            self.revoked = set(jtis) | set(self._local_revoked)
+            role_changed = {uid: _epoch(at) for uid, at in changes}
+            for uid, at in self._local_changed.items():
+                role_changed[uid] = max(at, role_changed.get(uid, at))
+            self.role_changed = role_changed
+            self.expires = time.monotonic() + self.ttl
+
+    def refresh(self, session) -> None:
+        if self.stale():
+            revoked, changed = self.statements()
+            self.load(session.scalars(revoked), session.execute(changed))
+
+    def note_revoked(self, jti: str, expires_at: float) -> None:
+        with self._lock:
+            self._local_revoked[jti] = expires_at
+            self.revoked = self.revoked | {jti}
+
+    def note_role_changed(self, uid: int, at: float) -> None:
+        with self._lock:
+            self._local_changed[uid] = at
+            self.role_changed = {**self.role_changed, uid: at}
+
+
+auth_markers = AuthMarkers()
+
+
+def _epoch(value: datetime) -> float:
+    # Stored naive UTC, like every other timestamp here
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+def cached_user(user: User) -> CachedUser:
+    cached = CachedUser(user.id, user.username, user.email, user.full_name, user.role, user.created_at)
+    user_cache.put(user.id, cached)
+    return cached
+
+
+def revoked_token_row(jti: str, expires_at: float) -> RevokedToken:
+    auth_markers.note_revoked(jti, expires_at)
+    return RevokedToken(jti=jti, expires_at=datetime.utcfromtimestamp(expires_at))
+
+
+def expired_revocations():
+    """DELETE for revocations of tokens that have expired on their own."""
+    return delete(RevokedToken).where(RevokedToken.expires_at <= datetime.utcnow())
+
+
+def revoke_token(jti: str, expires_at: float) -> None:
+    db.session.execute(expired_revocations())
+    db.session.merge(revoked_token_row(jti, expires_at))
+    db.session.commit()
+
+
+def is_token_revoked(jti: Optional[str]) -> bool:
+    auth_markers.refresh(db.session)
+    return bool(jti) and jti in auth_markers.revoked
+
+
+def load_user(uid: int) -> Optional[CachedUser]:
+    cached = user_cache.get(uid)
+    if cached is not None:
+        return cached
+    user = db.session.get(User, uid)
+    return cached_user(user) if user is not None else None
+
+
+def principal_for(user: Optional[CachedUser]) -> Optional[Principal]:
+    return Principal(user.id, user.username, user.role) if user is not None else None
+
+
+def trusted_principal(uid: int, claims: Dict) -> Optional[Principal]:
+    """Principal built from token claims alone, if they can still be trusted.
+
+    Call after the markers were refreshed (``is_token_revoked`` does, for
+    every verified token).
+    """
+    changed_at = auth_markers.role_changed.get(uid)
+    if "role" in claims and "username" in claims and (changed_at is None or claims.get("iat", 0) > changed_at):
+        return Principal(uid, claims["username"], claims["role"])
+    return None
+
+
+def current_principal() -> Optional[Principal]:
+    """Identity of the verified token, or None if the token is unusable.
+
+    Role and username come straight from the token's claims; the user is only
+    looked up (through the TTL cache) for tokens issued before the user's
+    role or username last changed, or that predate those claims.
+    """
+    try:
+        uid = int(get_jwt_identity())
+    except (TypeError, ValueError):
+        return None
+    principal = trusted_principal(uid, get_jwt())
+    if principal is not None:
+        return principal
+    return principal_for(load_user(uid))
+
+
+@event.listens_for(User, "before_update")
+def _stamp_role_change(mapper, connection, target):
+    state = inspect(target)
+    if state.attrs.role.history.has_changes() or state.attrs.username.history.has_changes():
+        target.role_changed_at = datetime.utcnow()
+
+
+@event.listens_for(User, "after_update")
+def _on_user_update(mapper, connection, target):
+    # Other processes see the marker within AUTH_REVOCATION_TTL
+    if target.role_changed_at is not None:
+        auth_markers.note_role_changed(target.id, _epoch(target.role_changed_at))
+    user_cache.evict(target.id)
+
+
+@event.listens_for(User, "after_delete")
+def _on_user_delete(mapper, connection, target):
+    auth_markers.note_role_changed(target.id, time.time())
+    user_cache.evict(target.id)
+
+
+def init_authz(app, jwt: JWTManager) -> None:
+    user_cache.ttl = float(app.config.get("AUTH_USER_CACHE_TTL", 60))
+    auth_markers.ttl = float(app.config.get("AUTH_REVOCATION_TTL", 5))
+    expires = app.config.get("JWT_ACCESS_TOKEN_EXPIRES")
+    if isinstance(expires, timedelta):
+        auth_markers.horizon = expires
+
+    @jwt.token_in_blocklist_loader
+    def _check_revoked(jwt_header, jwt_payload):
+        return is_token_revoked(jwt_payload.get("jti"))
@@ -0,0 +1,160 @@
+import base64
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from flask import Blueprint, Flask, current_app, g, jsonify, request
+from flask_jwt_extended import jwt_required
+from werkzeug.test import EnvironBuilder
+
+from .passwords import _in_eventlet_greenthread
+
+
+logger = logging.getLogger(__name__)
+
+batch_bp = Blueprint("batch", __name__, url_prefix="/api")
+
+BATCH_METHODS = {"GET", "POST", "PUT", "PATCH", "DELETE"}
+# Sub-requests that cannot be answered inside a batch
+BATCH_EXCLUDED_PATHS = ("/api/batch", "/api/stream")
+# Headers forwarded from the batch request to every sub-request
+FORWARDED_HEADERS = ("Authorization", "Accept-Language", "User-Agent")
+
+
+def parse_batch(data, max_requests: int) -> Tuple[Optional[List[Dict]], Optional[str]]:
+    """Validate a batch body; returns (sub-requests, error message)."""
+    items = (data or {}).get("requests") if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return None, "requests must be a non-empty list."
+    if len(items) > max_requests:
+        return None, f"At most {max_requests} requests per batch."
+    parsed = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            return None, f"requests[{index}] must be an object."
+        method = str(item.get("method") or "GET").upper()
+        path = str(item.get("path") or "")
+        if method not in BATCH_METHODS:
+            return None, f"requests[{index}]: unsupported method {method}."
+        if not path.startswith("/api/") or path.split("?", 1)[0].rstrip("/") in BATCH_EXCLUDED_PATHS:
+            return None, f"requests[{index}]: path {path!r} is not allowed in a batch."
+        parsed.append({"id": item.get("id", index), "method": method, "path": path, "body": item.get("body")})
+    return parsed, None
+
+
+def _session(app: Flask):
+    # Works for whichever Flask-SQLAlchemy instance the app was set up with
+    return app.extensions["sqlalchemy"].session
+
+
+def _response_json(item: Dict, response) -> Dict:
+    result = {"id": item["id"], "status": response.status_code}
+    if response.is_json:
+        result["body"] = response.get_json()
+    else:
+        # send_file responses stream from a file object; buffer them here
+        response.direct_passthrough = False
+        result["content_type"] = response.mimetype
+        result["body"] = base64.b64encode(response.get_data()).decode()
+        result["encoding"] = "base64"
+    response.close()
+    return result
+
+
+def dispatch(app: Flask, item: Dict, headers: Dict[str, str]) -> Dict:
+    """Run one sub-request through the app's normal routing and hooks.
+
+    Inside an existing app context the sub-request shares it (and with it
+    the DB session); otherwise it gets a fresh one.
+    """
+    path, _, query = item["path"].partition("?")
+    builder = EnvironBuilder(
+        path=path,
+        query_string=query,
+        method=item["method"],
+        headers=headers,
+        json=item["body"] if item["body"] is not None else None,
+    )
+    # @read_replica sets this per view; don't let it leak into a later write
+    g.pop("db_use_replica", None)
+    try:
+        with app.request_context(builder.get_environ()):
+            response = app.full_dispatch_request()
+    except Exception:
+        logger.exception("Batch sub-request %s %s failed", item["method"], item["path"])
+        _session(app).rollback()
+        return {"id": item["id"], "status": 500, "body": {"message": "Internal server error."}}
+    finally:
+        builder.close()
+    if response.status_code >= 500:
+        _session(app).rollback()
+    return _response_json(item, response)
+
+
+def _dispatch_isolated(app: Flask, item: Dict, headers: Dict[str, str]) -> Dict:
+    with app.app_context():
+        return dispatch(app, item, headers)
+
+
+def _map_parallel(app: Flask, items: List[Dict], headers: Dict[str, str], workers: int) -> List[Dict]:
+    if _in_eventlet_greenthread():
+        import eventlet
+
+        pool = eventlet.GreenPool(workers)
+        return list(pool.imap(lambda item: _dispatch_isolated(app, item, headers), items))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda item: _dispatch_isolated(app, item, headers), items))
+
+
+def run_batch(app: Flask, items: List[Dict], headers: Dict[str, str], parallel: bool = False, workers: int = 4) -> List[Dict]:
+    """Run sub-requests in order and return their responses in the same order.
+
+    Sequential sub-requests share the caller's app context and DB session.
+    With ``parallel``, each run of consecutive GETs executes concurrently,
+    each in its own app context and session; writes are barriers, so a GET
+    listed after a write still sees it.
+    """
+    results: List[Dict] = []
+    index = 0
+    while index < len(items):
+        if parallel and items[index]["method"] == "GET":
+            end = index
+            while end < len(items) and items[end]["method"] == "GET":
+                end += 1
+            reads = items[index:end]
+            if len(reads) > 1:
+                # Parallel reads open their own sessions; publish prior writes first
+                _session(app).commit()
+                results.extend(_map_parallel(app, reads, headers, min(workers, len(reads))))
+                index = end
+                continue
+        results.append(dispatch(app, items[index], headers))
+        index += 1
+    return results
+
+
+def forwarded_headers() -> Dict[str, str]:
+    return {name: request.headers[name] for name in FORWARDED_HEADERS if name in request.headers}
+
+
+@batch_bp.post("/batch")
+@jwt_required()
+def batch():
+    """Run several API calls in one round trip.
+
+    Body: ``{"requests": [{"id", "method", "path", "body"}], "parallel": bool}``.
+    The batch's Authorization header is checked once up front and forwarded
+    to every sub-request, which is authorised as usual.
+    """
+    data = request.get_json(silent=True)
+    items, error = parse_batch(data, int(current_app.config.get("BATCH_MAX_REQUESTS", 20)))
+    if error:
+        return jsonify({"message": error}), 400
+    results = run_batch(
+        current_app._get_current_object(),
+        items,
+        forwarded_headers(),
+        parallel=bool(data.get("parallel")),
+        workers=int(current_app.config.get("BATCH_MAX_WORKERS", 4)),
+    )
+    return jsonify({"responses": results})
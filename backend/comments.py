@@ -1,46 +1,238 @@
-from flask import Blueprint, jsonify, request
-from flask_jwt_extended import get_jwt_identity, jwt_required
-from sqlalchemy import desc
+import base64
+import sqlite3
+from datetime import datetime
+from typing import Optional
 
-from .models import db, Comment, Equipment, User
-from .socketio_events import broadcast_new_comment, broadcast_comment_deleted
+from flask import Blueprint, current_app, jsonify, request
+from flask_jwt_extended import jwt_required
+from sqlalchemy import and_, desc, func, or_
+
+from .authz import current_principal
+from .database import read_replica
+from .models import db, ChangeLog, Comment, Equipment, User
+from .socketio_events import (
+    broadcast_comment_deleted,
+    broadcast_new_comment,
+    comment_deleted_payload,
+    new_comment_payload,
+)
+from .stream import record_change
 
 
 comments_bp = Blueprint("comments", __name__, url_prefix="/api/comments")
 
 
+COMMENTS_MAX_LIMIT = 200
+
+
+def _encode_cursor(created_at, cid: int) -> str:
+    raw = f"{created_at.isoformat()}|{cid}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(token: str):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        ts, cid = raw.rsplit("|", 1)
+        return datetime.fromisoformat(ts), int(cid)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _comment_json(row) -> dict:
+    return {
+        "id": row.id,
+        "equipment_id": row.equipment_id,
+        "user_id": row.user_id,
+        "username": row.username or "",
+        "comment_text": row.comment_text,
+        "created_at": row.created_at.isoformat(),
+    }
+
+
+def comments_stmt(eid: int):
+    """Newest-first comments of one equipment, projecting only the author's username."""
+    return (
+        db.select(
+            Comment.id, Comment.equipment_id, Comment.user_id, Comment.comment_text, Comment.created_at,
+            User.username,
+        )
+        .outerjoin(User, User.id == Comment.user_id)
+        .where(Comment.equipment_id == eid)
+        .order_by(desc(Comment.created_at), desc(Comment.id))
+    )
+
+
+def page_comments_stmt(stmt, limit: int, cursor: Optional[str], since: Optional[str]):
+    """Narrow ``comments_stmt`` to one page; returns (stmt, error message)."""
+    if since:
+        # Walk forward from the client's newest comment so no gap is skipped
+        # when more than ``limit`` comments arrived; repeat while has_more.
+        key = _decode_cursor(since)
+        if key is None:
+            return None, "Invalid since cursor."
+        ts, cid = key
+        stmt = stmt.where(or_(Comment.created_at > ts, and_(Comment.created_at == ts, Comment.id > cid)))
+        stmt = stmt.order_by(None).order_by(Comment.created_at, Comment.id)
+    elif cursor:
+        key = _decode_cursor(cursor)
+        if key is None:
+            return None, "Invalid cursor."
+        ts, cid = key
+        stmt = stmt.where(or_(Comment.created_at < ts, and_(Comment.created_at == ts, Comment.id < cid)))
+    return stmt.limit(limit + 1), None
+
+
+def comments_page_json(rows, limit: int, cursor: Optional[str], since: Optional[str]) -> dict:
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if since:
+        return {
+            "items": [_comment_json(r) for r in reversed(rows)],
+            "next_cursor": None,
+            "latest_cursor": _encode_cursor(rows[-1].created_at, rows[-1].id) if rows else since,
+            "has_more": has_more,
+        }
+    return {
+        "items": [_comment_json(r) for r in rows],
+        "next_cursor": _encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None,
+        # Only the first page knows the newest comment
+        "latest_cursor": _encode_cursor(rows[0].created_at, rows[0].id) if rows and not cursor else None,
+        "has_more": has_more,
+    }
+
+
 @comments_bp.get("/equipment/<int:eid>")
 @jwt_required()
+@read_replica
 def list_comments(eid: int):
+    """Newest-first comments for one equipment item.
+
+    Without paging parameters the full list is returned (legacy shape). With
+    ``limit``, ``cursor`` or ``since`` the response is an envelope with
+    ``items``, ``next_cursor`` (older page) and ``latest_cursor`` (pass as
+    ``since`` to fetch only comments newer than the newest one seen).
+    """
     db.get_or_404(Equipment, eid)
-    comments = db.session.scalars(
-        db.select(Comment).where(Comment.equipment_id == eid).order_by(desc(Comment.created_at))
-    ).all()
-    user_ids = {c.user_id for c in comments}
-    users = {u.id: u for u in db.session.scalars(db.select(User).where(User.id.in_(user_ids))).all()}
-
-    return jsonify([
-        {
-            "id": c.id,
-            "equipment_id": c.equipment_id,
-            "user_id": c.user_id,
-            "username": users.get(c.user_id).username if users.get(c.user_id) else "",
-            "comment_text": c.comment_text,
-            "created_at": c.created_at.isoformat(),
-        }
-        for c in comments
-    ])
+
+    limit = request.args.get("limit", type=int)
+    cursor = request.args.get("cursor")
+    since = request.args.get("since")
+    paged = limit is not None or cursor is not None or since is not None
+
+    stmt = comments_stmt(eid)
+    if not paged:
+        return jsonify([_comment_json(r) for r in db.session.execute(stmt)])
+
+    limit = max(1, min(limit or 50, COMMENTS_MAX_LIMIT))
+    stmt, error = page_comments_stmt(stmt, limit, cursor, since)
+    if error:
+        return jsonify({"message": error}), 400
+    rows = db.session.execute(stmt).all()
+    return jsonify(comments_page_json(rows, limit, cursor, since))
+
+
+COMMENTS_BATCH_MAX_IDS = 500
+COMMENTS_BATCH_MAX_LATEST = 20
+
+
+def _supports_window_functions() -> bool:
+    dialect = db.session.get_bind().dialect
+    if dialect.name == "sqlite":
+        return sqlite3.sqlite_version_info >= (3, 25, 0)
+    return True
+
+
+@comments_bp.post("/batch")
+@jwt_required()
+@read_replica
+def batch_comments():
+    """Comment counts and the latest N comments for many equipment IDs.
+
+    Body: ``{"equipment_ids": [1, 2, ...], "latest": 3}``. Response maps each
+    requested ID to ``{"count": n, "latest": [...]}`` (newest first).
+    """
+    data = request.get_json(force=True, silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"message": "Request body must be a JSON object."}), 400
+    raw_ids = data.get("equipment_ids") or []
+    if not isinstance(raw_ids, list):
+        return jsonify({"message": "equipment_ids must be a list."}), 400
+    try:
+        ids = sorted({int(i) for i in raw_ids})
+        latest_n = int(data.get("latest", 3))
+    except (TypeError, ValueError):
+        return jsonify({"message": "equipment_ids and latest must be integers."}), 400
+    if len(ids) > COMMENTS_BATCH_MAX_IDS:
+        return jsonify({"message": f"At most {COMMENTS_BATCH_MAX_IDS} equipment_ids per request."}), 400
+    latest_n = max(0, min(latest_n, COMMENTS_BATCH_MAX_LATEST))
+
+    result = {eid: {"count": 0, "latest": []} for eid in ids}
+    if not ids:
+        return jsonify({})
+
+    if latest_n == 0:
+        counts = db.session.execute(
+            db.select(Comment.equipment_id, func.count(Comment.id))
+            .where(Comment.equipment_id.in_(ids))
+            .group_by(Comment.equipment_id)
+        )
+        for eid, count in counts:
+            result[eid]["count"] = count
+    elif _supports_window_functions():
+        # One query: rank comments per equipment and carry the partition count
+        partition = {"partition_by": Comment.equipment_id}
+        ranked = (
+            db.select(
+                Comment.id, Comment.equipment_id, Comment.user_id, Comment.comment_text, Comment.created_at,
+                func.row_number().over(**partition, order_by=(desc(Comment.created_at), desc(Comment.id))).label("rn"),
+                func.count(Comment.id).over(**partition).label("cnt"),
+            )
+            .where(Comment.equipment_id.in_(ids))
+            .subquery()
+        )
+        rows = db.session.execute(
+            db.select(ranked, User.username)
+            .outerjoin(User, User.id == ranked.c.user_id)
+            .where(ranked.c.rn <= latest_n)
+            .order_by(ranked.c.equipment_id, ranked.c.rn)
+        )
+        for row in rows:
+            entry = result[row.equipment_id]
+            entry["count"] = row.cnt
+            entry["latest"].append(_comment_json(row))
+    else:
+        # Old SQLite: one grouped count plus one ordered scan, trimmed here
+        counts = db.session.execute(
+            db.select(Comment.equipment_id, func.count(Comment.id))
+            .where(Comment.equipment_id.in_(ids))
+            .group_by(Comment.equipment_id)
+        )
+        for eid, count in counts:
+            result[eid]["count"] = count
+        rows = db.session.execute(
+            db.select(
+                Comment.id, Comment.equipment_id, Comment.user_id, Comment.comment_text, Comment.created_at,
+                User.username,
+            )
+            .outerjoin(User, User.id == Comment.user_id)
+            .where(Comment.equipment_id.in_(ids))
+            .order_by(Comment.equipment_id, desc(Comment.created_at), desc(Comment.id))
+        )
+        for row in rows:
+            latest = result[row.equipment_id]["latest"]
+            if len(latest) < latest_n:
+                latest.append(_comment_json(row))
+
+    return jsonify({str(eid): entry for eid, entry in result.items()})
 
 
 @comments_bp.post("")
 @jwt_required()
 def add_comment():
-    identity = get_jwt_identity()
-    try:
-        uid = int(identity)
-    except Exception:
+    user = current_principal()
+    if user is None:
         return jsonify({"message": "Invalid token."}), 401
-    user = db.get_or_404(User, uid)
 
     data = request.get_json(force=True)
     equipment_id = data.get("equipment_id")
@@ -54,9 +246,14 @@ def add_comment():
 
     comment = Comment(equipment_id=equipment_id, user_id=user.id, comment_text=text)
     db.session.add(comment)
+    db.session.flush()
+    record_change(
+        db.session, ChangeLog, "new_comment", new_comment_payload(comment, user.username), comment.equipment_id,
+        current_app.config.get("CHANGE_LOG_RETENTION_HOURS", 24),
+    )
     db.session.commit()
 
-    broadcast_new_comment(comment)
+    broadcast_new_comment(comment, user.username)
 
     return jsonify({
         "id": comment.id,
@@ -71,19 +268,20 @@ def add_comment():
 @comments_bp.delete("/<int:cid>")
 @jwt_required()
 def delete_comment(cid: int):
-    identity = get_jwt_identity()
-    try:
-        uid = int(identity)
-    except Exception:
+    user = current_principal()
+    if user is None:
         return jsonify({"message": "Invalid token."}), 401
-    user = db.get_or_404(User, uid)
 
     comment = db.get_or_404(Comment, cid)
-    if comment.user_id != user.id and user.role != "admin":
+    if comment.user_id != user.id and not user.is_admin():
         return jsonify({"message": "Not allowed."}), 403
 
     equipment_id = comment.equipment_id
     db.session.delete(comment)
+    record_change(
+        db.session, ChangeLog, "comment_deleted", comment_deleted_payload(cid, equipment_id), equipment_id,
+        current_app.config.get("CHANGE_LOG_RETENTION_HOURS", 24),
+    )
     db.session.commit()
 
     broadcast_comment_deleted(cid, equipment_id)
@@ -0,0 +1,165 @@
+import zlib
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from flask import request
+
+try:  # Optional: Content-Encoding: br
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:  # Optional: Content-Encoding: zstd
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+
+# Only text-like payloads shrink; XLSX/ZIP/images are already compressed and
+# event streams must reach the client frame by frame
+COMPRESSIBLE_TYPES = {
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/css",
+    "text/csv",
+    "text/html",
+    "text/javascript",
+    "text/plain",
+    "text/xml",
+}
+
+# (compress chunk, finish) pair for one response body
+StreamEncoder = Tuple[Callable[[bytes], bytes], Callable[[], bytes]]
+
+
+def _gzip_encoder(level: int) -> StreamEncoder:
+    obj = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    return obj.compress, obj.flush
+
+
+def _brotli_encoder(level: int) -> StreamEncoder:
+    obj = brotli.Compressor(quality=level)
+    return obj.process, obj.finish
+
+
+def _zstd_encoder(level: int) -> StreamEncoder:
+    obj = zstandard.ZstdCompressor(level=level).compressobj()
+    return obj.compress, obj.flush
+
+
+def available_encoders() -> Dict[str, Callable[[int], StreamEncoder]]:
+    encoders = {"gzip": _gzip_encoder}
+    if brotli is not None:
+        encoders["br"] = _brotli_encoder
+    if zstandard is not None:
+        encoders["zstd"] = _zstd_encoder
+    return encoders
+
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """``Accept-Encoding`` as {coding: q}; malformed q-values count as 0."""
+    accepted = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate(header: Optional[str], preference: List[str]) -> Optional[str]:
+    """Best coding the client accepts; ties go to the server's preference order."""
+    accepted = parse_accept_encoding(header)
+    best, best_q = None, 0.0
+    for coding in preference:
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress_bytes(data: bytes, coding: str, level: int) -> bytes:
+    compress, finish = available_encoders()[coding](level)
+    return compress(data) + finish()
+
+
+def compress_stream(chunks: Iterable[bytes], coding: str, level: int) -> Iterator[bytes]:
+    compress, finish = available_encoders()[coding](level)
+    for chunk in chunks:
+        out = compress(chunk)
+        if out:
+            yield out
+    yield finish()
+
+
+class ResponseCompressor:
+    """``after_request`` hook applying negotiated br/zstd/gzip encoding.
+
+    Buffered bodies under ``min_size`` bytes, or that would not get smaller,
+    are sent as-is. Streamed bodies (generators, ``send_file``) are encoded
+    chunk by chunk without buffering.
+    """
+
+    def __init__(self, preference: List[str], min_size: int, levels: Dict[str, int]):
+        encoders = available_encoders()
+        self.preference = [c for c in preference if c in encoders]
+        self.min_size = min_size
+        self.levels = levels
+
+    def __call__(self, response):
+        if request.method == "HEAD" or response.status_code < 200 or response.status_code in (204, 206, 304):
+            return response
+        if "Content-Encoding" in response.headers or response.mimetype not in COMPRESSIBLE_TYPES:
+            return response
+        response.vary.add("Accept-Encoding")
+        coding = negotiate(request.headers.get("Accept-Encoding"), self.preference)
+        if coding is None:
+            return response
+        level = self.levels[coding]
+
+        if response.is_streamed or response.direct_passthrough:
+            response.response = compress_stream(response.iter_encoded(), coding, level)
+            response.direct_passthrough = False
+            response.headers.pop("Content-Length", None)
+            response.headers.pop("Accept-Ranges", None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            compressed = compress_bytes(data, coding, level)
+            if len(compressed) >= len(data):
+                return response
+            response.set_data(compressed)
+
+        response.headers["Content-Encoding"] = coding
+        etag = response.headers.get("ETag")
+        if etag and not etag.startswith("W/"):
+            # The encoded body is a different representation
+            response.headers["ETag"] = "W/" + etag
+        return response
+
+
+def init_compression(app) -> Optional[ResponseCompressor]:
+    if not app.config.get("COMPRESSION_ENABLED", True):
+        return None
+    compressor = ResponseCompressor(
+        preference=[c.strip() for c in app.config.get("COMPRESSION_ALGORITHMS", "zstd,br,gzip").split(",") if c.strip()],
+        min_size=int(app.config.get("COMPRESSION_MIN_SIZE", 1024)),
+        levels={
+            "gzip": int(app.config.get("COMPRESSION_GZIP_LEVEL", 6)),
+            "br": int(app.config.get("COMPRESSION_BROTLI_QUALITY", 4)),
+            "zstd": int(app.config.get("COMPRESSION_ZSTD_LEVEL", 3)),
+        },
+    )
+    app.after_request(compressor)
+    app.extensions["compression"] = compressor
+    return compressor
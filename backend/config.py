@@ -1,10 +1,23 @@
 import os
+import tempfile
 from datetime import timedelta
 
 class Config:
     SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-change")
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "dev-jwt-secret-change")
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=8)
+    AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL", 60))  # seconds
+    # How stale this worker's view of logouts and role changes made elsewhere
+    # may get (seconds); each refresh is two small queries per process
+    AUTH_REVOCATION_TTL = float(os.getenv("AUTH_REVOCATION_TTL", 5))
+
+    # Password hashing: KDF cost (existing hashes are upgraded on next login)
+    # and the bounded worker pool that keeps hashing off the request loop
+    PASSWORD_HASH_ALGORITHM = os.getenv("PASSWORD_HASH_ALGORITHM", "sha256")
+    PASSWORD_HASH_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", 600000))
+    PASSWORD_HASH_OFFLOAD = os.getenv("PASSWORD_HASH_OFFLOAD", "1") not in ("0", "false", "False")
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 0))  # 0 = CPU count
+    PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", 32))
 
     SQLALCHEMY_DATABASE_URI = os.getenv(
         "DATABASE_URL",
@@ -13,6 +26,23 @@ class Config:
     SQLALCHEMY_ECHO = False
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Connection pooling profile: server | serverless | pgbouncer | default
+    DB_POOL_PROFILE = os.getenv("DB_POOL_PROFILE", "server")
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))  # seconds
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))  # seconds
+
+    # Read replica (DATABASE_READ_URL); a user's reads stay on the primary this long after their own write
+    DB_READ_STICKY_SECONDS = int(os.getenv("DB_READ_STICKY_SECONDS", 10))
+
+    # SQLite tuning (WAL + pragmas), applied on connect; ignored for other databases
+    SQLITE_TUNING = os.getenv("SQLITE_TUNING", "1") not in ("0", "false", "False")
+    SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", -64000))  # negative = KiB, i.e. 64MB
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))  # bytes
+    SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", 5000))  # ms
+    SQLITE_OPTIMIZE_INTERVAL = int(os.getenv("SQLITE_OPTIMIZE_INTERVAL", 3600))  # seconds, 0 disables
+
     # Uploads
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
     UPLOADED_EXCELS_DEST = os.getenv(
@@ -20,6 +50,85 @@ class Config:
         os.path.join(os.path.dirname(__file__), "uploads")
     )
 
+    # Socket.IO: comment count deltas are batched and flushed at this interval
+    SOCKETIO_COUNT_FLUSH_MS = int(os.getenv("SOCKETIO_COUNT_FLUSH_MS", 250))
+
+    # Event bus for Socket.IO fan-out across workers: local | redis | socketio
+    EVENT_BUS = os.getenv("EVENT_BUS", "local")
+    EVENT_BUS_URL = os.getenv("EVENT_BUS_URL", "redis://localhost:6379/0")
+    EVENT_BUS_CHANNEL = os.getenv("EVENT_BUS_CHANNEL", "equipment-events")
+
+    # Server-Sent Events change stream (/api/stream)
+    STREAM_MAX_SECONDS = int(os.getenv("STREAM_MAX_SECONDS", 25))
+    STREAM_POLL_SECONDS = float(os.getenv("STREAM_POLL_SECONDS", 1.0))
+    STREAM_TOKEN_SECONDS = int(os.getenv("STREAM_TOKEN_SECONDS", 60))  # lifetime of ?token= stream tokens
+    CHANGE_LOG_RETENTION_HOURS = int(os.getenv("CHANGE_LOG_RETENTION_HOURS", 24))
+
+    # POST /api/batch: max sub-requests, and workers for parallel GETs
+    BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", 20))
+    BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", 4))
+
+    # Response compression, negotiated from Accept-Encoding in this order
+    # (br and zstd need the optional brotli / zstandard packages)
+    COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "1") not in ("0", "false", "False")
+    COMPRESSION_ALGORITHMS = os.getenv("COMPRESSION_ALGORITHMS", "zstd,br,gzip")
+    COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))  # bytes
+    COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+    COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 4))
+    COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", 3))
+
+    # Per-route request metrics at /api/metrics (Prometheus text format);
+    # with METRICS_TOKEN set, scrapes must send "Authorization: Bearer <token>"
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") not in ("0", "false", "False")
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+    # Opt-in SQL profiler: logs queries slower than SQL_SLOW_QUERY_MS with their
+    # plan, flags statement shapes repeated SQL_N_PLUS_ONE_THRESHOLD times in one
+    # request (N+1 loops) and adds a Server-Timing header with DB time
+    SQL_PROFILER_ENABLED = os.getenv("SQL_PROFILER_ENABLED", "0") not in ("0", "false", "False")
+    SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", 200))
+    SQL_EXPLAIN_SLOW = os.getenv("SQL_EXPLAIN_SLOW", "1") not in ("0", "false", "False")
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", 10))
+
+    # Sampling CPU profiler: profiles CPU_PROFILER_SAMPLE_RATE of requests under
+    # CPU_PROFILER_ROUTES (path prefixes, empty = all /api) when enabled, and any
+    # request an admin sends with "X-Profile: 1"; keeps the newest MAX_FILES
+    CPU_PROFILER_ENABLED = os.getenv("CPU_PROFILER_ENABLED", "0") not in ("0", "false", "False")
+    CPU_PROFILER_ALLOW_HEADER = os.getenv("CPU_PROFILER_ALLOW_HEADER", "1") not in ("0", "false", "False")
+    CPU_PROFILER_ROUTES = os.getenv("CPU_PROFILER_ROUTES", "/api/equipment/import,/api/equipment/export")
+    CPU_PROFILER_SAMPLE_RATE = float(os.getenv("CPU_PROFILER_SAMPLE_RATE", 0.01))
+    CPU_PROFILER_INTERVAL_MS = float(os.getenv("CPU_PROFILER_INTERVAL_MS", 5))
+    CPU_PROFILER_FORMAT = os.getenv("CPU_PROFILER_FORMAT", "speedscope")  # speedscope | collapsed
+    CPU_PROFILER_DIR = os.getenv("CPU_PROFILER_DIR") or os.path.join(tempfile.gettempdir(), "profiles")
+    CPU_PROFILER_MAX_FILES = int(os.getenv("CPU_PROFILER_MAX_FILES", 200))
+
+    # Admission control (opt-in): token buckets per user and route class
+    # (read / heavy_read = exports / import = imports and bulk edits) answer 429,
+    # and at most HEAVY_MAX_CONCURRENCY heavy operations run at once; others
+    # wait up to HEAVY_QUEUE_TIMEOUT seconds in a queue of HEAVY_MAX_QUEUE, then
+    # get 503. RATE_LIMIT_BACKEND=redis shares both across instances.
+    RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "0") not in ("0", "false", "False")
+    RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")  # memory | redis
+    RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", os.getenv("EVENT_BUS_URL", "redis://localhost:6379/0"))
+    RATE_LIMIT_READ_PER_MIN = float(os.getenv("RATE_LIMIT_READ_PER_MIN", 600))
+    RATE_LIMIT_READ_BURST = float(os.getenv("RATE_LIMIT_READ_BURST", 100))
+    RATE_LIMIT_HEAVY_READ_PER_MIN = float(os.getenv("RATE_LIMIT_HEAVY_READ_PER_MIN", 20))
+    RATE_LIMIT_HEAVY_READ_BURST = float(os.getenv("RATE_LIMIT_HEAVY_READ_BURST", 5))
+    RATE_LIMIT_IMPORT_PER_MIN = float(os.getenv("RATE_LIMIT_IMPORT_PER_MIN", 6))
+    RATE_LIMIT_IMPORT_BURST = float(os.getenv("RATE_LIMIT_IMPORT_BURST", 3))
+    HEAVY_MAX_CONCURRENCY = int(os.getenv("HEAVY_MAX_CONCURRENCY", 4))
+    HEAVY_MAX_QUEUE = int(os.getenv("HEAVY_MAX_QUEUE", 16))
+    HEAVY_QUEUE_TIMEOUT = float(os.getenv("HEAVY_QUEUE_TIMEOUT", 10))  # seconds
+    HEAVY_RETRY_AFTER = int(os.getenv("HEAVY_RETRY_AFTER", 5))  # seconds, sent with 503
+    HEAVY_LEASE_SECONDS = int(os.getenv("HEAVY_LEASE_SECONDS", 900))  # redis: slot expiry if an instance dies
+
+    # In-memory columnar snapshot answering list/facet filtering (NumPy); it
+    # catches up from the sync version and change log on each request, at
+    # most every EQUIPMENT_SNAPSHOT_REFRESH_MS, and is rebuilt every RESYNC_SECONDS
+    EQUIPMENT_SNAPSHOT_ENABLED = os.getenv("EQUIPMENT_SNAPSHOT_ENABLED", "0") not in ("0", "false", "False")
+    EQUIPMENT_SNAPSHOT_REFRESH_MS = float(os.getenv("EQUIPMENT_SNAPSHOT_REFRESH_MS", 0))
+    EQUIPMENT_SNAPSHOT_RESYNC_SECONDS = float(os.getenv("EQUIPMENT_SNAPSHOT_RESYNC_SECONDS", 300))
+
     # CORS
     CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost:5173").split(",")
 
@@ -0,0 +1,266 @@
+import json
+import logging
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+from werkzeug.wsgi import ClosingIterator
+
+
+logger = logging.getLogger(__name__)
+
+# Request header an admin sends to profile that one request
+PROFILE_HEADER = "X-Profile"
+PROFILE_ENVIRON_KEY = "HTTP_" + PROFILE_HEADER.upper().replace("-", "_")
+# Response header naming the file the profile is written to
+PROFILE_FILE_HEADER = "X-Profile-File"
+PROFILE_FORMATS = ("speedscope", "collapsed")
+
+# (function, file, first line) of one code object
+FrameKey = Tuple[str, str, int]
+
+
+def _real_threading():
+    """The OS-level threading module, even under eventlet monkey patching."""
+    if "eventlet" in sys.modules:
+        from eventlet import patcher
+
+        if patcher.is_monkey_patched("thread"):
+            return patcher.original("threading")
+    return threading
+
+
+class StackSampler:
+    """Samples one request's Python stack from a background OS thread.
+
+    The target is identified by its OS thread and the outermost frame of its
+    stack. Under eventlet every greenthread shares the OS thread, so samples
+    whose stack bottoms out elsewhere (another greenthread was running) are
+    dropped rather than misattributed.
+    """
+
+    def __init__(self, interval: float):
+        real = _real_threading()
+        self.interval = interval
+        self.thread_id = real.get_ident()
+        frame = sys._getframe()
+        while frame.f_back is not None:
+            frame = frame.f_back
+        self.root = frame
+        self.samples: Counter = Counter()
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self._done = real.Event()
+        self._thread = real.Thread(target=self._run, name="cpu-profiler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            codes = []
+            while frame is not None:
+                codes.append(frame.f_code)
+                last, frame = frame, frame.f_back
+            if codes and last is self.root:
+                self.samples[tuple(reversed(codes))] += 1
+        self.root = None
+
+    def stop(self) -> None:
+        self.elapsed = time.perf_counter() - self.started
+        self._done.set()
+        self._thread.join()
+
+
+def _frame_key(code) -> FrameKey:
+    return code.co_name, code.co_filename, code.co_firstlineno
+
+
+def to_collapsed(samples: Counter) -> str:
+    """Brendan Gregg's folded format (flamegraph.pl, speedscope, inferno)."""
+    lines = []
+    for stack, count in samples.most_common():
+        names = [f"{name} ({os.path.basename(filename)}:{line})" for name, filename, line in map(_frame_key, stack)]
+        lines.append(f"{';'.join(names)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def to_speedscope(samples: Counter, name: str, interval: float) -> Dict:
+    """A speedscope "sampled" profile (https://www.speedscope.app)."""
+    frames: List[Dict] = []
+    index: Dict[FrameKey, int] = {}
+    stacks, weights = [], []
+    interval_ms = interval * 1000
+    for stack, count in samples.items():
+        row = []
+        for key in map(_frame_key, stack):
+            if key not in index:
+                index[key] = len(frames)
+                frames.append({"name": key[0], "file": key[1], "line": key[2]})
+            row.append(index[key])
+        stacks.append(row)
+        weights.append(count * interval_ms)
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "equipment-management cpu_profiler",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": name,
+            "unit": "milliseconds",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": stacks,
+            "weights": weights,
+        }],
+    }
+
+
+class CPUProfilerMiddleware:
+    """WSGI middleware that samples selected requests and writes one profile each.
+
+    A request is profiled when its path matches ``routes`` (prefixes; empty
+    means every /api path) and either a ``sample_rate`` draw hits, or an admin
+    sent ``X-Profile: 1``. Sampling spans the whole response, including
+    streamed bodies such as the CSV export.
+    """
+
+    def __init__(self, app, wsgi_app, directory: str, routes: List[str], sample_rate: float,
+                 interval: float, fmt: str, max_files: int, allow_header: bool,
+                 is_admin: Callable[[int, Dict], bool]):
+        if fmt not in PROFILE_FORMATS:
+            raise ValueError(f"Unknown CPU_PROFILER_FORMAT '{fmt}'. Choose one of: {', '.join(PROFILE_FORMATS)}")
+        self.app = app
+        self.wsgi_app = wsgi_app
+        self.directory = directory
+        self.routes = routes
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.format = fmt
+        self.max_files = max_files
+        self.allow_header = allow_header
+        self.is_admin = is_admin
+        self._prune_lock = threading.Lock()
+
+    def _wanted(self, environ) -> bool:
+        path = environ.get("PATH_INFO", "")
+        if not any(path.startswith(prefix) for prefix in self.routes or ["/api/"]):
+            return False
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        if self.allow_header and environ.get(PROFILE_ENVIRON_KEY, "").lower() in ("1", "true", "yes"):
+            return self._is_admin(environ.get("HTTP_AUTHORIZATION", ""))
+        return False
+
+    def _is_admin(self, auth: str) -> bool:
+        if not auth.startswith("Bearer "):
+            return False
+        from flask_jwt_extended import decode_token
+
+        try:
+            with self.app.app_context():
+                claims = decode_token(auth[7:])
+                if claims.get("type") != "access":
+                    return False
+                return self.is_admin(int(claims[self.app.config.get("JWT_IDENTITY_CLAIM", "sub")]), claims)
+        except Exception:
+            return False
+
+    def __call__(self, environ, start_response):
+        if not self._wanted(environ):
+            return self.wsgi_app(environ, start_response)
+
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", environ.get("PATH_INFO", "")).strip("_")[:80]
+        extension = "speedscope.json" if self.format == "speedscope" else "folded"
+        filename = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{random.getrandbits(24):06x}-{environ.get('REQUEST_METHOD', 'GET')}-{slug}.{extension}"
+
+        def profiled_start_response(status, headers, exc_info=None):
+            return start_response(status, headers + [(PROFILE_FILE_HEADER, filename)], exc_info)
+
+        sampler = StackSampler(self.interval)
+        try:
+            app_iter = self.wsgi_app(environ, profiled_start_response)
+        except BaseException:
+            self._finish(sampler, filename, environ)
+            raise
+        return ClosingIterator(app_iter, [lambda: self._finish(sampler, filename, environ)])
+
+    def _finish(self, sampler: StackSampler, filename: str, environ) -> None:
+        sampler.stop()
+        name = f"{environ.get('REQUEST_METHOD', 'GET')} {environ.get('PATH_INFO', '')} ({sampler.elapsed * 1000:.0f} ms)"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, filename)
+            with open(path, "w") as f:
+                if self.format == "speedscope":
+                    json.dump(to_speedscope(sampler.samples, name, self.interval), f)
+                else:
+                    f.write(to_collapsed(sampler.samples))
+            self._prune()
+        except OSError:
+            logger.exception("Could not write CPU profile %s", filename)
+
+    def _prune(self) -> None:
+        """Keep only the newest ``max_files`` profiles."""
+        if not self._prune_lock.acquire(blocking=False):
+            return
+        try:
+            entries = [e for e in os.scandir(self.directory) if e.is_file() and e.name.endswith((".speedscope.json", ".folded"))]
+            if len(entries) <= self.max_files:
+                return
+            entries.sort(key=lambda e: e.stat().st_mtime)
+            for entry in entries[: len(entries) - self.max_files]:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+        finally:
+            self._prune_lock.release()
+
+
+def token_user_is_admin(uid: int, claims: Dict) -> bool:
+    """Admin check for ``X-Profile`` against the backend app's users and revocations."""
+    from .authz import is_token_revoked, load_user, trusted_principal
+
+    if is_token_revoked(claims.get("jti")):
+        return False
+    principal = trusted_principal(uid, claims)
+    if principal is not None:
+        return principal.is_admin()
+    user = load_user(uid)
+    return user is not None and user.role == "admin"
+
+
+def init_cpu_profiler(app, is_admin: Optional[Callable[[int, Dict], bool]] = None) -> Optional[CPUProfilerMiddleware]:
+    """Wrap ``app.wsgi_app`` with the sampling profiler.
+
+    Installed when CPU_PROFILER_ENABLED (random sampling) or
+    CPU_PROFILER_ALLOW_HEADER (admin ``X-Profile`` requests) is on.
+    ``is_admin(user_id, claims)`` decides who may send the header; apps with
+    their own user table pass their own check.
+    """
+    enabled = app.config.get("CPU_PROFILER_ENABLED", False)
+    allow_header = app.config.get("CPU_PROFILER_ALLOW_HEADER", True)
+    if not enabled and not allow_header:
+        return None
+    routes = app.config.get("CPU_PROFILER_ROUTES", "")
+    middleware = CPUProfilerMiddleware(
+        app,
+        app.wsgi_app,
+        directory=app.config.get("CPU_PROFILER_DIR") or os.path.join(tempfile.gettempdir(), "profiles"),
+        routes=[r.strip() for r in routes.split(",") if r.strip()] if isinstance(routes, str) else list(routes),
+        sample_rate=float(app.config.get("CPU_PROFILER_SAMPLE_RATE", 0.01)) if enabled else 0.0,
+        interval=float(app.config.get("CPU_PROFILER_INTERVAL_MS", 5)) / 1000,
+        fmt=app.config.get("CPU_PROFILER_FORMAT", "speedscope"),
+        max_files=int(app.config.get("CPU_PROFILER_MAX_FILES", 200)),
+        allow_header=bool(allow_header),
+        is_admin=is_admin or token_user_is_admin,
+    )
+    app.wsgi_app = middleware
+    return middleware
@@ -1,6 +1,28 @@
 import os
 import pathlib
-from typing import Optional
+import threading
+import time
+import uuid
+from functools import wraps
+from typing import Dict, Optional
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+from itsdangerous import BadData, URLSafeTimedSerializer
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+
+# Named pooling profiles, selected with DB_POOL_PROFILE:
+# - "server": QueuePool sized for the long-running eventlet server
+# - "serverless": NullPool, every request opens/closes its own connection
+# - "pgbouncer": NullPool without pre-ping, and no server-side prepared
+#   statements, which transaction-mode poolers cannot route back to the
+#   backend that prepared them (see pgbouncer_connect_args)
+# - "default": SQLAlchemy defaults plus pre-ping (previous behaviour)
+POOL_PROFILES = ("server", "serverless", "pgbouncer", "default")
 
 
 def normalize_database_url(url: str) -> str:
@@ -29,10 +51,386 @@ def get_database_uri() -> str:
     return get_sqlite_uri()
 
 
+def to_async_database_uri(uri: str) -> str:
+    """Swap a sync driver for its asyncio counterpart (aiosqlite / asyncpg).
+
+    asyncpg takes ``ssl`` rather than libpq's ``sslmode`` query parameter.
+    """
+    url = make_url(uri)
+    if url.get_backend_name() == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    if url.get_backend_name() == "postgresql":
+        query = dict(url.query)
+        if "sslmode" in query:
+            query["ssl"] = query.pop("sslmode")
+        return url.set(drivername="postgresql+asyncpg", query=query).render_as_string(hide_password=False)
+    return uri
+
+
+def get_read_database_uri() -> Optional[str]:
+    env_url = os.getenv("DATABASE_READ_URL")
+    return normalize_database_url(env_url) if env_url else None
+
+
+# Bind key of the optional read replica engine (SQLALCHEMY_BINDS)
+REPLICA_BIND = "replica"
+
+# Response/request header carrying the signed "read from the primary" token
+# issued after a write; the client echoes it so any instance can honour it
+STICKY_HEADER = "X-DB-Read-Primary"
+
+
+def _current_identity() -> Optional[str]:
+    if not has_request_context():
+        return None
+    try:
+        identity = get_jwt_identity()
+    except RuntimeError:
+        return None
+    return str(identity) if identity is not None else None
+
+
+def _sticky_serializer() -> URLSafeTimedSerializer:
+    return URLSafeTimedSerializer(current_app.secret_key, salt="db-read-sticky")
+
+
+def _is_sticky(identity: Optional[str]) -> bool:
+    if identity is None:
+        return False
+    # Wrote earlier in this app context (e.g. a previous batch sub-request)
+    if g.get("db_read_primary"):
+        return True
+    token = request.headers.get(STICKY_HEADER)
+    if not token:
+        return False
+    try:
+        max_age = float(current_app.config.get("DB_READ_STICKY_SECONDS", 10))
+        return _sticky_serializer().loads(token, max_age=max_age) == identity
+    except BadData:
+        return False
+
+
+class RoutingSession(Session):
+    """Send reads to the replica engine when the current view opted in.
+
+    Flushes always go to the primary. A view opts in with ``@read_replica``;
+    without a ``replica`` bind configured this behaves like the default session.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_app_context() and g.get("db_use_replica"):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _note_write(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _stick_writer_to_primary(session):
+    if not session.info.pop("wrote", False):
+        return
+    identity = _current_identity()
+    if identity is not None and REPLICA_BIND in current_app.config.get("SQLALCHEMY_BINDS", {}):
+        g.db_read_primary = _sticky_serializer().dumps(identity)
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _forget_write(session):
+    session.info.pop("wrote", None)
+
+
+def read_replica(view):
+    """Route the view's queries to the read replica (apply below @jwt_required).
+
+    Users who committed a write within DB_READ_STICKY_SECONDS keep reading
+    from the primary so they always see their own changes, as long as they
+    send back the STICKY_HEADER token returned by that write.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not _is_sticky(_current_identity()):
+            g.db_use_replica = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def init_read_replica(app) -> None:
+    """Return the sticky-read token on responses to requests that wrote."""
+    if REPLICA_BIND not in app.config.get("SQLALCHEMY_BINDS", {}):
+        return
+
+    @app.after_request
+    def _send_sticky_token(response):
+        token = g.get("db_read_primary")
+        if token:
+            response.headers[STICKY_HEADER] = token
+        return response
+
+
+def _is_sqlite_memory(uri: str) -> bool:
+    return uri.startswith("sqlite") and (uri in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in uri)
+
+
+class PoolStats:
+    """Checkout wait time and saturation counters for one engine's pool."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.in_use = 0
+        self.in_use_peak = 0
+        self._lock = threading.Lock()
+
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += seconds
+            if seconds > self.wait_max:
+                self.wait_max = seconds
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def on_checkout(self, dbapi_conn, record, proxy) -> None:
+        with self._lock:
+            self.in_use += 1
+            if self.in_use > self.in_use_peak:
+                self.in_use_peak = self.in_use
+
+    def on_checkin(self, dbapi_conn, record) -> None:
+        with self._lock:
+            self.in_use = max(0, self.in_use - 1)
+
+    def capacity(self) -> Optional[int]:
+        if isinstance(self.pool, QueuePool):
+            overflow = self.pool._max_overflow
+            return self.pool.size() + overflow if overflow > -1 else None
+        return None
+
+    def snapshot(self) -> Dict:
+        capacity = self.capacity()
+        return {
+            "name": self.name,
+            "pool": type(self.pool).__name__ if self.pool is not None else None,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 3),
+            "in_use": self.in_use,
+            "in_use_peak": self.in_use_peak,
+            "capacity": capacity,
+            "saturation": round(self.in_use / capacity, 3) if capacity else None,
+        }
+
+
+class _TimedPoolMixin:
+    """Measure how long callers wait in Pool.connect() for a connection."""
+
+    _stats: Optional[PoolStats] = None
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            conn = super().connect()
+        except exc.TimeoutError:
+            if self._stats:
+                self._stats.record_timeout()
+            raise
+        if self._stats:
+            self._stats.record_wait(time.perf_counter() - start)
+        return conn
+
+    def recreate(self):
+        pool = super().recreate()
+        pool._stats = self._stats
+        if self._stats:
+            self._stats.pool = pool
+        return pool
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedNullPool(_TimedPoolMixin, NullPool):
+    pass
+
+
+def pgbouncer_connect_args(drivername: str) -> Dict:
+    """Driver arguments that turn off server-side prepared statements.
+
+    - psycopg2: none needed, it never prepares server-side
+    - psycopg (3): ``prepare_threshold=None`` stops auto-preparing repeated queries
+    - asyncpg: both statement caches off, and unique statement names so an
+      unnamed-statement clash on a reused server connection cannot happen
+    """
+    if drivername == "postgresql+psycopg":
+        return {"prepare_threshold": None}
+    if drivername == "postgresql+asyncpg":
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+    return {}
+
+
+def get_engine_options(profile: str, uri: str, config) -> Dict:
+    """Build SQLALCHEMY_ENGINE_OPTIONS for a named pooling profile."""
+    if profile not in POOL_PROFILES:
+        raise ValueError(f"Unknown DB_POOL_PROFILE '{profile}'. Choose one of: {', '.join(POOL_PROFILES)}")
+    if profile == "serverless":
+        return {"poolclass": TimedNullPool, "pool_pre_ping": False}
+    if profile == "pgbouncer":
+        # Transaction-mode poolers reset server state between transactions;
+        # holding client-side connections only doubles the pooling.
+        options = {"poolclass": TimedNullPool, "pool_pre_ping": False}
+        connect_args = pgbouncer_connect_args(make_url(uri).drivername)
+        if connect_args:
+            options["connect_args"] = connect_args
+        return options
+    if profile == "server" and not _is_sqlite_memory(uri):
+        return {
+            "poolclass": TimedQueuePool,
+            "pool_size": int(config.get("DB_POOL_SIZE", 10)),
+            "max_overflow": int(config.get("DB_MAX_OVERFLOW", 20)),
+            "pool_recycle": int(config.get("DB_POOL_RECYCLE", 1800)),
+            "pool_timeout": int(config.get("DB_POOL_TIMEOUT", 30)),
+            "pool_pre_ping": True,
+        }
+    return {"pool_pre_ping": True}
+
+
+def get_async_engine_options(profile: str, uri: str, config) -> Dict:
+    """Engine options for create_async_engine under the same pooling profile.
+
+    Async engines need asyncio-aware pools, so the timed pool classes are
+    swapped for NullPool or AsyncAdaptedQueuePool.
+    """
+    options = get_engine_options(profile, uri, config)
+    if profile == "pgbouncer":
+        connect_args = pgbouncer_connect_args(make_url(to_async_database_uri(uri)).drivername)
+        if connect_args:
+            options["connect_args"] = connect_args
+        else:
+            options.pop("connect_args", None)
+    poolclass = options.pop("poolclass", None)
+    if poolclass is TimedNullPool:
+        options["poolclass"] = NullPool
+    elif poolclass is TimedQueuePool:
+        options["poolclass"] = AsyncAdaptedQueuePool
+    return options
+
+
+def instrument_engine(engine, name: str = "primary") -> PoolStats:
+    stats = PoolStats(name)
+    stats.pool = engine.pool
+    engine.pool._stats = stats
+    event.listen(engine, "checkout", stats.on_checkout)
+    event.listen(engine, "checkin", stats.on_checkin)
+    return stats
+
+
+def init_pool_metrics(app, db) -> None:
+    """Attach PoolStats to every engine; call after db.init_app(app)."""
+    with app.app_context():
+        app.extensions["pool_stats"] = {
+            (name or "primary"): instrument_engine(engine, name or "primary")
+            for name, engine in db.engines.items()
+        }
+
+
+def pool_metrics(app) -> Dict:
+    return {name: stats.snapshot() for name, stats in app.extensions.get("pool_stats", {}).items()}
+
+
+def apply_sqlite_tuning(engine, config) -> None:
+    """Set performance pragmas on every new SQLite connection.
+
+    WAL lets list reads proceed while an import is writing; the other pragmas
+    trade a little durability on power loss for far fewer fsyncs and page
+    cache misses. ``PRAGMA optimize`` is re-run at most once per
+    SQLITE_OPTIMIZE_INTERVAL seconds, on the next connection checkout.
+    """
+    if engine.dialect.name != "sqlite" or not config.get("SQLITE_TUNING", True):
+        return
+    in_memory = engine.url.database in (None, "", ":memory:")
+    cache_size = int(config.get("SQLITE_CACHE_SIZE", -64000))
+    mmap_size = int(config.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+    busy_timeout = int(config.get("SQLITE_BUSY_TIMEOUT", 5000))
+    interval = float(config.get("SQLITE_OPTIMIZE_INTERVAL", 3600))
+    last_optimize = {"at": time.monotonic()}
+    lock = threading.Lock()
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_conn, record):
+        cur = dbapi_conn.cursor()
+        if not in_memory:
+            cur.execute("PRAGMA journal_mode=WAL")
+            cur.execute(f"PRAGMA mmap_size={mmap_size}")
+        cur.execute("PRAGMA synchronous=NORMAL")
+        cur.execute(f"PRAGMA cache_size={cache_size}")
+        cur.execute("PRAGMA temp_store=MEMORY")
+        cur.execute(f"PRAGMA busy_timeout={busy_timeout}")
+        cur.close()
+
+    @event.listens_for(engine, "checkout")
+    def _periodic_optimize(dbapi_conn, record, proxy):
+        if interval <= 0 or time.monotonic() - last_optimize["at"] < interval:
+            return
+        with lock:
+            if time.monotonic() - last_optimize["at"] < interval:
+                return
+            last_optimize["at"] = time.monotonic()
+        cur = dbapi_conn.cursor()
+        cur.execute("PRAGMA optimize")
+        cur.close()
+
+
+def enable_sqlite_foreign_keys(engine) -> None:
+    """Turn on foreign key enforcement for every new SQLite connection.
+
+    SQLite ignores REFERENCES clauses (including ON DELETE CASCADE) unless
+    the pragma is set per connection; other backends always enforce them.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _enable_foreign_keys(dbapi_conn, record):
+        cur = dbapi_conn.cursor()
+        cur.execute("PRAGMA foreign_keys=ON")
+        cur.close()
+
+
+def init_sqlite_tuning(app, db) -> None:
+    """Register SQLite pragmas on every engine; call before first connect."""
+    with app.app_context():
+        for engine in db.engines.values():
+            enable_sqlite_foreign_keys(engine)
+            apply_sqlite_tuning(engine, app.config)
+
+
 def configure_database(app) -> None:
     # Set SQLAlchemy URI based on env; default SQLite
     app.config["SQLALCHEMY_DATABASE_URI"] = get_database_uri()
-    # Sensible engine options for prod Postgres
-    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", {"pool_pre_ping": True})
-
-
+    # Optional read replica for GET endpoints decorated with @read_replica
+    read_uri = get_read_database_uri()
+    if read_uri:
+        app.config.setdefault("SQLALCHEMY_BINDS", {})[REPLICA_BIND] = read_uri
+    # Engine options come from the configured pooling profile
+    profile = app.config.get("DB_POOL_PROFILE", "server")
+    app.config.setdefault(
+        "SQLALCHEMY_ENGINE_OPTIONS",
+        get_engine_options(profile, app.config["SQLALCHEMY_DATABASE_URI"], app.config),
+    )
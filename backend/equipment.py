@@ -1,13 +1,21 @@
-from datetime import datetime
+import csv
+import json
+from datetime import date, datetime
 from math import ceil
-from typing import Dict
+from typing import Dict, List
 
-from flask import Blueprint, jsonify, request, send_file
+from flask import Blueprint, Response, current_app, jsonify, request, send_file, stream_with_context
 from flask_jwt_extended import get_jwt_identity, jwt_required
-from io import BytesIO
-from sqlalchemy import or_, func
-
-from .models import db, Equipment, Comment, User
+from io import BytesIO, StringIO
+from sqlalchemy import delete, or_, func, update
+
+from .authz import current_principal
+from .database import read_replica
+from .lookups import FACET_FIELDS, LOOKUP_COLUMNS, encode_lookups
+from .models import db, ChangeLog, Equipment, Comment, EquipmentTombstone, LOOKUP_MODELS
+from .socketio_events import broadcast_equipment_bulk, equipment_bulk_payload
+from .stream import record_change
+from .sync import bulk_version_expression, bulk_write_tombstones
 from .utils import generate_excel_template, parse_excel_to_rows, validate_import_rows, VALID_STATUSES
 from openpyxl import Workbook
 
@@ -15,60 +23,53 @@ from openpyxl import Workbook
 equipment_bp = Blueprint("equipment", __name__, url_prefix="/api/equipment")
 
 
-@equipment_bp.get("")
-@jwt_required()
-def list_equipment():
-    # Filters
-    q = (request.args.get("q") or "").strip()
-    category = (request.args.get("category") or "").strip()
-    status = (request.args.get("status") or "").strip()
-    comment_count = (request.args.get("comment_count") or "").strip()
-    page = int(request.args.get("page", 1))
-    per_page = int(request.args.get("per_page", 20))
+# Filter set shared by list_equipment and the bulk endpoints
+FILTER_KEYS = ("q", "category", "status", "comment_count")
+
 
-    stmt = db.select(Equipment)
+def apply_filters(stmt, filters):
+    """Narrow an Equipment select by the ``list_equipment`` filter set."""
+    q = str(filters.get("q") or "").strip()
+    category = str(filters.get("category") or "").strip()
+    status = str(filters.get("status") or "").strip()
+    comment_count = str(filters.get("comment_count") or "").strip()
 
     if q:
-        like = f"%{q}%"
+        # q is a plain substring: "_" and "%" match themselves
+        like = "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
         stmt = stmt.where(or_(
-            Equipment.equipment_name.ilike(like),
-            Equipment.equipment_code.ilike(like),
-            Equipment.location.ilike(like),
+            Equipment.equipment_name.ilike(like, escape="\\"),
+            Equipment.equipment_code.ilike(like, escape="\\"),
+            Equipment.location.ilike(like, escape="\\"),
         ))
     if category:
         stmt = stmt.where(Equipment.category == category)
     if status:
         stmt = stmt.where(Equipment.status == status)
 
-    # Comment count filtering with HAVING
-    sub = db.session.query(
-        Comment.equipment_id.label("eid"), func.count(Comment.id).label("cc")
-    ).group_by(Comment.equipment_id).subquery()
-
-    stmt = stmt.outerjoin(sub, Equipment.id == sub.c.eid)
-
     if comment_count:
         try:
             cc = int(comment_count)
-            if cc == 0:
-                stmt = stmt.where((sub.c.cc == None))  # noqa: E711
-            elif cc == 1:
-                stmt = stmt.where(sub.c.cc == 1)
-            elif cc == 2:
-                stmt = stmt.where(sub.c.cc == 2)
-            elif cc >= 3:
-                stmt = stmt.where(sub.c.cc >= 3)
         except ValueError:
-            pass
-
-    total = db.session.scalar(db.select(func.count()).select_from(stmt.subquery())) or 0
-
-    stmt = stmt.order_by(Equipment.updated_at.desc()).limit(per_page).offset((page - 1) * per_page)
-    items = db.session.scalars(stmt).all()
-
-    # Preload comment counts
-    counts_by_id = {r[0]: r[1] for r in db.session.query(Comment.equipment_id, func.count(Comment.id)).group_by(Comment.equipment_id).all()}
-
+            return stmt
+        # Comment count filtering against a grouped subquery
+        sub = db.select(
+            Comment.equipment_id.label("eid"), func.count(Comment.id).label("cc")
+        ).group_by(Comment.equipment_id).subquery()
+        stmt = stmt.outerjoin(sub, Equipment.id == sub.c.eid)
+        if cc == 0:
+            stmt = stmt.where((sub.c.cc == None))  # noqa: E711
+        elif cc == 1:
+            stmt = stmt.where(sub.c.cc == 1)
+        elif cc == 2:
+            stmt = stmt.where(sub.c.cc == 2)
+        elif cc >= 3:
+            stmt = stmt.where(sub.c.cc >= 3)
+    return stmt
+
+
+def list_page_json(items, counts_by_id: Dict[int, int], page: int, per_page: int, total: int) -> Dict:
+    """Response body of ``list_equipment`` for one page of rows."""
     # Collect dynamic headers from extras of the current page
     dynamic_headers = []
     seen_hdr = set()
@@ -79,7 +80,7 @@ def list_equipment():
                     seen_hdr.add(k)
                     dynamic_headers.append(k)
 
-    return jsonify({
+    return {
         "items": [
             {
                 "id": e.id,
@@ -102,14 +103,50 @@ def list_equipment():
             "statuses": sorted(VALID_STATUSES),
         },
         "dynamic_headers": dynamic_headers,
-    })
+    }
 
 
-@equipment_bp.get("/<int:eid>")
-@jwt_required()
-def get_equipment(eid: int):
-    e = db.get_or_404(Equipment, eid)
-    return jsonify({
+def changes_statements(since: int, limit: int):
+    """Upserted rows and tombstones after ``since``, each capped at limit + 1."""
+    return (
+        db.select(Equipment).where(Equipment.version > since).order_by(Equipment.version).limit(limit + 1),
+        db.select(EquipmentTombstone).where(EquipmentTombstone.version > since).order_by(EquipmentTombstone.version).limit(limit + 1),
+    )
+
+
+def changes_json(rows, tombstones, since: int, limit: int) -> Dict:
+    """Merge both change kinds by version into one ``/changes`` page."""
+    changes = sorted(list(rows) + list(tombstones), key=lambda c: c.version)
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    return {
+        "items": [
+            {
+                "id": c.id,
+                "equipment_name": c.equipment_name,
+                "equipment_code": c.equipment_code,
+                "category": c.category,
+                "location": c.location,
+                "status": c.status,
+                "description": c.description,
+                "extra": c.extra or {},
+                "imported_at": c.imported_at.isoformat() if c.imported_at else None,
+                "updated_at": c.updated_at.isoformat(),
+                "version": c.version,
+            } for c in changes if isinstance(c, Equipment)
+        ],
+        "deleted": [
+            {"id": c.equipment_id, "version": c.version}
+            for c in changes if isinstance(c, EquipmentTombstone)
+        ],
+        "next_since": changes[-1].version if changes else since,
+        "has_more": has_more,
+    }
+
+
+def equipment_json(e: Equipment) -> Dict:
+    return {
         "id": e.id,
         "equipment_name": e.equipment_name,
         "equipment_code": e.equipment_code,
@@ -119,19 +156,167 @@ def get_equipment(eid: int):
         "description": e.description,
         "imported_at": e.imported_at.isoformat() if e.imported_at else None,
         "updated_at": e.updated_at.isoformat(),
-    })
+    }
+
+
+@equipment_bp.get("")
+@jwt_required()
+@read_replica
+def list_equipment():
+    page = int(request.args.get("page", 1))
+    per_page = int(request.args.get("per_page", 20))
+
+    snapshot = current_app.extensions.get("equipment_snapshot")
+    if snapshot is not None:
+        snapshot.refresh(db.session)
+        ids, counts_by_id, total = snapshot.page(request.args, page, per_page)
+        rows = {e.id: e for e in db.session.scalars(db.select(Equipment).where(Equipment.id.in_(ids)))} if ids else {}
+        items = [rows[i] for i in ids if i in rows]
+        return jsonify(list_page_json(items, counts_by_id, page, per_page, total))
+
+    stmt = apply_filters(db.select(Equipment), request.args)
+
+    total = db.session.scalar(db.select(func.count()).select_from(stmt.subquery())) or 0
+
+    stmt = stmt.order_by(Equipment.updated_at.desc(), Equipment.id.desc()).limit(per_page).offset((page - 1) * per_page)
+    items = db.session.scalars(stmt).all()
+
+    # Preload comment counts
+    counts_by_id = {r[0]: r[1] for r in db.session.query(Comment.equipment_id, func.count(Comment.id)).group_by(Comment.equipment_id).all()}
+
+    return jsonify(list_page_json(items, counts_by_id, page, per_page, total))
+
+
+def facet_list(pairs) -> List[Dict]:
+    """Facet entries, most common first."""
+    return [{"value": value, "count": count} for value, count in sorted(pairs, key=lambda p: (-p[1], p[0]))]
+
+
+@equipment_bp.get("/facets")
+@jwt_required()
+@read_replica
+def list_facets():
+    """Distinct status/category/location values with row counts.
+
+    Takes the ``list_equipment`` filters; each facet ignores its own filter
+    so the other choices stay listed.
+    """
+    snapshot = current_app.extensions.get("equipment_snapshot")
+    if snapshot is not None:
+        snapshot.refresh(db.session)
+        return jsonify(snapshot.facets(request.args))
+
+    result = {}
+    for field in FACET_FIELDS:
+        model = LOOKUP_MODELS[field]
+        matching = apply_filters(db.select(Equipment.id), {k: v for k, v in request.args.items() if k != field})
+        stmt = (
+            db.select(model.name, func.count())
+            .join(Equipment, getattr(Equipment, LOOKUP_COLUMNS[field]) == model.id)
+            .where(Equipment.id.in_(matching))
+            .group_by(model.name)
+        )
+        result[field] = facet_list(db.session.execute(stmt).all())
+    return jsonify(result)
+
+
+# Page size bounds for /changes
+CHANGES_DEFAULT_LIMIT = 1000
+CHANGES_MAX_LIMIT = 5000
+
+
+@equipment_bp.get("/changes")
+@jwt_required()
+@read_replica
+def list_changes():
+    """Rows inserted/updated and IDs deleted after version ``since``.
+
+    Changes come back in version order: apply ``deleted`` first, then
+    ``items``, and call again with ``since=next_since`` while ``has_more``.
+    ``since=0`` returns every live row.
+    """
+    try:
+        since = int(request.args.get("since", 0))
+        limit = int(request.args.get("limit", CHANGES_DEFAULT_LIMIT))
+    except ValueError:
+        return jsonify({"message": "since and limit must be integers."}), 400
+    limit = max(1, min(limit, CHANGES_MAX_LIMIT))
+
+    rows_stmt, tombstones_stmt = changes_statements(since, limit)
+    rows = db.session.scalars(rows_stmt).all()
+    tombstones = db.session.scalars(tombstones_stmt).all()
+    return jsonify(changes_json(rows, tombstones, since, limit))
+
+
+@equipment_bp.get("/<int:eid>")
+@jwt_required()
+@read_replica
+def get_equipment(eid: int):
+    e = db.get_or_404(Equipment, eid)
+    return jsonify(equipment_json(e))
+
+
+# Codes checked per duplicate lookup during import
+IMPORT_LOOKUP_BATCH_SIZE = 1000
+
+
+def import_duplicate_codes(rows: List[Dict]) -> List[str]:
+    """Codes in a validated import that already exist in the database."""
+    incoming_codes = sorted({r["equipment_code"] for r in rows if r.get("equipment_code") and r.get("equipment_code") != "0"})
+    duplicates = []
+    # Chunked so large files stay under the driver's bound-parameter limit
+    for start in range(0, len(incoming_codes), IMPORT_LOOKUP_BATCH_SIZE):
+        chunk = incoming_codes[start:start + IMPORT_LOOKUP_BATCH_SIZE]
+        duplicates.extend(db.session.scalars(db.select(Equipment.equipment_code).where(Equipment.equipment_code.in_(chunk))))
+    return sorted(duplicates)
+
+
+def assign_import_codes(rows: List[Dict]) -> None:
+    """Name unnamed rows and give blank/'0'/clashing codes a generated one."""
+    from uuid import uuid4
+    existing_codes = set(
+        c for (c,) in db.session.query(Equipment.equipment_code).all()
+    )
+    used_in_batch = set()
+    for idx, r in enumerate(rows):
+        name = (r.get("equipment_name") or "").strip()
+        if not name:
+            r["equipment_name"] = f"Item {idx+1}"
+        code = (r.get("equipment_code") or "").strip()
+        if not code or code == "0" or code in existing_codes or code in used_in_batch:
+            new_code = f"AUTO-{uuid4().hex[:8].upper()}"
+            r["equipment_code"] = new_code
+            used_in_batch.add(new_code)
+        else:
+            used_in_batch.add(code)
+            existing_codes.add(code)
+
+
+def insert_import_rows(rows: List[Dict]) -> List[Equipment]:
+    """Add imported rows to the session; the caller commits."""
+    objects = [
+        Equipment(
+            equipment_name=r["equipment_name"],
+            equipment_code=r["equipment_code"],
+            category=r["category"],
+            location=r["location"],
+            status=r["status"],
+            description=r["description"],
+            imported_at=r["imported_at"],
+            extra=r.get("extra", {}),
+        ) for r in rows
+    ]
+    db.session.add_all(objects)
+    return objects
 
 
 @equipment_bp.post("/import")
 @jwt_required()
 def import_excel():
-    identity = get_jwt_identity()
-    try:
-        uid = int(identity)
-    except Exception:
+    principal = current_principal()
+    if principal is None:
         return jsonify({"message": "Invalid token."}), 401
-    user = db.get_or_404(User, uid)
-    if user.role != "admin":
+    if not principal.is_admin():
         return jsonify({"message": "Only admins can import."}), 403
 
     if "file" not in request.files:
@@ -161,50 +346,15 @@ def import_excel():
     if errors:
         return jsonify({"errors": errors}), 400
 
-    # Check duplicates against DB
-    incoming_codes = {r["equipment_code"] for r in rows if r.get("equipment_code") and r.get("equipment_code") != "0"}
-    if incoming_codes:
-        existing_codes = set(
-            c for (c,) in db.session.query(Equipment.equipment_code).filter(Equipment.equipment_code.in_(incoming_codes)).all()
-        )
-        duplicates = sorted(incoming_codes.intersection(existing_codes))
-        if duplicates:
-            return jsonify({"errors": [f"Duplicate codes in database: {', '.join(duplicates)}"]}), 400
+    duplicates = import_duplicate_codes(rows)
+    if duplicates:
+        return jsonify({"errors": [f"Duplicate codes in database: {', '.join(duplicates)}"]}), 400
 
-    # Normalize and ensure unique equipment_code values; generate for blanks/'0'/duplicates
-    from uuid import uuid4
-    existing_codes = set(
-        c for (c,) in db.session.query(Equipment.equipment_code).all()
-    )
-    used_in_batch = set()
-    for idx, r in enumerate(rows):
-        name = (r.get("equipment_name") or "").strip()
-        if not name:
-            r["equipment_name"] = f"Item {idx+1}"
-        code = (r.get("equipment_code") or "").strip()
-        if not code or code == "0" or code in existing_codes or code in used_in_batch:
-            new_code = f"AUTO-{uuid4().hex[:8].upper()}"
-            r["equipment_code"] = new_code
-            used_in_batch.add(new_code)
-        else:
-            used_in_batch.add(code)
-            existing_codes.add(code)
+    assign_import_codes(rows)
 
     # Bulk insert
     try:
-        objects = [
-            Equipment(
-                equipment_name=r["equipment_name"],
-                equipment_code=r["equipment_code"],
-                category=r["category"],
-                location=r["location"],
-                status=r["status"],
-                description=r["description"],
-                imported_at=r["imported_at"],
-                extra=r.get("extra", {}),
-            ) for r in rows
-        ]
-        db.session.add_all(objects)
+        objects = insert_import_rows(rows)
         db.session.commit()
     except Exception as exc:
         db.session.rollback()
@@ -216,19 +366,16 @@ def import_excel():
 @equipment_bp.put("/<int:eid>")
 @jwt_required()
 def update_equipment(eid: int):
-    identity = get_jwt_identity()
-    try:
-        uid = int(identity)
-    except Exception:
+    principal = current_principal()
+    if principal is None:
         return jsonify({"message": "Invalid token."}), 401
-    user = db.get_or_404(User, uid)
     e = db.get_or_404(Equipment, eid)
 
     data = request.get_json(force=True)
-    if user.role != "admin":
+    if not principal.is_admin():
         return jsonify({"message": "Only admins can update."}), 403
 
-    for field in ["equipment_name", "category", "location", "status", "description"]:
+    for field in UPDATABLE_FIELDS:
         if field in data:
             setattr(e, field, data[field])
 
@@ -239,13 +386,10 @@ def update_equipment(eid: int):
 @equipment_bp.delete("/<int:eid>")
 @jwt_required()
 def delete_equipment(eid: int):
-    identity = get_jwt_identity()
-    try:
-        uid = int(identity)
-    except Exception:
+    principal = current_principal()
+    if principal is None:
         return jsonify({"message": "Invalid token."}), 401
-    user = db.get_or_404(User, uid)
-    if user.role != "admin":
+    if not principal.is_admin():
         return jsonify({"message": "Only admins can delete."}), 403
 
     e = db.get_or_404(Equipment, eid)
@@ -254,6 +398,118 @@ def delete_equipment(eid: int):
     return jsonify({"message": "Deleted."})
 
 
+# Fields PUT and PATCH may change
+UPDATABLE_FIELDS = ("equipment_name", "category", "location", "status", "description")
+# Rows per UPDATE/DELETE statement in the bulk endpoints
+BULK_BATCH_SIZE = 500
+BULK_MAX_IDS = 10000
+
+
+def _bulk_target_ids(data: Dict):
+    """Resolve ``ids`` or ``filters`` from a bulk request body to equipment IDs."""
+    if "ids" in data:
+        ids = data.get("ids")
+        if not isinstance(ids, list) or not ids:
+            return None, (jsonify({"message": "ids must be a non-empty list."}), 400)
+        if len(ids) > BULK_MAX_IDS:
+            return None, (jsonify({"message": f"At most {BULK_MAX_IDS} ids per request."}), 400)
+        try:
+            ids = sorted({int(i) for i in ids})
+        except (TypeError, ValueError):
+            return None, (jsonify({"message": "ids must be integers."}), 400)
+        found = []
+        for i in range(0, len(ids), BULK_BATCH_SIZE):
+            chunk = ids[i:i + BULK_BATCH_SIZE]
+            found += db.session.scalars(db.select(Equipment.id).where(Equipment.id.in_(chunk))).all()
+        return sorted(found), None
+    filters = data.get("filters")
+    if not isinstance(filters, dict) or not any(str(filters.get(k) or "").strip() for k in FILTER_KEYS):
+        return None, (jsonify({"message": f"Provide ids or filters ({', '.join(FILTER_KEYS)})."}), 400)
+    stmt = apply_filters(db.select(Equipment.id), filters).order_by(Equipment.id).limit(BULK_MAX_IDS + 1)
+    ids = db.session.scalars(stmt).all()
+    if len(ids) > BULK_MAX_IDS:
+        return None, (jsonify({"message": f"filters match more than {BULK_MAX_IDS} rows; narrow them."}), 400)
+    return ids, None
+
+
+def _publish_bulk(action: str, ids, changes=None) -> None:
+    """One change log row and one broadcast for the whole operation."""
+    payload = equipment_bulk_payload(action, ids, changes)
+    record_change(
+        db.session, ChangeLog, "equipment_bulk_changed", payload, None,
+        current_app.config.get("CHANGE_LOG_RETENTION_HOURS", 24),
+    )
+    db.session.commit()
+    broadcast_equipment_bulk(payload)
+
+
+@equipment_bp.patch("")
+@jwt_required()
+def bulk_update_equipment():
+    """Apply ``changes`` to every row matched by ``ids`` or ``filters``."""
+    principal = current_principal()
+    if principal is None:
+        return jsonify({"message": "Invalid token."}), 401
+    if not principal.is_admin():
+        return jsonify({"message": "Only admins can update."}), 403
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"message": "Request body must be a JSON object."}), 400
+    changes = data.get("changes")
+    if not isinstance(changes, dict):
+        return jsonify({"message": "changes must be an object."}), 400
+    unknown = set(changes) - set(UPDATABLE_FIELDS)
+    if unknown or not changes:
+        return jsonify({"message": f"changes may only set: {', '.join(UPDATABLE_FIELDS)}."}), 400
+    if "status" in changes and changes["status"] not in VALID_STATUSES:
+        return jsonify({"message": f"Invalid status. Allowed: {', '.join(sorted(VALID_STATUSES))}."}), 400
+    if "equipment_name" in changes and not changes["equipment_name"]:
+        return jsonify({"message": "equipment_name cannot be empty."}), 400
+
+    ids, error = _bulk_target_ids(data)
+    if error:
+        return error
+    values = encode_lookups(db.session, changes)
+    for i in range(0, len(ids), BULK_BATCH_SIZE):
+        chunk = ids[i:i + BULK_BATCH_SIZE]
+        db.session.execute(
+            update(Equipment)
+            .where(Equipment.id.in_(chunk))
+            .values(**values, updated_at=datetime.utcnow(), version=bulk_version_expression(db.session, chunk)),
+            execution_options={"synchronize_session": False},
+        )
+    if ids:
+        _publish_bulk("updated", ids, changes)
+    return jsonify({"message": "Updated.", "updated": len(ids)})
+
+
+@equipment_bp.post("/bulk-delete")
+@jwt_required()
+def bulk_delete_equipment():
+    """Delete every row matched by ``ids`` or ``filters``."""
+    principal = current_principal()
+    if principal is None:
+        return jsonify({"message": "Invalid token."}), 401
+    if not principal.is_admin():
+        return jsonify({"message": "Only admins can delete."}), 403
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"message": "Request body must be a JSON object."}), 400
+    ids, error = _bulk_target_ids(data)
+    if error:
+        return error
+    for i in range(0, len(ids), BULK_BATCH_SIZE):
+        chunk = ids[i:i + BULK_BATCH_SIZE]
+        # Comments go with their equipment via ON DELETE CASCADE
+        db.session.execute(delete(Equipment).where(Equipment.id.in_(chunk)), execution_options={"synchronize_session": False})
+        bulk_write_tombstones(db.session, chunk)
+    if ids:
+        _publish_bulk("deleted", ids)
+    return jsonify({"message": "Deleted.", "deleted": len(ids)})
+
+
 @equipment_bp.get("/template")
 @jwt_required()
 def download_template():
@@ -261,9 +517,48 @@ def download_template():
     return send_file(BytesIO(data), mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", as_attachment=True, download_name="equipment_template.xlsx")
 
 
+# Rows fetched per round trip while exporting
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FORMATS = ("xlsx", "csv")
+
+
+def export_cell(value):
+    """A column value as something both CSV and openpyxl can write."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def export_rows(columns):
+    """Stream every equipment row, ``EXPORT_BATCH_SIZE`` at a time."""
+    stmt = db.select(Equipment).order_by(Equipment.id.asc()).execution_options(yield_per=EXPORT_BATCH_SIZE)
+    for e in db.session.scalars(stmt):
+        yield [export_cell(getattr(e, col, "")) for col in columns]
+
+
+def csv_chunks(columns):
+    """CSV text in chunks of ``EXPORT_BATCH_SIZE`` rows."""
+    buf = StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    for count, row in enumerate(export_rows(columns), start=1):
+        writer.writerow(row)
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
 @equipment_bp.get("/export")
 @jwt_required()
+@read_replica
 def export_equipment():
+    """All equipment as XLSX (default) or, with ``format=csv``, streamed CSV."""
     # Authenticate
     identity = get_jwt_identity()
     try:
@@ -271,37 +566,34 @@ def export_equipment():
     except Exception:
         return jsonify({"message": "Invalid token."}), 401
 
-    # Fetch all equipment
-    items = db.session.scalars(db.select(Equipment).order_by(Equipment.id.asc())).all()
-
-    # Build workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Equipment"
+    fmt = (request.args.get("format") or "xlsx").lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"message": f"format must be one of: {', '.join(EXPORT_FORMATS)}."}), 400
 
-    # Dynamically read ALL columns from the model/table
-    columns = [col.name for col in Equipment.__table__.columns]
-    ws.append(columns)
+    # Dynamically read ALL columns from the model/table (lookup keys as their names)
+    key_fields = {key: field for field, key in LOOKUP_COLUMNS.items()}
+    columns = [key_fields.get(col.name, col.name) for col in Equipment.__table__.columns]
+    today = datetime.utcnow().date().isoformat()
 
-    from datetime import date, datetime as dt
+    if fmt == "csv":
+        return Response(
+            stream_with_context(csv_chunks(columns)),
+            mimetype="text/csv",
+            headers={"Content-Disposition": f"attachment; filename=equipment_export_{today}.csv"},
+        )
 
-    for e in items:
-        values = []
-        for col in columns:
-            v = getattr(e, col, "")
-            if isinstance(v, (dt, date)):
-                v = v.isoformat()
-            elif v is None:
-                v = ""
-            values.append(v)
-        ws.append(values)
+    # Write-only workbooks keep one row in memory at a time instead of a cell grid
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Equipment")
+    ws.append(columns)
+    for row in export_rows(columns):
+        ws.append(row)
 
     # Serialize to bytes
     buf = BytesIO()
     wb.save(buf)
     buf.seek(0)
 
-    today = datetime.utcnow().date().isoformat()
     filename = f"equipment_export_{today}.xlsx"
     return send_file(
         buf,
@@ -309,3 +601,21 @@ def export_equipment():
         as_attachment=True,
         download_name=filename,
     )
+
+
+def init_equipment_snapshot(app):
+    """Serve list/facet filtering from memory when EQUIPMENT_SNAPSHOT_ENABLED.
+
+    The snapshot (and NumPy) is only imported when enabled, and loaded
+    lazily by the first request that needs it.
+    """
+    if not app.config.get("EQUIPMENT_SNAPSHOT_ENABLED", False):
+        return None
+    from .snapshot import EquipmentSnapshot
+
+    snapshot = EquipmentSnapshot(
+        refresh_interval=float(app.config.get("EQUIPMENT_SNAPSHOT_REFRESH_MS", 0)) / 1000,
+        resync_seconds=float(app.config.get("EQUIPMENT_SNAPSHOT_RESYNC_SECONDS", 300)),
+    )
+    app.extensions["equipment_snapshot"] = snapshot
+    return snapshot
@@ -0,0 +1,107 @@
+import json
+import logging
+import uuid
+from typing import Dict, Optional
+
+from flask_socketio import SocketIO
+
+
+logger = logging.getLogger(__name__)
+
+# EVENT_BUS values:
+# - "local": emit to clients of this process only (single worker)
+# - "redis": publish on a Redis (or Redis-compatible) channel; every worker
+#   relays what it receives to its own clients
+# - "socketio": Flask-SocketIO's message_queue (redis://, kafka://, zmq://,
+#   kombu URLs); needs a monkey-patched server such as gunicorn -k eventlet
+EVENT_BUSES = ("local", "redis", "socketio")
+
+
+class LocalEventBus:
+    """Deliver events straight to this process's Socket.IO clients."""
+
+    def __init__(self, sio: SocketIO):
+        self.sio = sio
+
+    def publish(self, event: str, payload: Dict, to: Optional[str] = None) -> None:
+        self.sio.emit(event, payload, to=to)
+
+    def start(self) -> None:
+        pass
+
+
+class RedisEventBus(LocalEventBus):
+    """Fan events out to every worker through a Redis pub/sub channel.
+
+    Events are emitted locally right away and published with this worker's
+    id; each worker's listener relays messages from other workers to its own
+    clients. The listener polls without blocking, so it cooperates with the
+    eventlet hub even when the process is not monkey-patched.
+    """
+
+    def __init__(self, sio: SocketIO, url: str, channel: str = "equipment-events", poll_interval: float = 0.02):
+        super().__init__(sio)
+        try:
+            import redis
+        except ImportError as exc:  # pragma: no cover - optional dependency
+            raise RuntimeError("EVENT_BUS=redis requires the 'redis' package") from exc
+        self.url = url
+        self.channel = channel
+        self.poll_interval = poll_interval
+        self.node_id = uuid.uuid4().hex
+        self._redis = redis.Redis.from_url(url)
+
+    def publish(self, event: str, payload: Dict, to: Optional[str] = None) -> None:
+        super().publish(event, payload, to=to)
+        message = json.dumps({"origin": self.node_id, "event": event, "payload": payload, "to": to})
+        try:
+            self._redis.publish(self.channel, message)
+        except Exception:
+            logger.exception("Failed to publish %s to event bus", event)
+
+    def start(self) -> None:
+        self.sio.start_background_task(self._listen)
+
+    def _relay(self, raw) -> None:
+        try:
+            message = json.loads(raw)
+        except (TypeError, ValueError):
+            return
+        if message.get("origin") == self.node_id:
+            return
+        self.sio.emit(message["event"], message["payload"], to=message.get("to"))
+
+    def _listen(self) -> None:
+        backoff = self.poll_interval
+        while True:
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                backoff = self.poll_interval
+                while True:
+                    message = pubsub.get_message(timeout=0)
+                    if message is None:
+                        self.sio.sleep(self.poll_interval)
+                    elif message.get("type") == "message":
+                        self._relay(message["data"])
+            except Exception:
+                logger.exception("Event bus listener lost its connection; retrying")
+                self.sio.sleep(backoff)
+                backoff = min(backoff * 2, 5.0)
+
+
+def socketio_queue_options(config) -> Dict:
+    """Extra SocketIO() kwargs for the configured bus."""
+    if config.get("EVENT_BUS", "local") == "socketio":
+        return {"message_queue": config["EVENT_BUS_URL"], "channel": config.get("EVENT_BUS_CHANNEL", "equipment-events")}
+    return {}
+
+
+def create_event_bus(config, sio: SocketIO) -> LocalEventBus:
+    kind = config.get("EVENT_BUS", "local")
+    if kind not in EVENT_BUSES:
+        raise ValueError(f"Unknown EVENT_BUS '{kind}'. Choose one of: {', '.join(EVENT_BUSES)}")
+    if kind == "redis":
+        return RedisEventBus(sio, config["EVENT_BUS_URL"], config.get("EVENT_BUS_CHANNEL", "equipment-events"))
+    # With "socketio" the SocketIO server itself publishes through the queue
+    return LocalEventBus(sio)
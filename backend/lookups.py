@@ -0,0 +1,176 @@
+import logging
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import event, inspect, select, text
+from sqlalchemy import insert as sa_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.hybrid import Comparator, hybrid_property
+from sqlalchemy.orm import object_session
+
+from .database import RoutingSession
+
+
+logger = logging.getLogger(__name__)
+
+# Equipment attribute -> its foreign key column; each points at a lookup table
+LOOKUP_COLUMNS = {"status": "status_id", "category": "category_id", "location": "location_id"}
+# Lookup-backed attributes served as facets
+FACET_FIELDS = tuple(LOOKUP_COLUMNS)
+# session.info key of the (model, name) -> lookup row cache
+LOOKUP_CACHE_KEY = "lookup_rows"
+
+
+def _insert_lookup(session, model, name: str) -> None:
+    """INSERT ``name`` unless it exists; safe against concurrent inserts of it."""
+    dialect = session.get_bind(mapper=inspect(model)).dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        session.execute(insert(model).values(name=name).on_conflict_do_nothing(index_elements=["name"]))
+        return
+    try:
+        with session.begin_nested():
+            session.execute(sa_insert(model).values(name=name))
+    except IntegrityError:
+        pass  # Another transaction added it first
+
+
+def lookup_row(session, model, name: str):
+    """The lookup row for ``name``, inserted if it does not exist yet.
+
+    Rows are cached per session, so an import naming the same category on
+    every line looks it up once. The insert ignores a conflicting row, so two
+    requests introducing the same new name both end up with that one row.
+    """
+    cache = session.info.setdefault(LOOKUP_CACHE_KEY, {})
+    row = cache.get((model, name))
+    if row is None:
+        statement = select(model).where(model.name == name)
+        with session.no_autoflush:
+            row = session.scalar(statement)
+            if row is None:
+                _insert_lookup(session, model, name)
+                row = session.scalar(statement)
+        cache[(model, name)] = row
+    return row
+
+
+@event.listens_for(RoutingSession, "after_soft_rollback")
+def _forget_lookup_rows(session, previous_transaction):
+    # Rows inserted in the rolled-back transaction are gone
+    session.info.pop(LOOKUP_CACHE_KEY, None)
+
+
+class LookupComparator(Comparator):
+    """SQL for a lookup-backed string attribute, written against its foreign key.
+
+    ``==``, ``in_`` and ``ilike`` resolve the names in the (tiny) lookup table
+    once and compare ids, so they use the index on the key column. Anything
+    else compares the name fetched by a correlated subquery.
+    """
+
+    def __init__(self, key, model):
+        self.key = key
+        self.model = model
+        super().__init__(select(model.name).where(model.id == key).scalar_subquery())
+
+    def _ids(self, condition):
+        return select(self.model.id).where(condition)
+
+    def __eq__(self, other):
+        if other is None:
+            return self.key.is_(None)
+        return self.key == self._ids(self.model.name == other).scalar_subquery()
+
+    def in_(self, other):
+        return self.key.in_(self._ids(self.model.name.in_(other)))
+
+    def like(self, other, escape=None):
+        return self.key.in_(self._ids(self.model.name.like(other, escape=escape)))
+
+    def ilike(self, other, escape=None):
+        return self.key.in_(self._ids(self.model.name.ilike(other, escape=escape)))
+
+
+def lookup_property(relationship: str, key: str, model):
+    """String attribute stored as a foreign key into ``model``'s lookup table.
+
+    Reads go through ``relationship`` (eager-loaded, so no extra query and
+    safe under asyncio); assigning a name finds or creates its lookup row.
+    """
+
+    def fget(self) -> Optional[str]:
+        row = getattr(self, relationship)
+        return row.name if row is not None else None
+
+    def fset(self, value: Optional[str]) -> None:
+        if value is None:
+            setattr(self, relationship, None)
+            return
+        session = object_session(self)
+        if session is None:
+            from .models import db
+
+            session = db.session
+        setattr(self, relationship, lookup_row(session, model, value))
+
+    prop = hybrid_property(fget, fset)
+    return prop.comparator(lambda cls: LookupComparator(getattr(cls, key), model))
+
+
+def lookup_ids(session, field: str, names: Iterable[Optional[str]]) -> Dict[str, int]:
+    """Ids for ``names`` in ``field``'s lookup table, creating missing rows."""
+    from .models import LOOKUP_MODELS
+
+    model = LOOKUP_MODELS[field]
+    return {name: lookup_row(session, model, name).id for name in set(names) if name is not None}
+
+
+def encode_lookups(session, values: Dict) -> Dict:
+    """Copy of a column -> value mapping with lookup names swapped for their ids.
+
+    For Core inserts and set-based UPDATEs, which bypass the attribute setters.
+    """
+    encoded = dict(values)
+    for field, key in LOOKUP_COLUMNS.items():
+        if field in encoded:
+            name = encoded.pop(field)
+            encoded[key] = lookup_ids(session, field, [name])[name] if name is not None else None
+    return encoded
+
+
+def migrate_equipment_lookups(engine) -> None:
+    """Move free-text status/category/location columns into the lookup tables.
+
+    Adds the ``*_id`` columns, fills the lookup tables with the distinct
+    values, points every row at its value and drops the text columns. Safe
+    to run repeatedly; a no-op once the text columns are gone.
+    """
+    from .models import LOOKUP_MODELS
+
+    columns = {c["name"] for c in inspect(engine).get_columns("equipment")}
+    pending = [field for field in LOOKUP_COLUMNS if field in columns]
+    if not pending:
+        return
+    logger.info("Moving equipment %s into lookup tables", ", ".join(pending))
+    with engine.begin() as conn:
+        for field in pending:
+            key, table = LOOKUP_COLUMNS[field], LOOKUP_MODELS[field].__tablename__
+            if key not in columns:
+                key_type = LOOKUP_MODELS[field].__table__.c.id.type.compile(dialect=engine.dialect)
+                conn.exec_driver_sql(f"ALTER TABLE equipment ADD COLUMN {key} {key_type} REFERENCES {table}(id)")
+            conn.execute(text(
+                f"INSERT INTO {table} (name) SELECT DISTINCT {field} FROM equipment "
+                f"WHERE {field} IS NOT NULL AND {field} NOT IN (SELECT name FROM {table})"
+            ))
+            conn.execute(text(
+                f"UPDATE equipment SET {key} = (SELECT id FROM {table} WHERE {table}.name = equipment.{field}) "
+                f"WHERE {field} IS NOT NULL"
+            ))
+            # SQLite >= 3.35 / PostgreSQL
+            conn.exec_driver_sql(f"ALTER TABLE equipment DROP COLUMN {field}")
+        if "status" in pending and engine.dialect.name != "sqlite":
+            # SQLite cannot add NOT NULL to an existing column
+            conn.exec_driver_sql("ALTER TABLE equipment ALTER COLUMN status_id SET NOT NULL")
@@ -0,0 +1,231 @@
+import hmac
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+from flask import Response, current_app, has_request_context, jsonify, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# Request latency histogram bounds, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# environ key of the per-request RequestStats
+REQUEST_STATS_KEY = "metrics.request_stats"
+
+
+class RequestStats:
+    """Timing and SQL counters for the request being served."""
+
+    __slots__ = ("start", "sql_statements", "db_seconds")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.sql_statements = 0
+        self.db_seconds = 0.0
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    if not has_request_context():
+        return None
+    return request.environ.get(REQUEST_STATS_KEY)
+
+
+class RouteStats:
+    """Histogram and counters for one (method, route) pair."""
+
+    __slots__ = ("buckets", "count", "seconds", "statuses", "sql_statements", "db_seconds")
+
+    def __init__(self, bucket_count: int):
+        self.buckets = [0] * bucket_count  # per-bucket (not cumulative) counts, last one is +Inf
+        self.count = 0
+        self.seconds = 0.0
+        self.statuses: Dict[int, int] = {}
+        self.sql_statements = 0
+        self.db_seconds = 0.0
+
+
+class RequestMetrics:
+    """Per-route request metrics, rendered in the Prometheus text format.
+
+    Updates are plain increments with no lock, but requests do run on real
+    threads (parallel /api/batch reads, the ASGI entry point's WSGI thread
+    pool). A rare lost increment is the accepted price for keeping locks
+    off the request path; ``render`` copies the shared dicts before
+    iterating so a route or status seen for the first time mid-render
+    cannot break it.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.bounds = buckets
+        self.routes: Dict[Tuple[str, str], RouteStats] = {}
+
+    def observe(self, method: str, route: str, status: int, seconds: float, sql_statements: int, db_seconds: float) -> None:
+        stats = self.routes.get((method, route))
+        if stats is None:
+            stats = self.routes.setdefault((method, route), RouteStats(len(self.bounds) + 1))
+        stats.buckets[bisect_left(self.bounds, seconds)] += 1
+        stats.count += 1
+        stats.seconds += seconds
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+        stats.sql_statements += sql_statements
+        stats.db_seconds += db_seconds
+
+    def render(self, pools: Optional[Dict[str, Dict]] = None) -> str:
+        lines: List[str] = []
+        routes = sorted(list(self.routes.items()))
+        statuses = {key: sorted(list(stats.statuses.items())) for key, stats in routes}
+
+        lines.append("# HELP http_requests_total Requests served, by route and status.")
+        lines.append("# TYPE http_requests_total counter")
+        for (method, route), stats in routes:
+            for status, count in statuses[(method, route)]:
+                lines.append(f'http_requests_total{{method="{method}",route="{_escape(route)}",status="{status}"}} {count}')
+
+        lines.append("# HELP http_request_duration_seconds Request latency, by route.")
+        lines.append("# TYPE http_request_duration_seconds histogram")
+        for (method, route), stats in routes:
+            labels = f'method="{method}",route="{_escape(route)}"'
+            cumulative = 0
+            for bound, count in zip(self.bounds, stats.buckets):
+                cumulative += count
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {stats.count}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {stats.seconds:.6f}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {stats.count}")
+
+        lines.append("# HELP http_request_sql_statements_total SQL statements executed while serving the route.")
+        lines.append("# TYPE http_request_sql_statements_total counter")
+        for (method, route), stats in routes:
+            lines.append(f'http_request_sql_statements_total{{method="{method}",route="{_escape(route)}"}} {stats.sql_statements}')
+
+        lines.append("# HELP http_request_db_seconds_total Time spent in SQL execution while serving the route.")
+        lines.append("# TYPE http_request_db_seconds_total counter")
+        for (method, route), stats in routes:
+            lines.append(f'http_request_db_seconds_total{{method="{method}",route="{_escape(route)}"}} {stats.db_seconds:.6f}')
+
+        if pools:
+            lines.extend(_render_pools(pools))
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _render_pools(pools: Dict[str, Dict]) -> List[str]:
+    gauges = (
+        ("db_pool_checkouts_total", "counter", "checkouts", "Connections checked out of the pool."),
+        ("db_pool_timeouts_total", "counter", "timeouts", "Checkouts that timed out waiting for a connection."),
+        ("db_pool_in_use", "gauge", "in_use", "Connections currently checked out."),
+        ("db_pool_capacity", "gauge", "capacity", "Pool size plus overflow."),
+    )
+    lines = []
+    for name, kind, key, help_text in gauges:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for pool, snapshot in sorted(pools.items()):
+            if snapshot.get(key) is not None:
+                lines.append(f'{name}{{pool="{pool}"}} {snapshot[key]}')
+    return lines
+
+
+# Extra consumers of each timed statement, see observe_statements
+_statement_observers: List[Callable] = []
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("metrics_query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    stats = current_request_stats()
+    if stats is not None:
+        stats.sql_statements += 1
+        stats.db_seconds += elapsed
+    for observer in _statement_observers:
+        observer(conn, cursor, statement, parameters, elapsed, executemany)
+
+
+def instrument_sql() -> None:
+    """Count statements and DB time for every engine, sync or async-wrapped."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def observe_statements(observer: Callable) -> None:
+    """Also hand every timed statement to ``observer``.
+
+    Called as ``observer(conn, cursor, statement, parameters, elapsed,
+    executemany)`` from the same cursor hooks that feed RequestStats.
+    """
+    instrument_sql()
+    if observer not in _statement_observers:
+        _statement_observers.append(observer)
+
+
+def _start_request():
+    request.environ[REQUEST_STATS_KEY] = RequestStats()
+
+
+def track_request_stats(app) -> None:
+    """Give each of the app's requests a RequestStats, even with metrics off."""
+    if app.extensions.get("request_stats"):
+        return
+    app.extensions["request_stats"] = True
+    instrument_sql()
+    app.before_request(_start_request)
+
+
+def _finish_request(response):
+    stats = current_request_stats()
+    if stats is None:
+        return response
+    # Route template, not the raw path, keeps label cardinality bounded
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    current_app.extensions["metrics"].observe(
+        request.method,
+        route,
+        response.status_code,
+        time.perf_counter() - stats.start,
+        stats.sql_statements,
+        stats.db_seconds,
+    )
+    return response
+
+
+def metrics_view():
+    token = current_app.config.get("METRICS_TOKEN")
+    if token and not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return jsonify({"message": "Unauthorized."}), 401
+    from .database import pool_metrics
+
+    body = current_app.extensions["metrics"].render(pool_metrics(current_app))
+    body += "".join(collector() for collector in current_app.extensions.get("metrics_collectors", []))
+    return Response(body, content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+def register_metrics_collector(app, collector: Callable[[], str]) -> None:
+    """Add a callable returning extra Prometheus text lines to /api/metrics."""
+    app.extensions.setdefault("metrics_collectors", []).append(collector)
+
+
+def init_metrics(app) -> Optional[RequestMetrics]:
+    """Record per-route latency, status and SQL counters; serve them at /api/metrics.
+
+    Call before ``init_compression`` so the recorded time includes encoding.
+    """
+    if not app.config.get("METRICS_ENABLED", True):
+        return None
+    metrics = RequestMetrics()
+    app.extensions["metrics"] = metrics
+    track_request_stats(app)
+    app.after_request(_finish_request)
+    app.add_url_rule("/api/metrics", "metrics", metrics_view, methods=["GET"])
+    return metrics
@@ -3,8 +3,11 @@ from typing import Optional
 
 from flask_sqlalchemy import SQLAlchemy
 
+from .database import RoutingSession
+from .lookups import lookup_property
 
-db = SQLAlchemy()
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 
 class TimestampMixin:
@@ -21,35 +24,128 @@ class User(db.Model, TimestampMixin):
     password = db.Column(db.String(255), nullable=False)
     full_name = db.Column(db.String(120), nullable=True)
     role = db.Column(db.String(20), default="user", nullable=False)  # 'admin' or 'user'
+    # Last role/username change; tokens issued before it are not trusted for
+    # those claims. Set it too when changing either column with raw SQL.
+    role_changed_at = db.Column(db.DateTime, nullable=True, index=True)
 
-    comments = db.relationship("Comment", backref="user", lazy=True, cascade="all,delete")
+    comments = db.relationship("Comment", backref="user", lazy=True, cascade="all,delete", passive_deletes=True)
 
     def is_admin(self) -> bool:
         return self.role == "admin"
 
 
+# Lookup table keys: SMALLINT on PostgreSQL; SQLite only autoincrements INTEGER keys
+LOOKUP_ID = db.SmallInteger().with_variant(db.Integer(), "sqlite")
+DEFAULT_STATUS = "Active"
+
+
+class LookupMixin:
+    """One row per distinct value of a dictionary-encoded equipment column."""
+
+    id = db.Column(LOOKUP_ID, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+
+
+class EquipmentStatus(db.Model, LookupMixin):
+    __tablename__ = "equipment_statuses"
+
+
+class EquipmentCategory(db.Model, LookupMixin):
+    __tablename__ = "equipment_categories"
+
+
+class EquipmentLocation(db.Model, LookupMixin):
+    __tablename__ = "equipment_locations"
+
+
+# Equipment attribute -> lookup table behind it
+LOOKUP_MODELS = {"status": EquipmentStatus, "category": EquipmentCategory, "location": EquipmentLocation}
+
+
 class Equipment(db.Model, TimestampMixin):
     __tablename__ = "equipment"
 
     id = db.Column(db.Integer, primary_key=True)
     equipment_name = db.Column(db.String(200), nullable=False)
     equipment_code = db.Column(db.String(100), unique=True, nullable=False)
-    category = db.Column(db.String(100), nullable=True)
-    location = db.Column(db.String(100), nullable=True)
-    status = db.Column(db.String(50), nullable=False, default="Active")
+    # Dictionary-encoded; read and assign them as strings through category/location/status below
+    category_id = db.Column(LOOKUP_ID, db.ForeignKey("equipment_categories.id"), nullable=True, index=True)
+    location_id = db.Column(LOOKUP_ID, db.ForeignKey("equipment_locations.id"), nullable=True, index=True)
+    status_id = db.Column(
+        LOOKUP_ID,
+        db.ForeignKey("equipment_statuses.id"),
+        nullable=False,
+        index=True,
+        default=db.select(EquipmentStatus.id).where(EquipmentStatus.name == DEFAULT_STATUS).scalar_subquery(),
+    )
     description = db.Column(db.Text, nullable=True)
     imported_at = db.Column(db.DateTime, nullable=True)
     # Dynamic fields container (JSON)
     extra = db.Column(db.JSON, default=dict)
+    # Change sequence number, bumped on every insert/update (see sync.py)
+    version = db.Column(db.BigInteger, nullable=False, default=0, index=True)
+
+    comments = db.relationship("Comment", backref="equipment", lazy=True, cascade="all,delete", passive_deletes=True)
 
-    comments = db.relationship("Comment", backref="equipment", lazy=True, cascade="all,delete")
+    # Joined eagerly: one join against a tiny table, and no lazy load under asyncio
+    category_row = db.relationship(EquipmentCategory, lazy="joined")
+    location_row = db.relationship(EquipmentLocation, lazy="joined")
+    status_row = db.relationship(EquipmentStatus, lazy="joined", innerjoin=True)
+
+    category = lookup_property("category_row", "category_id", EquipmentCategory)
+    location = lookup_property("location_row", "location_id", EquipmentLocation)
+    status = lookup_property("status_row", "status_id", EquipmentStatus)
 
 
 class Comment(db.Model):
     __tablename__ = "comments"
+    __table_args__ = (
+        # Keyset pagination over (created_at, id) per equipment item
+        db.Index("ix_comments_equipment_created", "equipment_id", "created_at", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     equipment_id = db.Column(db.Integer, db.ForeignKey("equipment.id", ondelete="CASCADE"), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     comment_text = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ChangeLog(db.Model):
+    """Append-only log of pushed events, read by the SSE change stream."""
+
+    __tablename__ = "change_log"
+
+    id = db.Column(db.Integer, primary_key=True)
+    event = db.Column(db.String(50), nullable=False)
+    equipment_id = db.Column(db.Integer, nullable=True, index=True)
+    payload = db.Column(db.JSON, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
+class EquipmentTombstone(db.Model):
+    """Marks a deleted equipment row for delta sync clients."""
+
+    __tablename__ = "equipment_tombstones"
+
+    equipment_id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, index=True)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+class SyncSequence(db.Model):
+    """Named monotonic counters; the row lock orders concurrent writers."""
+
+    __tablename__ = "sync_sequence"
+
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+class RevokedToken(db.Model):
+    """JWTs revoked by logout, kept until they would have expired anyway."""
+
+    __tablename__ = "revoked_tokens"
+
+    jti = db.Column(db.String(36), primary_key=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
@@ -0,0 +1,126 @@
+import asyncio
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from flask import current_app
+
+from .utils import hash_password, verify_password
+
+
+class HashingBusy(Exception):
+    """Raised when the password hashing queue is full."""
+
+
+def password_method(config) -> str:
+    """Werkzeug method string for the configured KDF cost."""
+    algorithm = config.get("PASSWORD_HASH_ALGORITHM", "sha256")
+    iterations = int(config.get("PASSWORD_HASH_ITERATIONS", 600000))
+    return f"pbkdf2:{algorithm}:{iterations}"
+
+
+def needs_rehash(hashed: str, method: Optional[str] = None) -> bool:
+    """True if the stored hash was made with different KDF parameters."""
+    method = method or password_method(current_app.config)
+    return not (hashed or "").startswith(method + "$")
+
+
+def _in_eventlet_greenthread() -> bool:
+    if "eventlet" not in sys.modules:
+        return False
+    import greenlet
+
+    return greenlet.getcurrent().parent is not None
+
+
+class PasswordHasherPool:
+    """Bounded pool for CPU-bound password hashing.
+
+    hashlib's PBKDF2 releases the GIL, so hashing in OS threads keeps the
+    request loop responsive. Under the eventlet server work goes through
+    ``eventlet.tpool`` so only the calling green thread waits; tpool sizes
+    itself (EVENTLET_THREADPOOL_SIZE), so a green semaphore keeps hashing
+    to ``workers`` of its threads. At most ``workers + max_queue`` hashes
+    may be in flight; beyond that :class:`HashingBusy` is raised instead of
+    queueing without bound.
+    """
+
+    def __init__(self, workers: int, max_queue: int, offload: bool = True):
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.offload = offload
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._green_slots = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pwhash")
+        return self._executor
+
+    def _get_green_slots(self):
+        # Only called from green threads, which cannot interleave here
+        if self._green_slots is None:
+            from eventlet.semaphore import Semaphore
+
+            self._green_slots = Semaphore(self.workers)
+        return self._green_slots
+
+    def run(self, fn: Callable, *args):
+        if not self.offload:
+            return fn(*args)
+        with self._lock:
+            if self.in_flight >= self.workers + self.max_queue:
+                raise HashingBusy()
+            self.in_flight += 1
+        try:
+            if _in_eventlet_greenthread():
+                from eventlet import tpool
+
+                with self._get_green_slots():
+                    return tpool.execute(fn, *args)
+            return self._get_executor().submit(fn, *args).result()
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    async def run_async(self, fn: Callable, *args):
+        """Same bounds as :meth:`run`, awaited from an asyncio event loop."""
+        if not self.offload:
+            return fn(*args)
+        with self._lock:
+            if self.in_flight >= self.workers + self.max_queue:
+                raise HashingBusy()
+            self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def init_password_hasher(app) -> PasswordHasherPool:
+    pool = PasswordHasherPool(
+        workers=int(app.config.get("PASSWORD_HASH_WORKERS") or os.cpu_count() or 1),
+        max_queue=int(app.config.get("PASSWORD_HASH_QUEUE", 32)),
+        offload=bool(app.config.get("PASSWORD_HASH_OFFLOAD", True)),
+    )
+    app.extensions["password_hasher"] = pool
+    return pool
+
+
+def _pool() -> PasswordHasherPool:
+    return current_app.extensions["password_hasher"]
+
+
+def hash_password_offloaded(password: str) -> str:
+    return _pool().run(hash_password, password, password_method(current_app.config))
+
+
+def verify_password_offloaded(password: str, hashed: str) -> bool:
+    return _pool().run(verify_password, password, hashed)
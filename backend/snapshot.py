@@ -0,0 +1,317 @@
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func, select
+
+from .equipment import facet_list
+from .lookups import FACET_FIELDS, LOOKUP_COLUMNS
+from .models import ChangeLog, Comment, Equipment, EquipmentTombstone, LOOKUP_MODELS
+from .stream import COUNT_DELTAS
+from .sync import current_version
+
+
+# Code stored for a NULL value
+NULL_CODE = -1
+# Variable-width strings, so np.strings can search them without a Python loop
+SEARCH_DTYPE = np.dtypes.StringDType()
+
+
+class Dictionary:
+    """In-memory copy of one lookup table; codes are the lookup row ids."""
+
+    def __init__(self, rows=()):
+        self.codes: Dict[str, int] = {name: code for code, name in rows}
+        self.values: List[Optional[str]] = [None] * (max(self.codes.values(), default=-1) + 1)
+        for name, code in self.codes.items():
+            self.values[code] = name
+
+    @classmethod
+    def load(cls, session, field: str) -> "Dictionary":
+        model = LOOKUP_MODELS[field]
+        return cls(session.execute(select(model.id, model.name)).all())
+
+    def lookup(self, value: str) -> Optional[int]:
+        return self.codes.get(value)
+
+    def matching(self, needle: str) -> np.ndarray:
+        """Codes of values containing ``needle`` (already lowercased)."""
+        return np.array([code for name, code in self.codes.items() if needle in name.lower()], dtype=np.int32)
+
+
+class SnapshotColumns:
+    """One immutable generation of the snapshot; readers never see a half-applied refresh.
+
+    Rows are kept in ``id`` order. ``order`` lists row positions newest
+    ``updated_at`` first (ties by id, descending), as ``list_equipment``
+    sorts, so a filtered page is ``order[mask[order]]`` sliced, no sort needed.
+    """
+
+    __slots__ = ("ids", "updated", "codes", "comment_count", "search", "order")
+
+    def __init__(self, ids: np.ndarray, updated: np.ndarray, codes: Dict[str, np.ndarray], comment_count: np.ndarray,
+                 search: np.ndarray, order: Optional[np.ndarray] = None):
+        self.ids = ids
+        self.updated = updated
+        self.codes = codes
+        self.comment_count = comment_count
+        self.search = search
+        self.order = np.lexsort((ids, updated))[::-1] if order is None else order
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def with_counts(self, comment_count: np.ndarray) -> "SnapshotColumns":
+        return SnapshotColumns(self.ids, self.updated, self.codes, comment_count, self.search, self.order)
+
+
+def _positions(ids: np.ndarray, equipment_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(found mask, row positions) of ``equipment_ids`` in the sorted ``ids``."""
+    pos = np.searchsorted(ids, equipment_ids)
+    found = pos < len(ids)
+    found[found] = ids[pos[found]] == equipment_ids[found]
+    return found, pos
+
+
+def _timestamps(values) -> np.ndarray:
+    return np.array(values, dtype="datetime64[us]").astype(np.int64)
+
+
+def _search_text(name: Optional[str], code: Optional[str]) -> str:
+    # Location is matched through its dictionary instead. NUL cannot occur in
+    # a (PostgreSQL) text value, so a needle never matches across the two
+    return f"{name or ''}\0{code or ''}".lower()
+
+
+def _search_column(rows) -> np.ndarray:
+    return np.array([_search_text(r.equipment_name, r.equipment_code) for r in rows], dtype=SEARCH_DTYPE)
+
+
+class EquipmentSnapshot:
+    """Columnar read model of the equipment list, kept in NumPy arrays.
+
+    Holds only what ``list_equipment`` filters and sorts on: ids,
+    ``updated_at``, status/category/location as lookup table ids, comment
+    counts and a lowercased name/code string for ``q``. Filtering yields a
+    page of ids; the page's rows are then loaded by primary key.
+
+    ``refresh`` catches up incrementally: equipment rows and tombstones past
+    the last seen sync version (see sync.py), and comment counts recounted
+    for equipment named in change log rows past the last seen id. Every
+    ``resync_seconds`` the snapshot is rebuilt from scratch, which also
+    bounds drift from change log ids committed out of order.
+    """
+
+    def __init__(self, refresh_interval: float = 0.0, resync_seconds: float = 300.0):
+        self.refresh_interval = refresh_interval
+        self.resync_seconds = resync_seconds
+        self.dictionaries = {field: Dictionary() for field in FACET_FIELDS}
+        self.columns: Optional[SnapshotColumns] = None
+        self.version = 0
+        self.log_id = 0
+        self.loaded_at = 0.0
+        self.checked_at = 0.0
+        self._lock = threading.Lock()
+
+    # -- loading -----------------------------------------------------------
+
+    def _encode(self, session, rows, field: str) -> np.ndarray:
+        key = LOOKUP_COLUMNS[field]
+        codes = np.fromiter((NULL_CODE if getattr(r, key) is None else getattr(r, key) for r in rows), dtype=np.int32, count=len(rows))
+        if len(codes) and codes.max() >= len(self.dictionaries[field].values):
+            # A value first used after the dictionary was loaded
+            self.dictionaries[field] = Dictionary.load(session, field)
+        return codes
+
+    def _columns_from_rows(self, session, rows, comment_count: np.ndarray) -> SnapshotColumns:
+        return SnapshotColumns(
+            ids=np.fromiter((r.id for r in rows), dtype=np.int64, count=len(rows)),
+            updated=_timestamps([r.updated_at for r in rows]),
+            codes={field: self._encode(session, rows, field) for field in FACET_FIELDS},
+            comment_count=comment_count,
+            search=_search_column(rows),
+        )
+
+    @staticmethod
+    def _row_statement():
+        return select(
+            Equipment.id, Equipment.updated_at, Equipment.status_id, Equipment.category_id, Equipment.location_id,
+            Equipment.equipment_name, Equipment.equipment_code, Equipment.version,
+        )
+
+    def load(self, session) -> None:
+        """Rebuild every column from the database."""
+        # Watermarks first: anything committed after them is re-applied next refresh
+        version = current_version(session)
+        log_id = session.scalar(select(func.max(ChangeLog.id))) or 0
+        self.dictionaries = {field: Dictionary.load(session, field) for field in FACET_FIELDS}
+        rows = session.execute(self._row_statement().order_by(Equipment.id)).all()
+        columns = self._columns_from_rows(session, rows, np.zeros(len(rows), dtype=np.int64))
+        counts = session.execute(select(Comment.equipment_id, func.count(Comment.id)).group_by(Comment.equipment_id)).all()
+        _set_counts(columns.ids, columns.comment_count, counts)
+        self.columns = columns
+        self.version = max([version] + [r.version for r in rows])
+        self.log_id = log_id
+        self.loaded_at = self.checked_at = time.monotonic()
+
+    # -- incremental refresh -----------------------------------------------
+
+    def refresh(self, session) -> None:
+        """Bring the snapshot up to date with the database (cheap when nothing changed)."""
+        now = time.monotonic()
+        if self.columns is not None and now - self.checked_at < self.refresh_interval:
+            return
+        with self._lock:
+            if self.columns is None or now - self.loaded_at >= self.resync_seconds:
+                self.load(session)
+                return
+            if time.monotonic() - self.checked_at < self.refresh_interval:
+                return  # another request refreshed while this one waited
+            version = current_version(session)
+            log_id = session.scalar(select(func.max(ChangeLog.id))) or 0
+            self.checked_at = time.monotonic()
+            if version <= self.version and log_id <= self.log_id:
+                return
+            columns = self.columns
+            if version > self.version:
+                columns, version = self._apply_equipment_changes(session, columns)
+                self.version = max(self.version, version)
+            if log_id > self.log_id:
+                columns = self._apply_comment_changes(session, columns, log_id)
+            self.columns = columns
+
+    def _apply_equipment_changes(self, session, columns: SnapshotColumns) -> Tuple[SnapshotColumns, int]:
+        since = self.version
+        upserts = {r.id: r for r in session.execute(self._row_statement().where(Equipment.version > since)).all()}
+        tombstones = session.execute(
+            select(EquipmentTombstone.equipment_id, EquipmentTombstone.version).where(EquipmentTombstone.version > since)
+        ).all()
+        latest = max([since] + [r.version for r in upserts.values()] + [t.version for t in tombstones])
+        deleted = set()
+        for eid, tomb_version in tombstones:
+            row = upserts.get(eid)
+            if row is not None and row.version > tomb_version:
+                continue  # id reused after the delete (SQLite)
+            upserts.pop(eid, None)
+            deleted.add(eid)
+
+        # Fancy indexing copies, so the live generation is never written to
+        keep = np.ones(len(columns), dtype=bool)
+        if deleted:
+            keep &= ~np.isin(columns.ids, np.fromiter(deleted, dtype=np.int64, count=len(deleted)))
+        ids, updated, comment_count, search = columns.ids[keep], columns.updated[keep], columns.comment_count[keep], columns.search[keep]
+        codes = {field: values[keep] for field, values in columns.codes.items()}
+
+        if upserts:
+            rows = list(upserts.values())
+            changed_ids = np.fromiter(upserts, dtype=np.int64, count=len(rows))
+            found, pos = _positions(ids, changed_ids)
+            changed_updated = _timestamps([r.updated_at for r in rows])
+            changed_codes = {field: self._encode(session, rows, field) for field in FACET_FIELDS}
+            changed_search = _search_column(rows)
+
+            # Existing rows are updated in place, new ones appended and re-sorted by id
+            updated[pos[found]] = changed_updated[found]
+            search[pos[found]] = changed_search[found]
+            for field in FACET_FIELDS:
+                codes[field][pos[found]] = changed_codes[field][found]
+            new = ~found
+            if new.any():
+                ids = np.concatenate([ids, changed_ids[new]])
+                updated = np.concatenate([updated, changed_updated[new]])
+                comment_count = np.concatenate([comment_count, np.zeros(int(new.sum()), dtype=np.int64)])
+                search = np.concatenate([search, changed_search[new]])
+                codes = {field: np.concatenate([codes[field], changed_codes[field][new]]) for field in FACET_FIELDS}
+                if not np.all(ids[1:] > ids[:-1]):
+                    by_id = np.argsort(ids, kind="stable")
+                    ids, updated, comment_count, search = ids[by_id], updated[by_id], comment_count[by_id], search[by_id]
+                    codes = {field: values[by_id] for field, values in codes.items()}
+
+        return SnapshotColumns(ids, updated, codes, comment_count, search), latest
+
+    def _apply_comment_changes(self, session, columns: SnapshotColumns, log_id: int) -> SnapshotColumns:
+        comment_count = columns.comment_count.copy()
+        first = session.scalar(select(func.min(ChangeLog.id)).where(ChangeLog.id > self.log_id))
+        if first is not None and self.log_id and first > self.log_id + 1:
+            # Rows in between were pruned: recount everything
+            comment_count[:] = 0
+            counts = session.execute(select(Comment.equipment_id, func.count(Comment.id)).group_by(Comment.equipment_id)).all()
+        else:
+            touched = session.scalars(
+                select(ChangeLog.equipment_id).distinct().where(
+                    ChangeLog.id > self.log_id, ChangeLog.id <= log_id,
+                    ChangeLog.event.in_(list(COUNT_DELTAS)), ChangeLog.equipment_id.is_not(None),
+                )
+            ).all()
+            # Recounting (rather than summing deltas) makes re-reading an event harmless
+            found, pos = _positions(columns.ids, np.array(sorted(touched), dtype=np.int64))
+            comment_count[pos[found]] = 0
+            counts = session.execute(
+                select(Comment.equipment_id, func.count(Comment.id)).where(Comment.equipment_id.in_(touched)).group_by(Comment.equipment_id)
+            ).all() if touched else []
+        _set_counts(columns.ids, comment_count, counts)
+        self.log_id = log_id
+        return columns.with_counts(comment_count)
+
+    # -- queries -----------------------------------------------------------
+
+    def mask(self, columns: SnapshotColumns, filters, skip: Optional[str] = None) -> np.ndarray:
+        """Rows matching the ``list_equipment`` filter set (see ``apply_filters``)."""
+        mask = np.ones(len(columns), dtype=bool)
+        q = str(filters.get("q") or "").strip().lower()
+        if q:
+            # Plain substring test, like apply_filters' escaped ILIKE
+            hits = np.strings.find(columns.search, q) >= 0
+            hits |= np.isin(columns.codes["location"], self.dictionaries["location"].matching(q))
+            mask &= hits
+        for field in ("category", "status"):
+            value = str(filters.get(field) or "").strip()
+            if value and field != skip:
+                code = self.dictionaries[field].lookup(value)
+                if code is None:
+                    return np.zeros(len(columns), dtype=bool)
+                mask &= columns.codes[field] == code
+        comment_count = str(filters.get("comment_count") or "").strip()
+        if comment_count:
+            try:
+                cc = int(comment_count)
+            except ValueError:
+                return mask
+            if 0 <= cc <= 2:
+                mask &= columns.comment_count == cc
+            elif cc >= 3:
+                mask &= columns.comment_count >= 3
+        return mask
+
+    def page(self, filters, page: int, per_page: int) -> Tuple[List[int], Dict[int, int], int]:
+        """(page ids newest first, their comment counts, total matches)."""
+        columns = self.columns
+        order = columns.order
+        hits = order[self.mask(columns, filters)[order]]
+        start = max(page - 1, 0) * per_page
+        rows = hits[start:start + max(per_page, 0)]
+        ids = columns.ids[rows].tolist()
+        return ids, dict(zip(ids, columns.comment_count[rows].tolist())), len(hits)
+
+    def facets(self, filters) -> Dict[str, List[Dict]]:
+        """Value counts per facet field; each ignores its own filter so every choice stays listed."""
+        columns = self.columns
+        result = {}
+        for field in FACET_FIELDS:
+            codes = columns.codes[field][self.mask(columns, filters, skip=field)]
+            codes = codes[codes != NULL_CODE]
+            values = self.dictionaries[field].values
+            counts = np.bincount(codes, minlength=len(values))
+            result[field] = facet_list((values[code], int(counts[code])) for code in np.flatnonzero(counts))
+        return result
+
+
+def _set_counts(ids: np.ndarray, comment_count: np.ndarray, counts) -> None:
+    """Write (equipment_id, count) pairs into ``comment_count``, skipping unknown ids."""
+    if not counts:
+        return
+    eids = np.fromiter((eid for eid, _ in counts), dtype=np.int64, count=len(counts))
+    found, pos = _positions(ids, eids)
+    values = np.fromiter((n for _, n in counts), dtype=np.int64, count=len(counts))
+    comment_count[pos[found]] = values[found]
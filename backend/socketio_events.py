@@ -1,16 +1,34 @@
+import threading
+from typing import Dict, List, Optional, Set
+
 from flask import request
 from flask_socketio import SocketIO, emit, join_room, leave_room
-from sqlalchemy import func
 
-from .models import db, Comment, Equipment, User
+from .events import LocalEventBus
+from .models import Comment
 
 
 socketio: SocketIO | None = None
+event_bus: LocalEventBus | None = None
 
 
-def init_socketio(sio: SocketIO):
-    global socketio
+def init_socketio(sio: SocketIO, bus: LocalEventBus | None = None, flush_interval: float = 0.25):
+    global socketio, event_bus, count_coalescer
     socketio = sio
+    event_bus = bus or LocalEventBus(sio)
+    event_bus.start()
+    count_coalescer = CommentCountCoalescer(flush_interval)
+
+
+# Max equipment IDs one socket may watch for count updates
+MAX_COUNT_SUBSCRIPTIONS = 500
+
+# sid -> equipment IDs whose count updates that socket receives
+_count_subscriptions: Dict[str, Set[int]] = {}
+
+
+def counts_room(equipment_id: int) -> str:
+    return f"equipment_counts_{equipment_id}"
 
 
 # Optional: allow joining rooms per equipment to reduce traffic
@@ -20,6 +38,28 @@ def register_socket_handlers(sio: SocketIO):
     def on_connect():
         emit("connected", {"sid": request.sid})
 
+    @sio.on("disconnect")
+    def on_disconnect():
+        # Rooms are left automatically; only our bookkeeping needs clearing
+        _count_subscriptions.pop(request.sid, None)
+
+    @sio.on("subscribe_counts")
+    def on_subscribe_counts(data):
+        """Replace this socket's visible set of equipment IDs for count updates."""
+        try:
+            wanted = {int(i) for i in (data or {}).get("equipment_ids") or []}
+        except (TypeError, ValueError):
+            return {"ok": False, "message": "equipment_ids must be integers."}
+        if len(wanted) > MAX_COUNT_SUBSCRIPTIONS:
+            return {"ok": False, "message": f"At most {MAX_COUNT_SUBSCRIPTIONS} equipment_ids."}
+        current = _count_subscriptions.get(request.sid, set())
+        for eid in current - wanted:
+            leave_room(counts_room(eid))
+        for eid in wanted - current:
+            join_room(counts_room(eid))
+        _count_subscriptions[request.sid] = wanted
+        return {"ok": True, "count": len(wanted)}
+
     @sio.on("join_equipment")
     def on_join_equipment(data):
         room = f"equipment_{data.get('equipment_id')}"
@@ -31,37 +71,93 @@ def register_socket_handlers(sio: SocketIO):
         leave_room(room)
 
 
-def broadcast_new_comment(comment: Comment):
-    if not socketio:
-        return
-    # Send to the equipment room and globally update counts
-    room = f"equipment_{comment.equipment_id}"
+# Event payloads (shared by every transport that pushes comment events)
 
-    # Get username
-    user = db.get(User, comment.user_id)
-    payload = {
+def new_comment_payload(comment: Comment, username: str) -> Dict:
+    return {
         "id": comment.id,
         "equipment_id": comment.equipment_id,
         "user_id": comment.user_id,
-        "username": user.username if user else "",
+        "username": username or "",
         "comment_text": comment.comment_text,
         "created_at": comment.created_at.isoformat(),
     }
 
-    socketio.emit("new_comment", payload, room=room, broadcast=True)
 
-    # Also emit count update for equipment list
-    count = db.session.scalar(db.select(func.count()).where(Comment.equipment_id == comment.equipment_id)) or 0
-    socketio.emit("comment_count_updated", {"equipment_id": comment.equipment_id, "count": count}, broadcast=True)
+def comment_deleted_payload(comment_id: int, equipment_id: int) -> Dict:
+    return {"id": comment_id, "equipment_id": equipment_id}
 
 
-def broadcast_comment_deleted(comment_id: int, equipment_id: int):
-    if not socketio:
+def equipment_bulk_payload(action: str, equipment_ids: List[int], changes: Optional[Dict] = None) -> Dict:
+    return {"action": action, "ids": equipment_ids, "changes": changes or {}}
+
+
+def comment_counts_payload(deltas: Dict[int, int]) -> Dict:
+    return {"updates": [{"equipment_id": eid, "delta": delta} for eid, delta in sorted(deltas.items())]}
+
+
+class CommentCountCoalescer:
+    """Buffer per-equipment comment count deltas and emit them in batches.
+
+    Counts are derived from the writes themselves (+1 per new comment, -1 per
+    delete), so no COUNT(*) runs per comment. Every ``flush_interval`` seconds
+    each changed equipment's net delta is sent as ``comment_counts_updated``
+    to the sockets subscribed to it (see ``subscribe_counts``); deltas that
+    cancel out are dropped.
+    """
+
+    def __init__(self, flush_interval: float = 0.25):
+        self.flush_interval = flush_interval
+        self._pending: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._task_started = False
+
+    def add(self, equipment_id: int, delta: int) -> None:
+        with self._lock:
+            self._pending[equipment_id] = self._pending.get(equipment_id, 0) + delta
+            start = not self._task_started
+            self._task_started = True
+        if start and socketio:
+            socketio.start_background_task(self._run)
+
+    def drain(self) -> Dict[int, int]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return {eid: delta for eid, delta in pending.items() if delta}
+
+    def flush(self) -> None:
+        deltas = self.drain()
+        if not event_bus:
+            return
+        for eid, delta in deltas.items():
+            event_bus.publish("comment_counts_updated", comment_counts_payload({eid: delta}), to=counts_room(eid))
+
+    def _run(self) -> None:
+        while True:
+            socketio.sleep(self.flush_interval)
+            self.flush()
+
+
+count_coalescer = CommentCountCoalescer()
+
+
+def broadcast_new_comment(comment: Comment, username: str):
+    if not event_bus:
         return
-    room = f"equipment_{equipment_id}"
-    socketio.emit("comment_deleted", {"id": comment_id, "equipment_id": equipment_id}, room=room, broadcast=True)
+    # Full comment goes only to clients viewing this equipment's thread
+    event_bus.publish("new_comment", new_comment_payload(comment, username), to=f"equipment_{comment.equipment_id}")
+    count_coalescer.add(comment.equipment_id, 1)
+
 
-    count = db.session.scalar(db.select(func.count()).where(Comment.equipment_id == equipment_id)) or 0
-    socketio.emit("comment_count_updated", {"equipment_id": equipment_id, "count": count}, broadcast=True)
+def broadcast_comment_deleted(comment_id: int, equipment_id: int):
+    if not event_bus:
+        return
+    event_bus.publish("comment_deleted", comment_deleted_payload(comment_id, equipment_id), to=f"equipment_{equipment_id}")
+    count_coalescer.add(equipment_id, -1)
 
 
+def broadcast_equipment_bulk(payload: Dict):
+    if not event_bus:
+        return
+    # One event per bulk operation rather than one per row
+    event_bus.publish("equipment_bulk_changed", payload)
@@ -0,0 +1,142 @@
+import logging
+import re
+import time
+from collections import Counter
+from functools import lru_cache
+from typing import Optional
+
+from flask import current_app, has_app_context, has_request_context, request
+
+from .metrics import current_request_stats, observe_statements, track_request_stats
+
+
+logger = logging.getLogger(__name__)
+
+# environ key of the per-request statement shape Counter
+SHAPES_KEY = "sql_profiler.shapes"
+# Longest statement / parameter text written to the log
+LOG_TEXT_LIMIT = 2000
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.$])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<!:):\w+|\?")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(statement: str) -> str:
+    """Statement shape with literals, placeholders and IN-list lengths erased."""
+    shape = _STRING_LITERAL.sub("?", statement)
+    shape = _PLACEHOLDER.sub("?", shape)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _IN_LIST.sub("(?+)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+class SQLProfiler:
+    """Opt-in statement profiler: slow-query log with plans, N+1 detection
+    and a ``Server-Timing`` header carrying each request's DB time.
+
+    Statement timing and per-request totals come from the metrics module's
+    cursor hooks and RequestStats; only statement shapes are counted here.
+    """
+
+    def __init__(self, slow_ms: float, explain: bool, repeat_threshold: int):
+        self.slow_seconds = slow_ms / 1000
+        self.explain = explain
+        self.repeat_threshold = repeat_threshold
+
+    def record(self, conn, cursor, statement: str, parameters, elapsed: float, executemany: bool) -> None:
+        if has_request_context():
+            shapes = request.environ.setdefault(SHAPES_KEY, Counter())
+            shapes[fingerprint(statement)] += 1
+        if elapsed >= self.slow_seconds:
+            self.log_slow(conn, cursor, statement, parameters, elapsed, executemany)
+
+    def log_slow(self, conn, cursor, statement: str, parameters, elapsed: float, executemany: bool) -> None:
+        where = f"{request.method} {request.path}" if has_request_context() else "outside a request"
+        plan = None
+        if self.explain and not executemany and statement.split(None, 1)[0].upper() in ("SELECT", "WITH"):
+            plan = explain(conn, statement, parameters)
+        logger.warning(
+            "Slow query (%.1f ms, %s): %s | params=%s%s",
+            elapsed * 1000,
+            where,
+            statement[:LOG_TEXT_LIMIT],
+            repr(parameters)[:LOG_TEXT_LIMIT],
+            f"\nplan:\n{plan}" if plan else "",
+        )
+
+    def finish_request(self, response):
+        stats = current_request_stats()
+        if stats is None:
+            return response
+        shapes: Counter = request.environ.get(SHAPES_KEY) or Counter()
+        repeated = [(shape, n) for shape, n in shapes.most_common() if n >= self.repeat_threshold]
+        for shape, n in repeated:
+            logger.warning("Possible N+1 in %s %s: %d x %s", request.method, request.path, n, shape[:LOG_TEXT_LIMIT])
+        response.headers.add(
+            "Server-Timing",
+            f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.sql_statements} queries, {len(shapes)} shapes", '
+            f"total;dur={(time.perf_counter() - stats.start) * 1000:.1f}",
+        )
+        return response
+
+
+def explain(conn, statement: str, parameters) -> Optional[str]:
+    """Query plan for ``statement`` on the same connection and parameters.
+
+    Runs on a separate raw DBAPI cursor so the original result set and the
+    SQLAlchemy event hooks are left alone. Uses EXPLAIN, never ANALYZE: the
+    slow statement has already run once. Outside SQLite it runs inside a
+    savepoint, since a failed statement would otherwise abort the request's
+    open transaction.
+    """
+    sqlite = conn.dialect.name == "sqlite"
+    prefix = "EXPLAIN QUERY PLAN " if sqlite else "EXPLAIN "
+    try:
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            if not sqlite:
+                cursor.execute("SAVEPOINT sql_profiler_explain")
+            try:
+                cursor.execute(prefix + statement, parameters)
+                rows = cursor.fetchall()
+            except Exception:
+                if not sqlite:
+                    cursor.execute("ROLLBACK TO SAVEPOINT sql_profiler_explain")
+                raise
+            if not sqlite:
+                cursor.execute("RELEASE SAVEPOINT sql_profiler_explain")
+        finally:
+            cursor.close()
+    except Exception as exc:
+        return f"(EXPLAIN failed: {type(exc).__name__}: {exc})"
+    return "\n".join(" | ".join(str(col) for col in row) for row in rows)
+
+
+def _current_profiler() -> Optional[SQLProfiler]:
+    return current_app.extensions.get("sql_profiler") if has_app_context() else None
+
+
+def _observe(conn, cursor, statement, parameters, elapsed, executemany):
+    profiler = _current_profiler()
+    if profiler is not None:
+        profiler.record(conn, cursor, statement, parameters, elapsed, executemany)
+
+
+def init_sql_profiler(app) -> Optional[SQLProfiler]:
+    """Enable the profiler when SQL_PROFILER_ENABLED is set (off by default)."""
+    if not app.config.get("SQL_PROFILER_ENABLED", False):
+        return None
+    profiler = SQLProfiler(
+        slow_ms=float(app.config.get("SQL_SLOW_QUERY_MS", 200)),
+        explain=bool(app.config.get("SQL_EXPLAIN_SLOW", True)),
+        repeat_threshold=int(app.config.get("SQL_N_PLUS_ONE_THRESHOLD", 10)),
+    )
+    app.extensions["sql_profiler"] = profiler
+    track_request_stats(app)
+    observe_statements(_observe)
+    app.after_request(profiler.finish_request)
+    return profiler
@@ -0,0 +1,193 @@
+import hashlib
+import hmac
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+import jwt as pyjwt
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from flask_jwt_extended import decode_token, get_jwt, get_jwt_identity, jwt_required
+from sqlalchemy import func, or_, select
+
+from .authz import is_token_revoked
+from .models import db, ChangeLog
+from . import socketio_events
+from .socketio_events import comment_counts_payload
+
+
+stream_bp = Blueprint("stream", __name__, url_prefix="/api")
+
+# Change log rows older than this are pruned (at most once per interval)
+_last_prune = {"at": 0.0}
+PRUNE_INTERVAL_SECONDS = 300
+
+# Change log event -> comment count delta it implies
+COUNT_DELTAS = {"new_comment": 1, "comment_deleted": -1}
+
+# Audience of the stream tokens passed in ``?token=``
+STREAM_TOKEN_AUDIENCE = "equipment-stream"
+
+
+def record_change(session, model, event: str, payload: Dict, equipment_id: Optional[int] = None, retention_hours: float = 24) -> None:
+    """Append an event to the change log inside the caller's transaction."""
+    session.add(model(event=event, equipment_id=equipment_id, payload=payload))
+    now = time.monotonic()
+    if now - _last_prune["at"] >= PRUNE_INTERVAL_SECONDS:
+        _last_prune["at"] = now
+        cutoff = datetime.utcnow() - timedelta(hours=retention_hours)
+        session.execute(model.__table__.delete().where(model.created_at < cutoff))
+
+
+def format_sse(data: Dict, event: Optional[str] = None, event_id: Optional[int] = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+def parse_last_event_id(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value not in (None, "") else None
+    except ValueError:
+        return None
+
+
+def change_events(rows: Iterable) -> List[str]:
+    """SSE frames for a batch of change log rows, plus one coalesced count update."""
+    frames, deltas, last_id = [], {}, None
+    for row in rows:
+        frames.append(format_sse(row.payload, row.event, row.id))
+        if row.event in COUNT_DELTAS and row.equipment_id is not None:
+            deltas[row.equipment_id] = deltas.get(row.equipment_id, 0) + COUNT_DELTAS[row.event]
+        last_id = row.id
+    deltas = {eid: d for eid, d in deltas.items() if d}
+    if deltas:
+        frames.append(format_sse(comment_counts_payload(deltas), "comment_counts_updated", last_id))
+    return frames
+
+
+def change_stream(
+    session,
+    model,
+    last_id: Optional[int],
+    equipment_ids: Optional[List[int]] = None,
+    max_seconds: float = 25,
+    poll_interval: float = 1.0,
+    sleep: Callable[[float], None] = time.sleep,
+):
+    """Yield SSE frames for change log rows after ``last_id``.
+
+    The stream ends after ``max_seconds`` so it fits serverless time limits;
+    EventSource reconnects on its own and resumes with Last-Event-ID.
+    """
+    if last_id is None:
+        last_id = session.scalar(select(func.max(model.id))) or 0
+    yield f"retry: {int(poll_interval * 1000)}\n\n"
+    deadline = time.monotonic() + max_seconds
+    while True:
+        stmt = select(model).where(model.id > last_id).order_by(model.id).limit(500)
+        if equipment_ids:
+            # Rows without an equipment (bulk changes) concern every subscriber
+            stmt = stmt.where(or_(model.equipment_id.in_(equipment_ids), model.equipment_id.is_(None)))
+        rows = session.scalars(stmt).all()
+        # Release the connection between polls
+        session.rollback()
+        if rows:
+            last_id = rows[-1].id
+            for frame in change_events(rows):
+                yield frame
+        else:
+            yield ": keepalive\n\n"
+        if time.monotonic() >= deadline:
+            return
+        sleep(poll_interval)
+
+
+def _stream_token_key() -> bytes:
+    # Derived from, never equal to, the access token key: a stream token
+    # leaked from an access log must not verify as a bearer token anywhere
+    return hmac.new(current_app.config["JWT_SECRET_KEY"].encode(), b"stream-token", hashlib.sha256).digest()
+
+
+def create_stream_token(identity: str, access_jti: str, seconds: float) -> str:
+    """Short-lived token that only opens /api/stream, for the EventSource URL."""
+    now = int(time.time())
+    claims = {"sub": identity, "aud": STREAM_TOKEN_AUDIENCE, "access_jti": access_jti, "iat": now, "exp": now + int(seconds)}
+    return pyjwt.encode(claims, _stream_token_key(), algorithm="HS256")
+
+
+def decode_stream_token(token: str) -> Dict:
+    return pyjwt.decode(token, _stream_token_key(), algorithms=["HS256"], audience=STREAM_TOKEN_AUDIENCE)
+
+
+def stream_token_response(seconds: float):
+    """Stream token for the caller's verified access token (call under @jwt_required)."""
+    token = create_stream_token(get_jwt_identity(), get_jwt()["jti"], seconds)
+    return jsonify({"token": token, "expires_in": int(seconds)})
+
+
+def stream_request_args(is_revoked: Callable[[Optional[str]], bool] = is_token_revoked):
+    """(identity, last_id, equipment_ids) from the request, or an error response.
+
+    Takes an access token in the Authorization header or, since EventSource
+    cannot send headers, a stream token from POST /api/stream/token in
+    ``?token=``; access tokens are never accepted in the URL, where proxies
+    and access logs would record them. ``is_revoked`` checks the access
+    token's jti; the default uses the backend app's revocation table.
+    """
+    auth = request.headers.get("Authorization", "")
+    try:
+        if auth.startswith("Bearer "):
+            claims = decode_token(auth[7:])
+            if claims.get("type") != "access":
+                raise ValueError("not an access token")
+            jti = claims.get("jti")
+        else:
+            claims = decode_stream_token(request.args.get("token", ""))
+            jti = claims.get("access_jti")
+    except Exception:
+        return None, (jsonify({"message": "Invalid token."}), 401)
+    if is_revoked(jti):
+        return None, (jsonify({"message": "Token has been revoked."}), 401)
+    last_id = parse_last_event_id(request.headers.get("Last-Event-ID") or request.args.get("last_event_id"))
+    try:
+        equipment_ids = [int(i) for i in request.args.get("equipment_ids", "").split(",") if i.strip()]
+    except ValueError:
+        return None, (jsonify({"message": "equipment_ids must be integers."}), 400)
+    return (claims["sub"], last_id, equipment_ids), None
+
+
+def sse_response(generator) -> Response:
+    return Response(
+        stream_with_context(generator),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@stream_bp.post("/stream/token")
+@jwt_required()
+def stream_token():
+    return stream_token_response(current_app.config.get("STREAM_TOKEN_SECONDS", 60))
+
+
+@stream_bp.get("/stream")
+def stream():
+    args, error = stream_request_args()
+    if error:
+        return error
+    _, last_id, equipment_ids = args
+    sio = socketio_events.socketio
+    return sse_response(change_stream(
+        db.session,
+        ChangeLog,
+        last_id,
+        equipment_ids,
+        max_seconds=current_app.config.get("STREAM_MAX_SECONDS", 25),
+        poll_interval=current_app.config.get("STREAM_POLL_SECONDS", 1.0),
+        sleep=sio.sleep if sio else time.sleep,
+    ))
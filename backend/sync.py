@@ -0,0 +1,91 @@
+from datetime import datetime
+from typing import Iterable, Sequence
+
+from sqlalchemy import case, delete, event, func, insert, select, update
+
+from .database import RoutingSession
+from .models import db, Equipment, EquipmentTombstone, SyncSequence
+
+
+EQUIPMENT_SEQUENCE = "equipment"
+
+
+def allocate_versions(session, count: int) -> int:
+    """Reserve ``count`` consecutive equipment versions; returns the first.
+
+    The counter row stays locked until the transaction ends, so versions
+    become visible in the order they were handed out and a client that
+    synced up to version N never misses a later commit with a lower number.
+    """
+    conn = session.connection()
+    conn.execute(
+        update(SyncSequence).where(SyncSequence.name == EQUIPMENT_SEQUENCE).values(value=SyncSequence.value + count)
+    )
+    last = conn.execute(select(SyncSequence.value).where(SyncSequence.name == EQUIPMENT_SEQUENCE)).scalar()
+    if last is None:
+        # First write on a fresh database: start after any existing versions
+        last = (conn.execute(select(func.max(Equipment.version))).scalar() or 0) + count
+        conn.execute(insert(SyncSequence).values(name=EQUIPMENT_SEQUENCE, value=last))
+    return last - count + 1
+
+
+def current_version(session) -> int:
+    return session.scalar(select(SyncSequence.value).where(SyncSequence.name == EQUIPMENT_SEQUENCE)) or 0
+
+
+def write_tombstones(session, equipment_ids: Iterable[int], first_version: int) -> None:
+    """Record deletions (upserting in case SQLite reused an id)."""
+    now = datetime.utcnow()
+    for offset, eid in enumerate(equipment_ids):
+        session.merge(EquipmentTombstone(equipment_id=eid, version=first_version + offset, deleted_at=now))
+
+
+def bulk_version_expression(session, equipment_ids: Sequence[int]):
+    """SQL expression giving each row in ``equipment_ids`` its own new version.
+
+    Set-based UPDATEs bypass the flush hook below; ``len(equipment_ids)``
+    versions are reserved and handed out in ID order through a CASE, so
+    sparse IDs don't burn versions on rows that aren't there.
+    """
+    ids = sorted(set(equipment_ids))
+    base = allocate_versions(session, len(ids))
+    return case({eid: base + offset for offset, eid in enumerate(ids)}, value=Equipment.id)
+
+
+def bulk_write_tombstones(session, equipment_ids: Sequence[int]) -> None:
+    """Tombstones for a set-based DELETE, written with two statements."""
+    ids = sorted(set(equipment_ids))
+    base = allocate_versions(session, len(ids))
+    now = datetime.utcnow()
+    conn = session.connection()
+    conn.execute(delete(EquipmentTombstone).where(EquipmentTombstone.equipment_id.in_(ids)))
+    conn.execute(
+        insert(EquipmentTombstone),
+        [{"equipment_id": eid, "version": base + offset, "deleted_at": now} for offset, eid in enumerate(ids)],
+    )
+
+
+def version_equipment_changes(session, flush_context, instances):
+    """before_flush hook: version new/changed equipment, tombstone deletions."""
+    changed = [obj for obj in session.new if isinstance(obj, Equipment)]
+    changed += [obj for obj in session.dirty if isinstance(obj, Equipment) and session.is_modified(obj)]
+    deleted = [obj for obj in session.deleted if isinstance(obj, Equipment)]
+    if not changed and not deleted:
+        return
+    version = allocate_versions(session, len(changed) + len(deleted))
+    for obj in changed:
+        obj.version = version
+        version += 1
+    write_tombstones(session, [obj.id for obj in deleted], version)
+
+
+event.listen(RoutingSession, "before_flush", version_equipment_changes)
+
+
+def ensure_sequence() -> None:
+    """Create the counter row and backfill versions for pre-existing rows."""
+    if db.session.get(SyncSequence, EQUIPMENT_SEQUENCE) is None:
+        db.session.execute(update(Equipment).where(Equipment.version == 0).values(version=Equipment.id))
+        start = db.session.scalar(select(func.max(Equipment.version))) or 0
+        db.session.add(SyncSequence(name=EQUIPMENT_SEQUENCE, value=start))
+        db.session.commit()
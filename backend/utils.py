@@ -10,10 +10,20 @@ from werkzeug.security import generate_password_hash, check_password_hash
 
 VALID_STATUSES = {"Active", "Broken", "Repair", "Retired"}
 
-
-def hash_password(password: str) -> str:
+# Header spellings validate_import_rows recognises for each field (case-insensitive)
+IMPORT_HEADER_ALIASES = {
+    "equipment_name": {"equipment name", "name", "equipment", "item name", "asset name"},
+    "equipment_code": {"code", "equipment code", "asset code", "id", "sku", "asset id"},
+    "category": {"category", "type", "equipment type"},
+    "location": {"location", "site", "place"},
+    "status": {"status", "state"},
+    "description": {"description", "notes", "note", "details"},
+}
+
+
+def hash_password(password: str, method: str = "pbkdf2:sha256") -> str:
     # Use PBKDF2-SHA256 via Werkzeug to avoid bcrypt's 72-byte limit entirely
-    return generate_password_hash(password or "", method="pbkdf2:sha256", salt_length=16)
+    return generate_password_hash(password or "", method=method, salt_length=16)
 
 
 def verify_password(password: str, hashed: str) -> bool:
@@ -60,19 +70,9 @@ def validate_import_rows(df: pd.DataFrame, column_map: Dict[str, str]) -> Tuple[
     # Build case-insensitive lookup of dataframe columns
     normalized_cols = {str(c).strip().lower(): c for c in df.columns}
 
-    # Common aliases for headers
-    aliases = {
-        "equipment_name": {"equipment name", "name", "equipment", "item name", "asset name"},
-        "equipment_code": {"code", "equipment code", "asset code", "id", "sku", "asset id"},
-        "category": {"category", "type", "equipment type"},
-        "location": {"location", "site", "place"},
-        "status": {"status", "state"},
-        "description": {"description", "notes", "note", "details"},
-    }
-
     # Resolve mapping: priority form-provided mapping; else try alias auto-detect
     resolved: Dict[str, str | None] = {}
-    for field, default_aliases in aliases.items():
+    for field, default_aliases in IMPORT_HEADER_ALIASES.items():
         provided = (column_map or {}).get(field)
         if provided and provided in df.columns:
             resolved[field] = provided
@@ -0,0 +1 @@
+# Benchmark scripts; run them from the project root, e.g. python -m benchmarks.sqlite_concurrency
@@ -0,0 +1,264 @@
+"""
+Latency and throughput of the main API paths, for regression comparison.
+
+Seeds a database with ``benchmarks.datagen`` (realistic ``extra`` payloads,
+Zipf-skewed comment counts), then times each scenario two ways:
+
+* ``client``: sequential requests through the Flask test client, in
+  process; isolates view, ORM and serialisation cost from the network.
+* ``http``: a concurrent load generator against ``python -m backend.app``;
+  adds the server, worker model and connection handling.
+
+Scenarios: equipment list pages (plain and filtered), comment pages for hot
+and cold items, CSV and XLSX export, and XLSX import. Every scenario reports
+request count, errors, requests/sec and p50/p95/p99/max latency as JSON.
+
+    python -m benchmarks.api_latency --rows 20000 --output before.json
+    python -m benchmarks.api_latency --rows 20000 --baseline before.json
+
+With ``--baseline``, scenarios whose p95 grew or throughput fell by more
+than ``--tolerance`` are listed under ``regressions`` and the exit status
+is 1. Point DATABASE_URL at PostgreSQL to benchmark it instead of SQLite.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from typing import Callable, Dict, Iterator, Optional
+
+from benchmarks.datagen import CATEGORIES, hot_equipment_ids, import_workbook, seed
+from benchmarks.login_throughput import free_port, wait_ready
+from benchmarks.sqlite_concurrency import percentile
+
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+SCENARIOS = ("list_equipment", "list_equipment_filtered", "list_comments_hot", "list_comments_cold", "export_csv", "export_xlsx", "import_xlsx")
+# Scenarios that touch every row; they get --heavy-requests instead of --requests
+HEAVY_SCENARIOS = {"export_csv", "export_xlsx", "import_xlsx"}
+
+
+def multipart_body(field: str, filename: str, data: bytes, content_type: str):
+    """A single-file multipart/form-data body and its Content-Type header."""
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode() + data + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def scenario_requests(name: str, rows: int, hot_ids, import_rows: int, rng: random.Random) -> Callable[[], Dict]:
+    """Factory for one scenario: each call returns the next request to send.
+
+    Requests are dicts with ``method``, ``path`` and optional ``body`` /
+    ``content_type``; building them is kept out of the timed section.
+    """
+    pages = max(1, rows // 20)
+
+    def make() -> Dict:
+        if name == "list_equipment":
+            return {"method": "GET", "path": f"/api/equipment?page={rng.randint(1, pages)}"}
+        if name == "list_equipment_filtered":
+            return {"method": "GET", "path": f"/api/equipment?status=Active&category={urllib.request.quote(rng.choice(CATEGORIES))}&page={rng.randint(1, 5)}"}
+        if name == "list_comments_hot":
+            return {"method": "GET", "path": f"/api/comments/equipment/{rng.choice(hot_ids)}?limit=50"}
+        if name == "list_comments_cold":
+            return {"method": "GET", "path": f"/api/comments/equipment/{rng.randint(1, rows)}?limit=50"}
+        if name == "export_csv":
+            return {"method": "GET", "path": "/api/equipment/export?format=csv"}
+        if name == "export_xlsx":
+            return {"method": "GET", "path": "/api/equipment/export"}
+        if name == "import_xlsx":
+            prefix = f"IMP{uuid.uuid4().hex[:8].upper()}"
+            body, content_type = multipart_body("file", "bench.xlsx", import_workbook(import_rows, rng, prefix), XLSX_MIMETYPE)
+            return {"method": "POST", "path": "/api/equipment/import", "body": body, "content_type": content_type}
+        raise ValueError(f"unknown scenario {name}")
+
+    return make
+
+
+def summarise(latencies, statuses, wall: float) -> Dict:
+    return {
+        "requests": len(statuses),
+        "errors": sum(1 for s in statuses if s != 200),
+        "requests_per_sec": round(len(statuses) / wall, 1) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(max(latencies), 2) if latencies else 0.0,
+    }
+
+
+def run_client(make: Callable[[], Dict], count: int) -> Dict:
+    """Sequential requests through the Flask test client."""
+    from backend.app import app
+
+    client = app.test_client()
+    token = client.post("/api/auth/login", json={"login": "admin", "password": "Admin@123"}).json["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    latencies, statuses = [], []
+    wall_start = time.perf_counter()
+    for _ in range(count):
+        req = make()
+        start = time.perf_counter()
+        response = client.open(req["path"], method=req["method"], data=req.get("body"), content_type=req.get("content_type"), headers=headers)
+        response.get_data()
+        latencies.append((time.perf_counter() - start) * 1000)
+        statuses.append(response.status_code)
+        response.close()
+    return summarise(latencies, statuses, time.perf_counter() - wall_start)
+
+
+def http_call(base: str, req: Dict, token: str, timeout: float = 300.0) -> int:
+    headers = {"Authorization": f"Bearer {token}"}
+    if req.get("content_type"):
+        headers["Content-Type"] = req["content_type"]
+    request = urllib.request.Request(base + req["path"], data=req.get("body"), headers=headers, method=req["method"])
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as resp:
+            resp.read()
+            return resp.status
+    except urllib.error.HTTPError as exc:
+        return exc.code
+    except OSError:
+        return 0
+
+
+def http_login(base: str) -> str:
+    req = urllib.request.Request(
+        f"{base}/api/auth/login",
+        data=json.dumps({"login": "admin", "password": "Admin@123"}).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(req, timeout=60) as resp:
+        return json.load(resp)["access_token"]
+
+
+def run_http(base: str, make: Callable[[], Dict], count: int, concurrency: int) -> Dict:
+    """``count`` requests spread over ``concurrency`` client threads."""
+    token = http_login(base)
+    latencies, statuses = [], []
+    lock = threading.Lock()
+    remaining = iter(range(count))
+
+    def worker():
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+                req = make()
+            start = time.perf_counter()
+            status = http_call(base, req, token)
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                statuses.append(status)
+                latencies.append(elapsed)
+
+    wall_start = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(min(concurrency, count))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return summarise(latencies, statuses, time.perf_counter() - wall_start)
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> Dict:
+    """Per-scenario ratios against a previous run, plus the regressions."""
+    comparison, regressions = {}, []
+    for driver, scenarios in results.items():
+        for name, current in scenarios.items():
+            previous = baseline.get("results", {}).get(driver, {}).get(name)
+            if not previous:
+                continue
+            p95_ratio = round(current["p95_ms"] / previous["p95_ms"], 3) if previous["p95_ms"] else None
+            rps_ratio = round(current["requests_per_sec"] / previous["requests_per_sec"], 3) if previous["requests_per_sec"] else None
+            comparison.setdefault(driver, {})[name] = {"p95_ratio": p95_ratio, "throughput_ratio": rps_ratio}
+            if (p95_ratio and p95_ratio > 1 + tolerance) or (rps_ratio and rps_ratio < 1 - tolerance):
+                regressions.append(f"{driver}/{name}")
+    return {"comparison": comparison, "regressions": regressions}
+
+
+def iter_scenarios(selected: str) -> Iterator[str]:
+    for name in selected.split(","):
+        if name not in SCENARIOS:
+            raise SystemExit(f"unknown scenario {name}; choose from {', '.join(SCENARIOS)}")
+        yield name
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--comments-max", type=int, default=200, help="comments on the hottest item")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent for comments per item")
+    parser.add_argument("--extra-keys", type=int, default=0)
+    parser.add_argument("--import-rows", type=int, default=200, help="rows per uploaded workbook")
+    parser.add_argument("--requests", type=int, default=200, help="requests per light scenario")
+    parser.add_argument("--heavy-requests", type=int, default=10, help="requests per export/import scenario")
+    parser.add_argument("--concurrency", type=int, default=20, help="client threads for the http driver")
+    parser.add_argument("--drivers", default="client,http", help="comma-separated subset of client,http")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--baseline", help="JSON report of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed p95/throughput drift before flagging")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="api-bench-")
+    env = dict(os.environ, UPLOADS_DIR=workdir)
+    env.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'bench.sqlite3')}")
+    os.environ.update(env)
+    dataset = seed(args.rows, args.comments_max, args.skew, args.extra_keys, args.seed)
+    hot_ids = hot_equipment_ids() or [1]
+
+    scenarios = list(iter_scenarios(args.scenarios))
+    results: Dict[str, Dict] = {}
+    for driver in args.drivers.split(","):
+        rng = random.Random(args.seed)
+        proc: Optional[subprocess.Popen] = None
+        if driver == "http":
+            port = free_port()
+            base = f"http://127.0.0.1:{port}"
+            proc = subprocess.Popen([sys.executable, "-m", "backend.app"], env=dict(env, PORT=str(port)), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            if proc is not None:
+                wait_ready(base, proc)
+            for name in scenarios:
+                make = scenario_requests(name, args.rows, hot_ids, args.import_rows, rng)
+                count = args.heavy_requests if name in HEAVY_SCENARIOS else args.requests
+                if driver == "client":
+                    results.setdefault(driver, {})[name] = run_client(make, count)
+                else:
+                    results.setdefault(driver, {})[name] = run_http(base, make, count, args.concurrency)
+        finally:
+            if proc is not None:
+                proc.terminate()
+                proc.wait(timeout=10)
+
+    report = {
+        "database": env["DATABASE_URL"].split(":", 1)[0],
+        "dataset": {**dataset, "skew": args.skew, "extra_keys": args.extra_keys},
+        "concurrency": args.concurrency,
+        "results": results,
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            report.update(compare(results, json.load(f), args.tolerance))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    if report.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
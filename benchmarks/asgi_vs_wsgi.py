@@ -0,0 +1,166 @@
+"""
+Read-heavy load against the WSGI (eventlet) and ASGI (uvicorn) servers.
+
+Seeds one SQLite database, then runs the same mix of dashboard requests
+(equipment list pages, comment pages, /me) at high concurrency against
+``python -m backend.app`` and ``uvicorn backend.asgi:app`` in turn, and
+reports throughput, latency percentiles and errors side by side.
+
+    python -m benchmarks.asgi_vs_wsgi --rows 5000 --concurrency 200 --seconds 15
+
+Point DATABASE_URL at PostgreSQL to compare psycopg2 with asyncpg instead.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.login_throughput import free_port, wait_ready
+from benchmarks.sqlite_concurrency import percentile
+
+
+def seed(rows: int, comments_per_row: int) -> None:
+    """Create the schema through the Flask app and bulk-insert test data."""
+    from backend.app import app
+    from backend.models import db, Comment, Equipment
+
+    with app.app_context():
+        if db.session.scalar(db.select(db.func.count(Equipment.id))) >= rows:
+            return
+        db.session.add_all([
+            Equipment(
+                equipment_name=f"Bench item {i}",
+                equipment_code=f"BENCH-{i:06d}",
+                category=random.choice(["Computers", "Vehicles", "Network"]),
+                location=f"Site {i % 25}",
+                status=random.choice(["Active", "Broken", "Repair", "Retired"]),
+            ) for i in range(rows)
+        ])
+        db.session.commit()
+        ids = db.session.scalars(db.select(Equipment.id)).all()
+        db.session.execute(Comment.__table__.insert(), [
+            {"equipment_id": eid, "user_id": 1, "comment_text": f"note {n}"}
+            for eid in ids for n in range(comments_per_row)
+        ])
+        db.session.commit()
+
+
+def call(url: str, token: str, payload=None, timeout: float = 60.0) -> int:
+    data = json.dumps(payload).encode() if payload is not None else None
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    req = urllib.request.Request(url, data=data, headers=headers)
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+            return resp.status
+    except urllib.error.HTTPError as exc:
+        return exc.code
+    except OSError:
+        return 0
+
+
+def login(base: str) -> str:
+    req = urllib.request.Request(
+        f"{base}/api/auth/login",
+        data=json.dumps({"login": "admin", "password": "Admin@123"}).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(req, timeout=60) as resp:
+        return json.load(resp)["access_token"]
+
+
+def request_mix(rows: int):
+    """Endless cycle of dashboard-style request paths."""
+    pages = max(1, rows // 20)
+    while True:
+        eid = random.randint(1, rows)
+        yield f"/api/equipment?page={random.randint(1, pages)}"
+        yield f"/api/comments/equipment/{eid}?limit=20"
+        yield f"/api/equipment?status=Active&page={random.randint(1, max(1, pages // 4))}"
+        yield f"/api/equipment/{eid}"
+        yield "/api/auth/me"
+
+
+def run_load(base: str, rows: int, concurrency: int, seconds: float) -> dict:
+    token = login(base)
+    latencies, statuses = [], []
+    lock = threading.Lock()
+    paths = request_mix(rows)
+    deadline = time.monotonic() + seconds
+
+    def worker():
+        while time.monotonic() < deadline:
+            with lock:
+                path = next(paths)
+            start = time.perf_counter()
+            status = call(base + path, token)
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                statuses.append(status)
+                latencies.append(elapsed)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+
+    return {
+        "requests": len(statuses),
+        "requests_per_sec": round(len(statuses) / wall, 1),
+        "errors": sum(1 for s in statuses if s != 200),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(max(latencies), 2) if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--comments-per-row", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--servers", default="wsgi,asgi", help="comma-separated subset of wsgi,asgi")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="asgi-bench-")
+    env = dict(os.environ, UPLOADS_DIR=workdir, DB_POOL_SIZE="20", DB_MAX_OVERFLOW="40")
+    env.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'bench.sqlite3')}")
+    os.environ.update(env)
+    seed(args.rows, args.comments_per_row)
+
+    commands = {
+        "wsgi": [sys.executable, "-m", "backend.app"],
+        "asgi": [sys.executable, "-m", "uvicorn", "backend.asgi:app", "--host", "127.0.0.1", "--log-level", "warning", "--no-access-log"],
+    }
+    results = {}
+    for label in args.servers.split(","):
+        port = free_port()
+        command = commands[label] + (["--port", str(port)] if label == "asgi" else [])
+        proc = subprocess.Popen(command, env=dict(env, PORT=str(port)), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            base = f"http://127.0.0.1:{port}"
+            wait_ready(base, proc)
+            results[label] = run_load(base, args.rows, args.concurrency, args.seconds)
+        finally:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    print(json.dumps({"concurrency": args.concurrency, "rows": args.rows, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
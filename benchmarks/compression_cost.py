@@ -0,0 +1,100 @@
+"""
+Bytes on the wire versus CPU cost for each response encoding.
+
+Seeds equipment rows with a large ``extra`` payload, fetches a
+``list_equipment`` page (``per_page=500``) and the streamed CSV export once
+uncompressed, then compresses both bodies with every available coding and
+level, reporting compressed size, ratio and CPU milliseconds per response.
+
+    python -m benchmarks.compression_cost --rows 5000 --extra-keys 30
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.sqlite_concurrency import percentile
+
+LEVELS = {"gzip": (1, 6, 9), "br": (1, 4, 6, 11), "zstd": (1, 3, 9, 19)}
+
+
+def seed(rows: int, extra_keys: int) -> None:
+    from backend.app import app
+    from backend.models import db, Equipment
+
+    with app.app_context():
+        db.session.add_all([
+            Equipment(
+                equipment_name=f"Bench item {i}",
+                equipment_code=f"BENCH-{i:06d}",
+                category="Computers",
+                location=f"Site {i % 25}",
+                status="Active",
+                extra={f"field_{k}": f"value {i}-{k} serial SN{i * 31 + k:08d}" for k in range(extra_keys)},
+            ) for i in range(rows)
+        ])
+        db.session.commit()
+
+
+def fetch_payloads(per_page: int) -> dict:
+    """Identity-encoded bodies exactly as the API produces them."""
+    from backend.app import app
+
+    client = app.test_client()
+    token = client.post("/api/auth/login", json={"username": "admin", "password": "Admin@123"}).json["access_token"]
+    headers = {"Authorization": f"Bearer {token}", "Accept-Encoding": "identity"}
+    return {
+        f"list_per_page_{per_page}": client.get(f"/api/equipment?per_page={per_page}", headers=headers).data,
+        "export_csv": client.get("/api/equipment/export?format=csv", headers=headers).data,
+    }
+
+
+def measure(data: bytes, coding: str, level: int, repeat: int) -> dict:
+    from backend.compression import compress_bytes
+
+    timings = []
+    for _ in range(repeat):
+        start = time.process_time()
+        out = compress_bytes(data, coding, level)
+        timings.append((time.process_time() - start) * 1000)
+    return {
+        "bytes": len(out),
+        "ratio": round(len(data) / len(out), 2),
+        "cpu_ms_p50": round(percentile(timings, 50), 2),
+        "cpu_ms_max": round(max(timings), 2),
+        "mb_per_cpu_sec": round(len(data) / 1e6 / max(percentile(timings, 50) / 1000, 1e-9), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--extra-keys", type=int, default=30)
+    parser.add_argument("--per-page", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="compression-bench-")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'bench.sqlite3')}")
+    os.environ.setdefault("UPLOADS_DIR", workdir)
+    seed(args.rows, args.extra_keys)
+
+    from backend.compression import available_encoders
+
+    encoders = available_encoders()
+    results = {}
+    for name, data in fetch_payloads(args.per_page).items():
+        entry = {"identity_bytes": len(data), "encodings": {}}
+        for coding, levels in LEVELS.items():
+            if coding not in encoders:
+                entry["encodings"][coding] = "unavailable (install brotli / zstandard)"
+                continue
+            entry["encodings"][coding] = {str(level): measure(data, coding, level, args.repeat) for level in levels}
+        results[name] = entry
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Synthetic equipment data shared by the benchmarks.
+
+Rows look like a real asset register: a nested ``extra`` payload
+(manufacturer, serials, purchase data, specs, tags), a status mix that is
+mostly Active, and Zipf-distributed comment counts so a few hot items carry
+hundreds of comments while most have none. Everything is seeded from one
+``random.Random`` so runs are reproducible.
+
+Data goes through whichever database the Flask app is configured for
+(DATABASE_URL), so the same seed serves SQLite and PostgreSQL:
+
+    python -m benchmarks.datagen --rows 50000 --comments-max 400
+"""
+import argparse
+import io
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from openpyxl import Workbook
+
+CATEGORIES = ["Computers", "Network", "Vehicles", "Tools", "Furniture", "Medical", "Audio/Video", "Power"]
+STATUS_WEIGHTS = {"Active": 70, "Repair": 12, "Broken": 8, "Retired": 10}
+MANUFACTURERS = {
+    "Computers": ["Dell", "Lenovo", "HP", "Apple"],
+    "Network": ["Cisco", "Ubiquiti", "Juniper", "MikroTik"],
+    "Vehicles": ["Toyota", "Linde", "Jungheinrich", "Ford"],
+    "Tools": ["Bosch", "Makita", "DeWalt", "Hilti"],
+    "Furniture": ["Steelcase", "Herman Miller", "IKEA"],
+    "Medical": ["Philips", "GE Healthcare", "Siemens"],
+    "Audio/Video": ["Sony", "Epson", "Samsung", "Shure"],
+    "Power": ["APC", "Eaton", "Vertiv"],
+}
+SITES = ["London", "Manchester", "Baku", "Berlin", "Warehouse A", "Warehouse B", "HQ", "Data Centre 1"]
+TAGS = ["critical", "leased", "shared", "spare", "calibrated", "insured", "field", "loaner"]
+COMMENT_SNIPPETS = [
+    "Checked during the weekly inspection, no issues.",
+    "Reported fault by the night shift; ticket raised.",
+    "Firmware updated to the latest vendor release.",
+    "Moved to a new desk, asset label re-applied.",
+    "Battery replaced, running a burn-in test.",
+    "Awaiting parts from the supplier.",
+    "Returned from repair, back in service.",
+]
+IMPORT_HEADERS = ["Equipment Name", "Code", "Category", "Location", "Status", "Description"]
+
+BATCH_SIZE = 1000
+
+
+def make_extra(rng: random.Random, index: int, category: str, extra_keys: int = 0) -> Dict:
+    """A realistic ``extra`` payload, padded with ``extra_keys`` flat custom fields."""
+    purchased = datetime(2016, 1, 1) + timedelta(days=rng.randint(0, 3000))
+    extra = {
+        "Manufacturer": rng.choice(MANUFACTURERS[category]),
+        "Model": f"{rng.choice('ABCDEFGHJKLMNPRSTX')}{rng.randint(100, 9999)}",
+        "Serial Number": f"SN{rng.getrandbits(40):010X}",
+        "Purchase Date": purchased.date().isoformat(),
+        "Warranty Until": (purchased + timedelta(days=365 * rng.choice((1, 2, 3, 5)))).date().isoformat(),
+        "Cost": round(rng.lognormvariate(6.5, 1.1), 2),
+        "Assigned To": f"employee{rng.randint(1, 2000):04d}@example.com" if rng.random() < 0.6 else "",
+        "Tags": rng.sample(TAGS, rng.randint(0, 3)),
+        "Specs": {
+            "weight_kg": round(rng.uniform(0.2, 900), 1),
+            "power_w": rng.choice((None, 45, 65, 90, 240, 1500)),
+            "asset_tag": f"AT-{index:07d}",
+        },
+    }
+    for k in range(extra_keys):
+        extra[f"Custom {k}"] = f"value {index}-{k} ref {rng.getrandbits(24):06x}"
+    return extra
+
+
+def make_equipment(rng: random.Random, index: int, extra_keys: int = 0, code_prefix: str = "BENCH") -> Dict:
+    category = rng.choice(CATEGORIES)
+    extra = make_extra(rng, index, category, extra_keys)
+    return {
+        "equipment_name": f"{extra['Manufacturer']} {category.rstrip('s')} {extra['Model']}",
+        "equipment_code": f"{code_prefix}-{index:07d}",
+        "category": category,
+        "location": rng.choice(SITES),
+        "status": rng.choices(list(STATUS_WEIGHTS), weights=list(STATUS_WEIGHTS.values()))[0],
+        "description": rng.choice(("", "", "Spare unit", "Primary unit for the site", "Shared between teams")),
+        "extra": extra,
+    }
+
+
+def comment_counts(rng: random.Random, rows: int, comments_max: int, skew: float) -> List[int]:
+    """Zipf-like comments per row: rank r gets ``comments_max / r**skew``, ranks shuffled."""
+    counts = [int(comments_max / (rank ** skew)) for rank in range(1, rows + 1)]
+    rng.shuffle(counts)
+    return counts
+
+
+def import_workbook(rows: int, rng: random.Random, code_prefix: str = "IMP") -> bytes:
+    """An .xlsx upload in the layout of ``generate_excel_template``."""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Equipment")
+    ws.append(IMPORT_HEADERS)
+    for i in range(rows):
+        row = make_equipment(rng, i, code_prefix=code_prefix)
+        ws.append([row["equipment_name"], row["equipment_code"], row["category"], row["location"], row["status"], row["description"]])
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def seed(rows: int, comments_max: int = 200, skew: float = 1.1, extra_keys: int = 0, seed_value: int = 0) -> Dict:
+    """Bulk-insert ``rows`` equipment items plus their comments; returns a summary.
+
+    Inserts go straight to the tables in batches (the ORM flush is what the
+    benchmarks measure, not what they should wait on), so versions are
+    assigned afterwards with one set-based UPDATE, like the bulk endpoints do.
+    Re-running against a database that already holds ``rows`` items is a no-op.
+    """
+    from backend.app import app
+    from backend.lookups import encode_lookups
+    from backend.models import db, Comment, Equipment, User
+    from backend.sync import bulk_version_expression
+
+    rng = random.Random(seed_value)
+    with app.app_context():
+        existing = db.session.scalar(db.select(db.func.count(Equipment.id)))
+        if existing >= rows:
+            return {"rows": existing, "comments": db.session.scalar(db.select(db.func.count(Comment.id))), "seeded": False}
+
+        start = time.perf_counter()
+        for low in range(existing, rows, BATCH_SIZE):
+            db.session.execute(
+                Equipment.__table__.insert(),
+                [encode_lookups(db.session, make_equipment(rng, i, extra_keys)) for i in range(low, min(low + BATCH_SIZE, rows))],
+            )
+        ids = db.session.scalars(db.select(Equipment.id).where(Equipment.version == 0).order_by(Equipment.id)).all()
+        if ids:
+            db.session.execute(db.update(Equipment).where(Equipment.id.between(ids[0], ids[-1]), Equipment.version == 0).values(version=bulk_version_expression(db.session, ids)))
+        db.session.commit()
+
+        user_ids = db.session.scalars(db.select(User.id)).all()
+        now = datetime.utcnow()
+        pending = []
+        for eid, count in zip(ids, comment_counts(rng, len(ids), comments_max, skew)):
+            for n in range(count):
+                pending.append({
+                    "equipment_id": eid,
+                    "user_id": rng.choice(user_ids),
+                    "comment_text": rng.choice(COMMENT_SNIPPETS),
+                    "created_at": now - timedelta(minutes=(count - n) * 37),
+                })
+            if len(pending) >= BATCH_SIZE:
+                db.session.execute(Comment.__table__.insert(), pending)
+                pending = []
+        if pending:
+            db.session.execute(Comment.__table__.insert(), pending)
+        db.session.commit()
+        comments = db.session.scalar(db.select(db.func.count(Comment.id)))
+        return {"rows": existing + len(ids), "comments": comments, "seeded": True, "seconds": round(time.perf_counter() - start, 2)}
+
+
+def hot_equipment_ids(limit: int = 10) -> List[int]:
+    """Items with the most comments (the heavy tail of the Zipf draw)."""
+    from backend.app import app
+    from backend.models import db, Comment
+
+    with app.app_context():
+        return db.session.scalars(
+            db.select(Comment.equipment_id)
+            .group_by(Comment.equipment_id)
+            .order_by(db.func.count(Comment.id).desc())
+            .limit(limit)
+        ).all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--comments-max", type=int, default=200, help="comments on the hottest item")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent for comments per item")
+    parser.add_argument("--extra-keys", type=int, default=0, help="flat custom fields added to extra")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if "DATABASE_URL" not in os.environ:
+        workdir = tempfile.mkdtemp(prefix="datagen-")
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.sqlite3')}"
+        os.environ.setdefault("UPLOADS_DIR", workdir)
+    summary = seed(args.rows, args.comments_max, args.skew, args.extra_keys, args.seed)
+    summary["database_url"] = os.environ["DATABASE_URL"]
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Where Excel import time and memory go, stage by stage.
+
+Generates (or reads) an .xlsx workload and runs it through the same code as
+``POST /api/equipment/import``, timing each stage on its own:
+
+* ``parse``: ``parse_excel_to_rows`` (pandas/openpyxl into a DataFrame)
+* ``validate``: ``validate_import_rows`` (mapping, ``extra``, status/code checks)
+* ``insert``: duplicate lookup, code assignment, ORM insert and commit
+
+Each stage reports wall and CPU seconds, peak RSS while it ran (sampled from
+/proc/self/statm; elsewhere the process-lifetime ``ru_maxrss``), and the
+tracemalloc peak of Python allocations. Tracing slows allocation-heavy
+stages noticeably; pass ``--no-tracemalloc`` for clean timings.
+
+    python -m benchmarks.import_stages --rows 100000 --extra-columns 12
+    python -m benchmarks.import_stages --file customer_sheet.xlsx --no-tracemalloc
+
+Like the endpoint, the insert stage is skipped when validation reports
+errors. Point DATABASE_URL at PostgreSQL to time its insert instead.
+"""
+import argparse
+import io
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict
+
+from benchmarks.xlsx_workload import add_workload_arguments, workload_kwargs, write_workbook
+
+STATM_PATH = "/proc/self/statm"
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss() -> int:
+    with open(STATM_PATH) as f:
+        return int(f.read().split()[1]) * PAGE_SIZE
+
+
+def lifetime_peak_rss() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # bytes on macOS, KiB on Linux
+
+
+class RssSampler(threading.Thread):
+    """Polls resident set size in the background and keeps the maximum."""
+
+    def __init__(self, interval: float = 0.005):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = current_rss()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def stop(self) -> int:
+        self._done.set()
+        self.join()
+        self.peak = max(self.peak, current_rss())
+        return self.peak
+
+
+@contextmanager
+def measure_stage(name: str, results: Dict, trace: bool):
+    sampler = RssSampler() if os.path.exists(STATM_PATH) else None
+    rss_before = current_rss() if sampler else lifetime_peak_rss()
+    if sampler:
+        sampler.start()
+    if trace:
+        tracemalloc.reset_peak()
+    wall, cpu = time.perf_counter(), time.process_time()
+    yield
+    entry = {
+        "wall_s": round(time.perf_counter() - wall, 3),
+        "cpu_s": round(time.process_time() - cpu, 3),
+    }
+    rss_peak = sampler.stop() if sampler else lifetime_peak_rss()
+    entry["rss_before_mb"] = round(rss_before / 2**20, 1)
+    entry["rss_peak_mb"] = round(rss_peak / 2**20, 1)
+    entry["rss_growth_mb"] = round((rss_peak - rss_before) / 2**20, 1)
+    if trace:
+        entry["tracemalloc_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+    results[name] = entry
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_workload_arguments(parser)
+    parser.add_argument("--file", help="existing .xlsx to import instead of a generated workload")
+    parser.add_argument("--column-map", default="{}", help="JSON column_map, as the import form sends it")
+    parser.add_argument("--no-tracemalloc", action="store_true")
+    parser.add_argument("--skip-insert", action="store_true")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="import-bench-")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'bench.sqlite3')}")
+    os.environ.setdefault("UPLOADS_DIR", workdir)
+
+    report: Dict = {"stages": {}}
+    if args.file:
+        with open(args.file, "rb") as f:
+            data = f.read()
+        report["workload"] = {"path": args.file}
+    else:
+        buffer = io.BytesIO()
+        start = time.perf_counter()
+        report["workload"] = write_workbook(buffer, **workload_kwargs(args))
+        report["workload"]["generate_s"] = round(time.perf_counter() - start, 2)
+        data = buffer.getvalue()
+    report["workload"]["bytes"] = len(data)
+
+    # Import (and create the schema) before tracing so startup isn't counted
+    from backend.app import app
+    from backend.equipment import assign_import_codes, import_duplicate_codes, insert_import_rows
+    from backend.models import db
+    from backend.utils import parse_excel_to_rows, validate_import_rows
+
+    trace = not args.no_tracemalloc
+    if trace:
+        tracemalloc.start()
+    stages = report["stages"]
+
+    with measure_stage("parse", stages, trace):
+        df = parse_excel_to_rows(io.BytesIO(data))
+    stages["parse"]["shape"] = list(df.shape)
+
+    with measure_stage("validate", stages, trace):
+        rows, errors = validate_import_rows(df, json.loads(args.column_map))
+    del df
+    stages["validate"]["rows"] = len(rows)
+    stages["validate"]["errors"] = len(errors)
+    stages["validate"]["first_errors"] = errors[:5]
+
+    if args.skip_insert:
+        stages["insert"] = {"skipped": "--skip-insert"}
+    elif errors:
+        stages["insert"] = {"skipped": "validation errors (the endpoint rejects the file)"}
+    else:
+        with app.app_context():
+            with measure_stage("insert", stages, trace):
+                duplicates = import_duplicate_codes(rows)
+                if not duplicates:
+                    assign_import_codes(rows)
+                    insert_import_rows(rows)
+                    db.session.commit()
+            stages["insert"]["duplicates_in_db"] = len(duplicates)
+            stages["insert"]["database"] = db.engine.url.get_backend_name()
+
+    if trace:
+        tracemalloc.stop()
+    report["total_wall_s"] = round(sum(s.get("wall_s", 0) for s in stages.values()), 3)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
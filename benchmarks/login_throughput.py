@@ -0,0 +1,133 @@
+"""
+Login throughput under a login storm, against the real eventlet server.
+
+Starts ``python -m backend.app`` with PASSWORD_HASH_OFFLOAD off and on,
+fires concurrent logins, and probes /api/health at the same time to show
+how much the rest of the server stalls while passwords are being hashed.
+
+    python -m benchmarks.login_throughput --logins 200 --concurrency 20
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.sqlite_concurrency import percentile
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def request(url: str, payload=None, timeout: float = 60.0):
+    data = json.dumps(payload).encode() if payload is not None else None
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return resp.status
+    except urllib.error.HTTPError as exc:
+        return exc.code
+
+
+def wait_ready(base: str, proc: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            if request(f"{base}/api/health", timeout=1) == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+def run_storm(base: str, logins: int, concurrency: int) -> dict:
+    statuses, login_ms, health_ms = [], [], []
+    remaining = iter(range(logins))
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def worker():
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            start = time.perf_counter()
+            status = request(f"{base}/api/auth/login", {"login": "user", "password": "User@123"})
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                statuses.append(status)
+                login_ms.append(elapsed)
+
+    def prober():
+        while not done.is_set():
+            start = time.perf_counter()
+            request(f"{base}/api/health")
+            health_ms.append((time.perf_counter() - start) * 1000)
+            time.sleep(0.05)
+
+    probe = threading.Thread(target=prober)
+    probe.start()
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    wall = time.perf_counter() - start
+    done.set()
+    probe.join()
+
+    return {
+        "logins_per_sec": round(len(statuses) / wall, 2),
+        "ok": statuses.count(200),
+        "busy_503": statuses.count(503),
+        "login_p50_ms": round(percentile(login_ms, 50), 2),
+        "login_p95_ms": round(percentile(login_ms, 95), 2),
+        "health_p50_ms": round(percentile(health_ms, 50), 2),
+        "health_p95_ms": round(percentile(health_ms, 95), 2),
+        "health_max_ms": round(max(health_ms), 2) if health_ms else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    results = {}
+    for label, offload in (("inline", "0"), ("offloaded", "1")):
+        workdir = tempfile.mkdtemp(prefix=f"login-bench-{label}-")
+        port = free_port()
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.sqlite3')}",
+            UPLOADS_DIR=workdir,
+            PORT=str(port),
+            PASSWORD_HASH_OFFLOAD=offload,
+        )
+        proc = subprocess.Popen([sys.executable, "-m", "backend.app"], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            base = f"http://127.0.0.1:{port}"
+            wait_ready(base, proc)
+            results[label] = run_storm(base, args.logins, args.concurrency)
+        finally:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Multi-worker Socket.IO fan-out check.
+
+Starts two backend workers sharing one SQLite file and one event bus, connects
+a Socket.IO client to worker B, posts comments through worker A and checks
+that B's client receives ``new_comment`` and ``comment_counts_updated``.
+Prints delivery latency as JSON; exits non-zero if events are missing.
+
+Needs a Redis-compatible server (e.g. ``redis-server``) and the
+python-socketio client extras (``pip install requests websocket-client``).
+
+    python -m benchmarks.socketio_fanout --bus redis --url redis://127.0.0.1:6379/0
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+from benchmarks.login_throughput import free_port, wait_ready
+from benchmarks.sqlite_concurrency import percentile
+
+
+def post_json(url: str, payload: dict, token: str | None = None) -> dict:
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    req = urllib.request.Request(url, data=json.dumps(payload).encode(), headers=headers)
+    with urllib.request.urlopen(req, timeout=30) as resp:
+        return json.loads(resp.read())
+
+
+def start_worker(env: dict, port: int) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "backend.app"],
+        env=dict(env, PORT=str(port)), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    wait_ready(f"http://127.0.0.1:{port}", proc)
+    return proc
+
+
+def main():
+    import socketio
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bus", choices=("redis", "socketio"), default="redis")
+    parser.add_argument("--url", default=os.getenv("EVENT_BUS_URL", "redis://127.0.0.1:6379/0"))
+    parser.add_argument("--comments", type=int, default=20)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="fanout-")
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'fanout.sqlite3')}",
+        UPLOADS_DIR=workdir,
+        EVENT_BUS=args.bus,
+        EVENT_BUS_URL=args.url,
+        CORS_ORIGINS="*",
+    )
+    port_a, port_b = free_port(), free_port()
+    # Start sequentially so only one worker creates and seeds the schema
+    workers = [start_worker(env, port_a)]
+    try:
+        workers.append(start_worker(env, port_b))
+        base_a = f"http://127.0.0.1:{port_a}"
+        token = post_json(f"{base_a}/api/auth/login", {"login": "admin", "password": "Admin@123"})["access_token"]
+
+        sent_at: dict = {}
+        comment_ms, count_ms, count_total = [], [], [0]
+        lock = threading.Lock()
+        client = socketio.Client()
+
+        @client.on("new_comment")
+        def on_new_comment(payload):
+            with lock:
+                start = sent_at.get(payload["comment_text"])
+                if start is not None:
+                    comment_ms.append((time.perf_counter() - start) * 1000)
+
+        @client.on("comment_counts_updated")
+        def on_counts(payload):
+            with lock:
+                count_total[0] += sum(u["delta"] for u in payload["updates"])
+                if sent_at:
+                    count_ms.append((time.perf_counter() - max(sent_at.values())) * 1000)
+
+        client.connect(f"http://127.0.0.1:{port_b}")
+        client.emit("join_equipment", {"equipment_id": 1})
+        client.call("subscribe_counts", {"equipment_ids": [1]})
+
+        for i in range(args.comments):
+            text = f"fanout-{i}"
+            with lock:
+                sent_at[text] = time.perf_counter()
+            post_json(f"{base_a}/api/comments", {"equipment_id": 1, "comment_text": text}, token)
+
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline and (len(comment_ms) < args.comments or count_total[0] < args.comments):
+            time.sleep(0.05)
+        client.disconnect()
+
+        result = {
+            "bus": args.bus,
+            "comments_sent": args.comments,
+            "new_comment_received": len(comment_ms),
+            "count_delta_received": count_total[0],
+            "count_events": len(count_ms),
+            "new_comment_p50_ms": round(percentile(comment_ms, 50), 2),
+            "new_comment_p95_ms": round(percentile(comment_ms, 95), 2),
+        }
+        print(json.dumps(result, indent=2))
+        if len(comment_ms) < args.comments or count_total[0] != args.comments:
+            sys.exit(1)
+    finally:
+        for proc in workers:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
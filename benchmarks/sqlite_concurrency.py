@@ -0,0 +1,134 @@
+"""
+Concurrent list reads during an Excel import, on a fresh SQLite file.
+
+Runs the same workload with SQLITE_TUNING off (rollback journal) and on
+(WAL + pragmas) in separate processes and prints read latency while the
+import is writing.
+
+    python -m benchmarks.sqlite_concurrency --rows 20000 --readers 8
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+
+def build_workbook(rows: int) -> bytes:
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Equipment")
+    ws.append(["Equipment Name", "Code", "Category", "Location", "Status", "Description"])
+    statuses = ["Active", "Broken", "Repair", "Retired"]
+    for i in range(rows):
+        ws.append([f"Item {i}", f"BENCH-{i:07d}", f"Cat {i % 12}", f"Site {i % 40}", statuses[i % 4], "benchmark row"])
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run_mode(rows: int, readers: int) -> dict:
+    """Run one measurement in this process; env decides the SQLite mode."""
+    from backend.app import app
+
+    client = app.test_client()
+    token = client.post("/api/auth/login", json={"login": "admin", "password": "Admin@123"}).json["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    workbook = build_workbook(rows)
+
+    importing = threading.Event()
+    done = threading.Event()
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def importer():
+        c = app.test_client()
+        importing.set()
+        start = time.perf_counter()
+        resp = c.post(
+            "/api/equipment/import",
+            data={"file": (io.BytesIO(workbook), "bench.xlsx")},
+            headers=headers,
+            content_type="multipart/form-data",
+        )
+        result["import_seconds"] = round(time.perf_counter() - start, 3)
+        result["import_status"] = resp.status_code
+        done.set()
+
+    def reader():
+        c = app.test_client()
+        importing.wait()
+        while not done.is_set():
+            start = time.perf_counter()
+            resp = c.get("/api/equipment?per_page=50", headers=headers)
+            elapsed = time.perf_counter() - start
+            with lock:
+                if resp.status_code == 200:
+                    latencies.append(elapsed)
+                else:
+                    errors.append(resp.status_code)
+
+    result: dict = {}
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    for t in threads:
+        t.start()
+    importer()
+    for t in threads:
+        t.join()
+
+    ms = [v * 1000 for v in latencies]
+    result.update({
+        "reads": len(ms),
+        "read_errors": len(errors),
+        "read_p50_ms": round(percentile(ms, 50), 2),
+        "read_p95_ms": round(percentile(ms, 95), 2),
+        "read_max_ms": round(max(ms), 2) if ms else 0.0,
+        "read_mean_ms": round(statistics.fmean(ms), 2) if ms else 0.0,
+    })
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_mode(args.rows, args.readers)))
+        return
+
+    results = {}
+    for label, tuning in (("default", "0"), ("tuned", "1")):
+        workdir = tempfile.mkdtemp(prefix=f"sqlite-bench-{label}-")
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.sqlite3')}",
+            UPLOADS_DIR=workdir,
+            SQLITE_TUNING=tuning,
+        )
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.sqlite_concurrency", "--child", "--rows", str(args.rows), "--readers", str(args.readers)],
+            env=env, capture_output=True, text=True, check=True,
+        )
+        results[label] = json.loads(out.stdout.strip().splitlines()[-1])
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Synthetic .xlsx import workloads.
+
+Writes an equipment sheet the way users send them: the six fields
+``validate_import_rows`` maps (optionally under any of its header aliases),
+extra free-form columns that end up in ``extra``, and a controllable share
+of bad data: invalid statuses, codes duplicated within the file, and blank
+or ``0`` codes that the import replaces with generated ones. Rows stream
+through a write-only workbook, so 1M-row files do not need 1M rows in memory.
+
+    python -m benchmarks.xlsx_workload --rows 100000 --extra-columns 12 \\
+        --aliases random --invalid-status-rate 0.01 --duplicate-rate 0.005 --out big.xlsx
+"""
+import argparse
+import json
+import random
+import time
+from typing import Dict, List
+
+from openpyxl import Workbook
+
+from backend.utils import IMPORT_HEADER_ALIASES
+from benchmarks.datagen import IMPORT_HEADERS, make_equipment
+
+# Field order of IMPORT_HEADERS
+FIELDS = ["equipment_name", "equipment_code", "category", "location", "status", "description"]
+# Realistic extra columns, used before falling back to "Custom N"
+EXTRA_COLUMNS = ["Manufacturer", "Model", "Serial Number", "Purchase Date", "Warranty Until", "Cost", "Assigned To"]
+INVALID_STATUSES = ["active", "Lost", "In use", "BROKEN", "Pending disposal", "?"]
+ALIAS_MODES = ("canonical", "random", "upper")
+
+
+def header_row(mode: str, extra_columns: int, rng: random.Random) -> List[str]:
+    """Headers for the six mapped fields plus ``extra_columns`` unmapped ones."""
+    if mode == "canonical":
+        headers = list(IMPORT_HEADERS)
+    elif mode == "random":
+        # Any alias validate_import_rows accepts, in whatever case a user might type
+        headers = [rng.choice(sorted(IMPORT_HEADER_ALIASES[field])).title() for field in FIELDS]
+    elif mode == "upper":
+        headers = [h.upper() for h in IMPORT_HEADERS]
+    else:
+        raise ValueError(f"unknown alias mode {mode}")
+    extras = EXTRA_COLUMNS[:extra_columns] + [f"Custom {k}" for k in range(max(0, extra_columns - len(EXTRA_COLUMNS)))]
+    return headers + extras
+
+
+def write_workbook(
+    target,
+    rows: int,
+    extra_columns: int = 0,
+    aliases: str = "canonical",
+    invalid_status_rate: float = 0.0,
+    duplicate_rate: float = 0.0,
+    blank_code_rate: float = 0.0,
+    seed_value: int = 0,
+    code_prefix: str = "XLS",
+) -> Dict:
+    """Write the workload to ``target`` (path or file object); returns what was injected."""
+    rng = random.Random(seed_value)
+    headers = header_row(aliases, extra_columns, rng)
+    custom_keys = max(0, extra_columns - len(EXTRA_COLUMNS))
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Equipment")
+    ws.append(headers)
+    recent_codes: List[str] = []
+    injected = {"invalid_statuses": 0, "duplicate_codes": 0, "blank_codes": 0}
+    for i in range(rows):
+        item = make_equipment(rng, i, custom_keys, code_prefix)
+        if rng.random() < invalid_status_rate:
+            item["status"] = rng.choice(INVALID_STATUSES)
+            injected["invalid_statuses"] += 1
+        roll = rng.random()
+        if recent_codes and roll < duplicate_rate:
+            item["equipment_code"] = rng.choice(recent_codes)
+            injected["duplicate_codes"] += 1
+        elif roll < duplicate_rate + blank_code_rate:
+            item["equipment_code"] = rng.choice(("", "0"))
+            injected["blank_codes"] += 1
+        elif len(recent_codes) < 1000:
+            recent_codes.append(item["equipment_code"])
+        else:
+            recent_codes[i % 1000] = item["equipment_code"]
+
+        extra = item["extra"]
+        values = [item[field] for field in FIELDS]
+        for column in headers[len(FIELDS):]:
+            value = extra.get(column, "")
+            values.append(value if isinstance(value, (int, float, str)) else json.dumps(value))
+        ws.append(values)
+    wb.save(target)
+    return {"rows": rows, "columns": len(headers), "headers": headers, "aliases": aliases, **injected}
+
+
+def add_workload_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--extra-columns", type=int, default=6, help="unmapped columns stored in extra")
+    parser.add_argument("--aliases", choices=ALIAS_MODES, default="canonical", help="header spelling for the mapped fields")
+    parser.add_argument("--invalid-status-rate", type=float, default=0.0)
+    parser.add_argument("--duplicate-rate", type=float, default=0.0, help="share of rows repeating an earlier code")
+    parser.add_argument("--blank-code-rate", type=float, default=0.0, help="share of rows with a blank or 0 code")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def workload_kwargs(args: argparse.Namespace) -> Dict:
+    return {
+        "rows": args.rows,
+        "extra_columns": args.extra_columns,
+        "aliases": args.aliases,
+        "invalid_status_rate": args.invalid_status_rate,
+        "duplicate_rate": args.duplicate_rate,
+        "blank_code_rate": args.blank_code_rate,
+        "seed_value": args.seed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_workload_arguments(parser)
+    parser.add_argument("--out", required=True, help="path of the .xlsx file to write")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    summary = write_workbook(args.out, **workload_kwargs(args))
+    summary["seconds"] = round(time.perf_counter() - start, 2)
+    summary["path"] = args.out
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
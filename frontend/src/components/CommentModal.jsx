@@ -1,12 +1,22 @@
-import React, { useEffect, useState, useMemo } from 'react'
+import React, { useEffect, useState, useMemo, useRef } from 'react'
 import { Dialog, DialogTitle, DialogContent, DialogActions, Button, TextField, List, ListItem, ListItemText, Box, Typography, IconButton } from '@mui/material'
 import DeleteIcon from '@mui/icons-material/Delete'
 import { fetchComments, addComment, deleteComment } from '../services/api'
 import { getSocket, joinEquipmentRoom, leaveEquipmentRoom } from '../services/socket'
 
+const PAGE_SIZE = 50
+const POLL_MS = 15000
+
+function mergeNewer(prev, items) {
+  const known = new Set(prev.map(c => c.id))
+  return [...items.filter(c => !known.has(c.id)), ...prev]
+}
+
 export default function CommentModal({ open, onClose, equipment }) {
   const [comments, setComments] = useState([])
   const [text, setText] = useState('')
+  const [nextCursor, setNextCursor] = useState(null)
+  const latestCursor = useRef(null)
   const socket = useMemo(() => getSocket(), [])
 
   useEffect(() => {
@@ -14,16 +24,48 @@ export default function CommentModal({ open, onClose, equipment }) {
     let active = true
 
     async function load() {
-      const data = await fetchComments(equipment.id)
-      if (active) setComments(data)
+      const data = await fetchComments(equipment.id, { limit: PAGE_SIZE })
+      if (!active) return
+      setComments(data.items)
+      setNextCursor(data.next_cursor)
+      latestCursor.current = data.latest_cursor
     }
     load()
 
+    // Only fetch comments newer than the newest one we have. An empty thread
+    // has no cursor yet, so it re-reads the first page until one appears.
+    let polling = false
+    async function poll() {
+      if (polling) return
+      polling = true
+      try {
+        let more = true
+        while (active && more) {
+          if (!latestCursor.current) {
+            const data = await fetchComments(equipment.id, { limit: PAGE_SIZE })
+            if (!active) return
+            setComments(prev => mergeNewer(prev, data.items))
+            setNextCursor(cursor => cursor ?? data.next_cursor)
+            latestCursor.current = data.latest_cursor
+            return
+          }
+          const data = await fetchComments(equipment.id, { limit: PAGE_SIZE, since: latestCursor.current })
+          if (!active) return
+          setComments(prev => mergeNewer(prev, data.items))
+          latestCursor.current = data.latest_cursor
+          more = data.has_more
+        }
+      } finally {
+        polling = false
+      }
+    }
+    const timer = setInterval(poll, POLL_MS)
+
     joinEquipmentRoom(equipment.id)
 
     function onNewComment(payload) {
       if (payload.equipment_id === equipment.id) {
-        setComments(prev => [payload, ...prev])
+        setComments(prev => mergeNewer(prev, [payload]))
       }
     }
     function onCommentDeleted(payload) {
@@ -36,6 +78,7 @@ export default function CommentModal({ open, onClose, equipment }) {
 
     return () => {
       active = false
+      clearInterval(timer)
       leaveEquipmentRoom(equipment.id)
       socket.off('new_comment', onNewComment)
       socket.off('comment_deleted', onCommentDeleted)
@@ -53,6 +96,12 @@ export default function CommentModal({ open, onClose, equipment }) {
     await deleteComment(id)
   }
 
+  async function onLoadMore() {
+    const data = await fetchComments(equipment.id, { limit: PAGE_SIZE, cursor: nextCursor })
+    setComments(prev => [...prev, ...data.items.filter(c => !prev.some(p => p.id === c.id))])
+    setNextCursor(data.next_cursor)
+  }
+
   return (
     <Dialog open={open} onClose={onClose} fullWidth maxWidth="sm">
       <DialogTitle>Comments - {equipment?.equipment_name}</DialogTitle>
@@ -75,6 +124,11 @@ export default function CommentModal({ open, onClose, equipment }) {
             </ListItem>
           ))}
         </List>
+        {nextCursor && (
+          <Box display="flex" justifyContent="center">
+            <Button onClick={onLoadMore}>Load older comments</Button>
+          </Box>
+        )}
       </DialogContent>
       <DialogActions>
         <Button onClick={onClose}>Close</Button>
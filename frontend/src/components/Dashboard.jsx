@@ -3,8 +3,8 @@ import { Container, Paper, Box, TextField, MenuItem, Grid, CircularProgress, Ale
 import { Download } from 'lucide-react'
 import EquipmentTable from './EquipmentTable'
 import CommentModal from './CommentModal'
-import { fetchEquipment, me } from '../services/api'
-import { getSocket } from '../services/socket'
+import { fetchDashboard, fetchEquipment } from '../services/api'
+import { getSocket, subscribeCounts } from '../services/socket'
 import ExcelImport from './ExcelImport'
 import { exportEquipment } from '../services/api'
 
@@ -31,7 +31,14 @@ export default function Dashboard() {
     setError('')
     try {
       const params = { page, q, status, category, comment_count: commentCount }
-      const data = await fetchEquipment(params)
+      let data
+      if (user) {
+        data = await fetchEquipment(params)
+      } else {
+        const res = await fetchDashboard(params)
+        if (res.user) setUser(res.user)
+        data = res.equipment
+      }
       setItems(data.items)
       setTotalPages(data.total_pages)
       setFiltersMeta({ statuses: data.filters.statuses })
@@ -43,15 +50,19 @@ export default function Dashboard() {
     }
   }
 
-  useEffect(() => { me().then(setUser).catch(() => {}) }, [])
   useEffect(() => { load() }, [page, q, status, category, commentCount])
 
+  // Only receive comment count updates for the rows on screen
+  useEffect(() => { subscribeCounts(items.map(it => it.id)) }, [items.map(it => it.id).join(',')])
+
   useEffect(() => {
-    function onCountUpdated(payload) {
-      setItems(prev => prev.map(it => it.id === payload.equipment_id ? { ...it, comment_count: payload.count } : it))
+    // Batched count deltas: { updates: [{ equipment_id, delta }] }
+    function onCountsUpdated(payload) {
+      const deltas = new Map(payload.updates.map(u => [u.equipment_id, u.delta]))
+      setItems(prev => prev.map(it => deltas.has(it.id) ? { ...it, comment_count: Math.max(0, (it.comment_count || 0) + deltas.get(it.id)) } : it))
     }
-    socket.on('comment_count_updated', onCountUpdated)
-    return () => { socket.off('comment_count_updated', onCountUpdated) }
+    socket.on('comment_counts_updated', onCountsUpdated)
+    return () => { socket.off('comment_counts_updated', onCountsUpdated) }
   }, [socket])
 
   return (
@@ -5,6 +5,11 @@ const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || (import.meta.env.PROD
 
 const api = axios.create({ baseURL: API_BASE_URL })
 
+// Returned after a write; sending it back keeps our reads on the primary
+// database for a few seconds so we see our own changes
+const READ_PRIMARY_HEADER = 'X-DB-Read-Primary'
+let readPrimaryToken = null
+
 export function getToken() {
   return localStorage.getItem('access_token')
 }
@@ -15,6 +20,7 @@ export function setToken(token) {
 
 export function clearToken() {
   localStorage.removeItem('access_token')
+  readPrimaryToken = null
 }
 
 api.interceptors.request.use((config) => {
@@ -22,9 +28,20 @@ api.interceptors.request.use((config) => {
   if (token) {
     config.headers.Authorization = `Bearer ${token}`
   }
+  if (readPrimaryToken) {
+    config.headers[READ_PRIMARY_HEADER] = readPrimaryToken
+  }
   return config
 })
 
+api.interceptors.response.use((response) => {
+  const sticky = response.headers[READ_PRIMARY_HEADER.toLowerCase()]
+  if (sticky) {
+    readPrimaryToken = sticky
+  }
+  return response
+})
+
 export async function login(loginId, password) {
   const res = await api.post('/api/auth/login', { login: loginId, password })
   setToken(res.data.access_token)
@@ -47,8 +64,34 @@ export async function fetchEquipmentById(id) {
   return (await api.get(`/api/equipment/${id}`)).data
 }
 
-export async function fetchComments(equipmentId) {
-  return (await api.get(`/api/comments/equipment/${equipmentId}`)).data
+export async function fetchComments(equipmentId, params) {
+  // params: { limit, cursor } for older pages, { limit, since } for new comments only
+  return (await api.get(`/api/comments/equipment/${equipmentId}`, { params })).data
+}
+
+export async function fetchCommentSummaries(equipmentIds, latest = 3) {
+  // { "<id>": { count, latest: [...] } } for the given equipment IDs
+  return (await api.post('/api/comments/batch', { equipment_ids: equipmentIds, latest })).data
+}
+
+export async function batch(requests, { parallel = false } = {}) {
+  // requests: [{ id, method, path, body }] -> [{ id, status, body }] in the same order
+  return (await api.post('/api/batch', { requests, parallel })).data.responses
+}
+
+export async function fetchDashboard(params) {
+  // Current user and the first equipment page in one round trip
+  const query = new URLSearchParams(Object.entries(params).filter(([, v]) => v !== '' && v != null)).toString()
+  const [meRes, listRes] = await batch([
+    { id: 'me', method: 'GET', path: '/api/auth/me' },
+    { id: 'equipment', method: 'GET', path: `/api/equipment?${query}` },
+  ], { parallel: true })
+  if (listRes.status !== 200) {
+    const err = new Error('Failed to load equipment')
+    err.response = { data: listRes.body }
+    throw err
+  }
+  return { user: meRes.status === 200 ? meRes.body : null, equipment: listRes.body }
 }
 
 export async function addComment(equipmentId, comment_text) {
@@ -1,22 +1,123 @@
-// Socket.IO disabled for serverless deployment (not supported in Vercel)
-// Create a mock socket object to prevent errors
-const mockSocket = {
-  on: () => {},
-  off: () => {},
+// Socket.IO is not available in serverless deployments (Vercel), so live
+// updates come from the Server-Sent Events change stream at /api/stream.
+// This object mimics the small part of the socket API the components use.
+import api, { getToken } from './api'
+
+const RECONNECT_MS = 3000
+
+const handlers = {}
+const attached = new Set()
+let source = null
+let connecting = false
+let reconnectTimer = null
+let lastEventId = null
+// Equipment on screen (subscribeCounts) and with an open comment view
+// (joinEquipmentRoom); the stream is scoped to these when any are set
+let countIds = []
+const roomIds = new Set()
+let scopeKey = ''
+
+function currentScope() {
+  return [...new Set([...countIds, ...roomIds])].sort((a, b) => a - b).join(',')
+}
+
+// Reopen the stream when the scope changes, resuming from lastEventId; a
+// connect still waiting for its token picks up the new scope by itself
+function rescope() {
+  const key = currentScope()
+  if (key === scopeKey) return
+  scopeKey = key
+  if (source) {
+    close()
+    connect()
+  }
+}
+
+function dispatch(event) {
+  return (e) => {
+    if (e.lastEventId) lastEventId = e.lastEventId
+    const payload = JSON.parse(e.data)
+    ;(handlers[event] || []).forEach(handler => handler(payload))
+  }
+}
+
+function attach(event) {
+  if (!source || attached.has(event)) return
+  source.addEventListener(event, dispatch(event))
+  attached.add(event)
+}
+
+function close() {
+  clearTimeout(reconnectTimer)
+  reconnectTimer = null
+  source?.close()
+  source = null
+  attached.clear()
+}
+
+function reconnectLater() {
+  close()
+  reconnectTimer = setTimeout(connect, RECONNECT_MS)
+}
+
+// The access token never goes in the URL (proxies and access logs keep
+// URLs); each connection gets its own short-lived stream token instead.
+// Stream tokens expire, so reconnects are done here with a fresh one rather
+// than by EventSource's built-in retry, resuming from the last event seen.
+async function connect() {
+  if (source || connecting || typeof EventSource === 'undefined') return
+  if (!getToken()) return
+  connecting = true
+  try {
+    const { data } = await api.post('/api/stream/token')
+    const params = new URLSearchParams({ token: data.token })
+    if (lastEventId) params.set('last_event_id', lastEventId)
+    if (scopeKey) params.set('equipment_ids', scopeKey)
+    source = new EventSource(`${api.defaults.baseURL}/api/stream?${params}`)
+    source.onerror = reconnectLater
+    Object.keys(handlers).forEach(attach)
+  } catch {
+    reconnectLater()
+  } finally {
+    connecting = false
+  }
+}
+
+const streamSocket = {
+  on: (event, handler) => {
+    if (!handlers[event]) handlers[event] = new Set()
+    handlers[event].add(handler)
+    connect()
+    attach(event)
+  },
+  off: (event, handler) => {
+    handlers[event]?.delete(handler)
+  },
   emit: () => {},
-  disconnect: () => {},
+  disconnect: () => {
+    close()
+    lastEventId = null
+    countIds = []
+    roomIds.clear()
+    scopeKey = ''
+  },
 }
 
 export function getSocket() {
-  return mockSocket
+  return streamSocket
 }
 
 export function joinEquipmentRoom(equipmentId) {
-  // No-op in serverless
+  roomIds.add(equipmentId)
+  rescope()
 }
 
 export function leaveEquipmentRoom(equipmentId) {
-  // No-op in serverless
+  roomIds.delete(equipmentId)
+  rescope()
 }
 
-
+export function subscribeCounts(equipmentIds) {
+  countIds = equipmentIds
+  rescope()
+}
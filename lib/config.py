@@ -14,6 +14,15 @@ class Config:
     SQLALCHEMY_ECHO = False
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Connection pooling - short-lived instances must not hold connections open.
+    # "serverless" (NullPool), "pgbouncer" (NullPool, pooler does the pooling)
+    # or "server" (QueuePool) for long-running hosts
+    DB_POOL_PROFILE = os.getenv("DB_POOL_PROFILE", "serverless")
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 5))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 300))  # seconds
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 10))  # seconds
+
     # Uploads - use /tmp in serverless
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
     UPLOADED_EXCELS_DEST = os.getenv(
@@ -21,6 +30,32 @@ class Config:
         "/tmp"
     )
 
+    # Request metrics at /api/metrics (per instance); optional bearer token for scrapes
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") not in ("0", "false", "False")
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+    # Opt-in SQL profiler (slow-query plans, N+1 warnings, Server-Timing)
+    SQL_PROFILER_ENABLED = os.getenv("SQL_PROFILER_ENABLED", "0") not in ("0", "false", "False")
+    SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", 200))
+    SQL_EXPLAIN_SLOW = os.getenv("SQL_EXPLAIN_SLOW", "1") not in ("0", "false", "False")
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", 10))
+
+    # Sampling CPU profiler (see backend/config.py); profiles go to /tmp in serverless
+    CPU_PROFILER_ENABLED = os.getenv("CPU_PROFILER_ENABLED", "0") not in ("0", "false", "False")
+    CPU_PROFILER_ALLOW_HEADER = os.getenv("CPU_PROFILER_ALLOW_HEADER", "1") not in ("0", "false", "False")
+    CPU_PROFILER_ROUTES = os.getenv("CPU_PROFILER_ROUTES", "/api/equipment/import,/api/equipment/export")
+    CPU_PROFILER_SAMPLE_RATE = float(os.getenv("CPU_PROFILER_SAMPLE_RATE", 0.01))
+    CPU_PROFILER_FORMAT = os.getenv("CPU_PROFILER_FORMAT", "speedscope")
+    CPU_PROFILER_DIR = os.getenv("CPU_PROFILER_DIR", "/tmp/profiles")
+    CPU_PROFILER_MAX_FILES = int(os.getenv("CPU_PROFILER_MAX_FILES", 50))
+
+    # Admission control (see backend/config.py); instances only share limits
+    # with RATE_LIMIT_BACKEND=redis
+    RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "0") not in ("0", "false", "False")
+    RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+    HEAVY_MAX_CONCURRENCY = int(os.getenv("HEAVY_MAX_CONCURRENCY", 4))
+
     # CORS - allow all in serverless (handled by Vercel)
     CORS_ORIGINS = ["*"]
 
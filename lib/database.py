@@ -1,8 +1,15 @@
 import os
 from flask_sqlalchemy import SQLAlchemy
 
+from backend.database import get_engine_options as profile_engine_options
+
 db = SQLAlchemy()
 
+def get_engine_options(config):
+    """Engine options for the configured pooling profile (the backend's profiles)"""
+    settings = {key: getattr(config, key) for key in ("DB_POOL_SIZE", "DB_MAX_OVERFLOW", "DB_POOL_RECYCLE", "DB_POOL_TIMEOUT")}
+    return profile_engine_options(config.DB_POOL_PROFILE, config.SQLALCHEMY_DATABASE_URI, settings)
+
 def get_app_config():
     """Get configuration dict for Flask app"""
     from lib.config import Config
@@ -13,8 +20,26 @@ def get_app_config():
         "SQLALCHEMY_DATABASE_URI": Config.SQLALCHEMY_DATABASE_URI,
         "SQLALCHEMY_ECHO": Config.SQLALCHEMY_ECHO,
         "SQLALCHEMY_TRACK_MODIFICATIONS": Config.SQLALCHEMY_TRACK_MODIFICATIONS,
+        "SQLALCHEMY_ENGINE_OPTIONS": get_engine_options(Config),
         "UPLOADED_EXCELS_DEST": Config.UPLOADED_EXCELS_DEST,
         "MAX_CONTENT_LENGTH": Config.MAX_CONTENT_LENGTH,
+        "METRICS_ENABLED": Config.METRICS_ENABLED,
+        "METRICS_TOKEN": Config.METRICS_TOKEN,
+        "SQL_PROFILER_ENABLED": Config.SQL_PROFILER_ENABLED,
+        "SQL_SLOW_QUERY_MS": Config.SQL_SLOW_QUERY_MS,
+        "SQL_EXPLAIN_SLOW": Config.SQL_EXPLAIN_SLOW,
+        "SQL_N_PLUS_ONE_THRESHOLD": Config.SQL_N_PLUS_ONE_THRESHOLD,
+        "CPU_PROFILER_ENABLED": Config.CPU_PROFILER_ENABLED,
+        "CPU_PROFILER_ALLOW_HEADER": Config.CPU_PROFILER_ALLOW_HEADER,
+        "CPU_PROFILER_ROUTES": Config.CPU_PROFILER_ROUTES,
+        "CPU_PROFILER_SAMPLE_RATE": Config.CPU_PROFILER_SAMPLE_RATE,
+        "CPU_PROFILER_FORMAT": Config.CPU_PROFILER_FORMAT,
+        "CPU_PROFILER_DIR": Config.CPU_PROFILER_DIR,
+        "CPU_PROFILER_MAX_FILES": Config.CPU_PROFILER_MAX_FILES,
+        "RATE_LIMIT_ENABLED": Config.RATE_LIMIT_ENABLED,
+        "RATE_LIMIT_BACKEND": Config.RATE_LIMIT_BACKEND,
+        "RATE_LIMIT_REDIS_URL": Config.RATE_LIMIT_REDIS_URL,
+        "HEAVY_MAX_CONCURRENCY": Config.HEAVY_MAX_CONCURRENCY,
     }
 
 def init_db(app):
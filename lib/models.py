@@ -18,7 +18,7 @@ class User(db.Model, TimestampMixin):
     full_name = db.Column(db.String(120), nullable=True)
     role = db.Column(db.String(20), default="user", nullable=False)  # 'admin' or 'user'
 
-    comments = db.relationship("Comment", backref="user", lazy=True, cascade="all,delete")
+    comments = db.relationship("Comment", backref="user", lazy=True, cascade="all,delete", passive_deletes=True)
 
     def is_admin(self) -> bool:
         return self.role == "admin"
@@ -38,11 +38,15 @@ class Equipment(db.Model, TimestampMixin):
     # Dynamic fields container (JSON)
     extra = db.Column(db.JSON, default=dict)
 
-    comments = db.relationship("Comment", backref="equipment", lazy=True, cascade="all,delete")
+    comments = db.relationship("Comment", backref="equipment", lazy=True, cascade="all,delete", passive_deletes=True)
 
 
 class Comment(db.Model):
     __tablename__ = "comments"
+    __table_args__ = (
+        # Keyset pagination over (created_at, id) per equipment item
+        db.Index("ix_comments_equipment_created", "equipment_id", "created_at", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     equipment_id = db.Column(db.Integer, db.ForeignKey("equipment.id", ondelete="CASCADE"), nullable=False)
@@ -50,3 +54,14 @@ class Comment(db.Model):
     comment_text = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
+
+class ChangeLog(db.Model):
+    """Append-only log of pushed events, read by the SSE change stream."""
+
+    __tablename__ = "change_log"
+
+    id = db.Column(db.Integer, primary_key=True)
+    event = db.Column(db.String(50), nullable=False)
+    equipment_id = db.Column(db.Integer, nullable=True, index=True)
+    payload = db.Column(db.JSON, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
@@ -0,0 +1,58 @@
+import os
+import tempfile
+import time
+
+_data_dir = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_data_dir}/test.db")
+os.environ.setdefault("UPLOADS_DIR", _data_dir)
+os.environ.update(RATE_LIMIT_ENABLED="1", RATE_LIMIT_BACKEND="memory", HEAVY_MAX_CONCURRENCY="1", HEAVY_QUEUE_TIMEOUT="0.5",
+                  RATE_LIMIT_HEAVY_READ_BURST="100")
+
+import eventlet
+import pytest
+
+from backend.admission import MemoryBackend
+from backend.app import app
+
+
+@pytest.fixture()
+def client():
+    return app.test_client()
+
+
+@pytest.fixture()
+def auth_headers(client):
+    token = client.post("/api/auth/login", json={"login": "admin", "password": "Admin@123"}).json["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.mark.parametrize("fmt", ["xlsx", "csv"])
+def test_export_releases_heavy_slot(client, auth_headers, fmt):
+    backend = app.extensions["admission"].backend
+    for _ in range(3):
+        response = client.get(f"/api/equipment/export?format={fmt}", headers=auth_headers)
+        assert response.status_code == 200
+        response.get_data()
+        response.close()
+        assert backend.stats()["in_flight"] == 0
+
+
+def test_greenthread_waiting_for_slot_does_not_block_holder():
+    backend = MemoryBackend(max_concurrency=1, max_queue=4, poll_interval=0.01)
+
+    def hold():
+        slot = backend.acquire(1)
+        eventlet.sleep(0.1)
+        backend.release(slot)
+
+    def wait():
+        started = time.monotonic()
+        slot = backend.acquire(2)
+        return slot, time.monotonic() - started
+
+    holder = eventlet.spawn(hold)
+    eventlet.sleep(0)
+    slot, waited = eventlet.spawn(wait).wait()
+    holder.wait()
+    assert slot is not None
+    assert waited < 1